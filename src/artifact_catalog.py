@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Artifact Catalog for Whimperizer
+SQLite index of whimperized / consolidated outputs, kept in the output directory itself.
+Writers register each file as they save it, and readers ask for "the best file for group X"
+with an indexed query instead of globbing and re-parsing every historical run. Files that
+arrive any other way (copied in, restored, synced) are indexed once the directory's mtime
+changes. Also prunes the old runs that pile up.
+"""
+
+import re
+import sys
+import sqlite3
+import logging
+import argparse
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+CATALOG_FILENAME = 'artifacts.sqlite'
+
+# Lower rank wins when picking a group's file for the PDF
+MODE_RANK = {'consolidated': 0, 'iterative': 1, 'normal': 2}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    group_key TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    mode_rank INTEGER NOT NULL,
+    model TEXT,
+    run TEXT,
+    created_ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS artifacts_best ON artifacts (group_key, mode_rank, created_ts DESC);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+TIMESTAMP_SUFFIX = re.compile(r'-?\d{8}_\d{6}(?:-\d+)?$')
+
+
+def parse_artifact_name(path: Path) -> Optional[Tuple[str, str, Optional[str]]]:
+    """
+    (group_key, mode, model) from an output filename, None if it is not one:
+    zaltz-2a-16to21-whimperized-iterative-gpt-4-1-20250724_164521.md -> (zaltz-2a, iterative, gpt-4-1)
+    """
+    if path.suffix not in ('.md', '.txt'):
+        return None
+    name_parts = path.stem.split('-whimperized-')
+    if len(name_parts) < 2:
+        return None
+    prefix_parts = name_parts[0].split('-')
+    group_key = f"{prefix_parts[0]}-{prefix_parts[1]}" if len(prefix_parts) >= 2 else name_parts[0]
+    mode, _, rest = name_parts[1].partition('-')
+    if mode not in MODE_RANK:
+        return None
+    model = TIMESTAMP_SUFFIX.sub('', rest) or None
+    return group_key, mode, model
+
+
+class ArtifactCatalog:
+    """Index of one output directory (<dir>/artifacts.sqlite); safe to share between threads and processes"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.path = self.directory / CATALOG_FILENAME
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.logger = logging.getLogger('whimperizer.catalog')
+
+    def _connection(self) -> sqlite3.Connection:
+        """Caller must hold self._lock; indexes files that appeared since the directory last changed"""
+        if self._conn is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        self._refresh()
+        return self._conn
+
+    def _refresh(self):
+        """Caller must hold self._lock; re-scan when the directory's mtime moved (files copied in, restored, synced)"""
+        try:
+            version = str(self.directory.stat().st_mtime_ns)
+        except OSError:
+            return
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'directory_mtime'").fetchone()
+        if row is None or row[0] != version:
+            self._scan(version)
+
+    def _scan(self, version: Optional[str] = None) -> int:
+        """Caller must hold self._lock; index every output file the catalog doesn't know yet"""
+        if version is None:
+            version = str(self.directory.stat().st_mtime_ns)  # Taken first: a file landing mid-scan changes it
+        known = {row[0] for row in self._conn.execute("SELECT path FROM artifacts")}
+        count = 0
+        for file_path in self.directory.iterdir():
+            if file_path.name in known:
+                continue
+            parsed = parse_artifact_name(file_path)
+            if parsed and file_path.is_file():
+                self._insert(file_path, *parsed, run=None, created_ts=file_path.stat().st_mtime)
+                count += 1
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('directory_mtime', ?)", (version,))
+        self._conn.commit()
+        if count:
+            self.logger.info(f"🗂️  Indexed {count} output file(s) not yet in {self.path}")
+        return count
+
+    def _insert(self, path: Path, group_key: str, mode: str, model: Optional[str], run: Optional[str],
+                created_ts: float):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO artifacts (path, group_key, mode, mode_rank, model, run, created_ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (path.name, group_key, mode, MODE_RANK.get(mode, len(MODE_RANK)), model, run, created_ts)
+        )
+
+    def register(self, path, group_key: Optional[str] = None, mode: Optional[str] = None,
+                 model: Optional[str] = None, run: Optional[str] = None):
+        """Record a file just written to this directory; never raises (indexing must not break a save)"""
+        path = Path(path)
+        try:
+            parsed = parse_artifact_name(path) or (None, None, None)
+            group_key, mode, model = group_key or parsed[0], mode or parsed[1], model or parsed[2]
+            if not group_key or not mode:
+                raise ValueError(f"cannot tell group and mode of {path.name}")
+            with self._lock:
+                self._connection()
+                self._insert(path, group_key, mode, model, run, time.time())
+                self._conn.commit()
+        except Exception as e:
+            self.logger.warning(f"Could not register {path.name} in the artifact catalog: {e}")
+
+    def _forget(self, name: str):
+        """Caller must hold self._lock"""
+        self._conn.execute("DELETE FROM artifacts WHERE path = ?", (name,))
+        self._conn.commit()
+
+    def groups(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._connection().execute(
+                "SELECT DISTINCT group_key FROM artifacts ORDER BY group_key")]
+
+    def best(self, group_key: str) -> Optional[Tuple[Path, str]]:
+        """The group's file for the PDF: consolidated > iterative > normal, newest first"""
+        with self._lock:
+            conn = self._connection()
+            while True:
+                row = conn.execute(
+                    "SELECT path, mode FROM artifacts WHERE group_key = ? ORDER BY mode_rank, created_ts DESC LIMIT 1",
+                    (group_key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                file_path = self.directory / row[0]
+                if file_path.exists():
+                    return file_path, row[1]
+                self._forget(row[0])  # Deleted behind our back
+
+    def best_per_group(self, groups: Optional[List[str]] = None) -> Dict[str, Tuple[Path, str]]:
+        best = {}
+        for group_key in (groups or self.groups()):
+            found = self.best(group_key)
+            if found:
+                best[group_key] = found
+        return best
+
+    def query(self, group_key: Optional[str] = None, mode: Optional[str] = None, model: Optional[str] = None,
+              since: Optional[float] = None) -> List[dict]:
+        """Catalog rows (newest first) filtered by group, mode, model and creation time"""
+        clauses, params = [], []
+        for column, value in (('group_key', group_key), ('mode', mode), ('model', model)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("created_ts >= ?")
+            params.append(since)
+        sql = "SELECT path, group_key, mode, model, run, created_ts FROM artifacts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_ts DESC"
+        with self._lock:
+            cursor = self._connection().execute(sql, params)
+            names = [c[0] for c in cursor.description]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        for row in rows:
+            row['path'] = self.directory / row['path']
+        return rows
+
+    def files_by_group(self, groups: Optional[List[str]] = None) -> Dict[str, List[Path]]:
+        """Every existing output per group, newest first"""
+        grouped: Dict[str, List[Path]] = {}
+        for group_key in (groups or self.groups()):
+            files = [row['path'] for row in self.query(group_key=group_key) if row['path'].exists()]
+            if files:
+                grouped[group_key] = files
+        return grouped
+
+    def rebuild(self) -> int:
+        """Drop the index and re-scan the directory"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM artifacts")
+            return self._scan()
+
+    def prune(self, keep: int = 3, older_than_days: Optional[float] = None, dry_run: bool = False) -> List[Path]:
+        """
+        Delete old runs: per group and mode keep the newest `keep` files (and always the group's
+        current best); with older_than_days only files older than that are candidates
+        """
+        cutoff = time.time() - older_than_days * 86400 if older_than_days is not None else None
+        doomed = []
+        for group_key in self.groups():
+            best = self.best(group_key)
+            seen: Dict[str, int] = {}
+            for row in self.query(group_key=group_key):
+                seen[row['mode']] = seen.get(row['mode'], 0) + 1
+                if seen[row['mode']] <= keep or (best and row['path'] == best[0]):
+                    continue
+                if cutoff is not None and row['created_ts'] >= cutoff:
+                    continue
+                doomed.append(row['path'])
+        if not dry_run:
+            with self._lock:
+                self._connection()
+                for file_path in doomed:
+                    file_path.unlink(missing_ok=True)
+                    self._forget(file_path.name)
+        return doomed
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_catalogs: Dict[str, ArtifactCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(directory: str) -> ArtifactCatalog:
+    """Return the process-wide catalog of an output directory"""
+    key = str(Path(directory).resolve())
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = ArtifactCatalog(directory)
+        return _catalogs[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect, re-index or prune the whimperized output catalog')
+    parser.add_argument('--dir', default='../output/whimperized_content', help='Output directory')
+    parser.add_argument('--groups', nargs='+', help='Only these groups (listing)')
+    parser.add_argument('--rebuild', action='store_true', help='Re-index the directory from its filenames')
+    parser.add_argument('--prune', action='store_true', help='Delete old runs (see --keep / --older-than-days)')
+    parser.add_argument('--keep', type=int, default=3, help='Files kept per group and mode when pruning (default: 3)')
+    parser.add_argument('--older-than-days', type=float, help='Only prune files older than this')
+    parser.add_argument('--dry-run', action='store_true', help='Show what --prune would delete')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if not Path(args.dir).is_dir():
+        print(f"❌ Output directory not found: {args.dir}")
+        return 1
+    catalog = get_catalog(args.dir)
+
+    if args.rebuild:
+        print(f"🗂️  Re-indexed {catalog.rebuild()} file(s) in {catalog.path}")
+    if args.prune:
+        pruned = catalog.prune(args.keep, args.older_than_days, args.dry_run)
+        verb = 'Would delete' if args.dry_run else 'Deleted'
+        for file_path in pruned:
+            print(f"   🗑️  {file_path.name}")
+        print(f"🧹 {verb} {len(pruned)} old output file(s)")
+        return 0
+
+    for group_key, (file_path, mode) in sorted(catalog.best_per_group(args.groups).items()):
+        runs = len(catalog.query(group_key=group_key))
+        print(f"📄 {group_key}: {mode} {file_path.name} ({runs} file(s) indexed)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
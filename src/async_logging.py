@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Logging for Whimperizer
+Moves log file I/O off the request threads (QueueHandler -> QueueListener), rotates and gzips
+the log files, and stores large API payloads once by content hash so iterative transcripts are
+referenced from later log lines instead of being re-dumped on every turn
+"""
+
+import os
+import gzip
+import queue
+import atexit
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024  # Rotate log files at 10 MB
+DEFAULT_BACKUP_COUNT = 5              # Keep this many gzipped generations per log
+PAYLOAD_CACHE_SIZE = 256              # Recently seen payloads remembered without re-hashing
+
+# Where log files go instead of ./logs (the test suite points this at a temporary directory)
+LOG_DIR_ENV = 'WHIMPERIZER_LOG_DIR'
+
+_lock = threading.Lock()
+_listener: Optional[QueueListener] = None
+_installed: List[Tuple[logging.Logger, logging.Handler]] = []
+_payload_store: Optional['PayloadStore'] = None
+
+
+def log_dir() -> Path:
+    """Log directory: $WHIMPERIZER_LOG_DIR, else logs/ under the working directory"""
+    return Path(os.environ.get(LOG_DIR_ENV) or 'logs')
+
+
+def gzip_namer(name: str) -> str:
+    return f"{name}.gz"
+
+
+def gzip_rotator(source: str, dest: str):
+    """Compress the rotated-out log file instead of keeping it as plain text"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def rotating_file_handler(path: str, formatter: logging.Formatter, max_bytes: int = DEFAULT_MAX_BYTES,
+                          backup_count: int = DEFAULT_BACKUP_COUNT) -> RotatingFileHandler:
+    handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count,
+                                  encoding='utf-8', delay=True)
+    handler.namer = gzip_namer
+    handler.rotator = gzip_rotator
+    handler.setLevel(logging.DEBUG)
+    handler.setFormatter(formatter)
+    return handler
+
+
+class LoggerRouteFilter(logging.Filter):
+    """Send a record to a handler only if its logger is under include and not under exclude"""
+
+    def __init__(self, include: Optional[str] = None, exclude: Optional[str] = None):
+        super().__init__()
+        self.include = include
+        self.exclude = exclude
+
+    @staticmethod
+    def _under(name: str, prefix: str) -> bool:
+        return name == prefix or name.startswith(prefix + '.')
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.include and not self._under(record.name, self.include):
+            return False
+        if self.exclude and self._under(record.name, self.exclude):
+            return False
+        return True
+
+
+class PayloadStore:
+    """Content-addressed payload files (logs/payloads/ab/<sha256>.txt.gz), each written once"""
+
+    def __init__(self, directory: str, cache_size: int = PAYLOAD_CACHE_SIZE):
+        self.directory = Path(directory)
+        self.cache_size = cache_size
+        # Keyed on (length, hash()) rather than the text, so cached entries don't keep multi-MB
+        # transcripts alive; str caches its hash(), so a resent message is still only hashed once
+        self._refs: 'OrderedDict[Tuple[int, int], str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reference(self, content: str) -> Tuple[str, bool]:
+        """Return (sha256 digest, first_seen); content seen recently is not re-digested"""
+        key = (len(content), hash(content))
+        with self._lock:
+            digest = self._refs.get(key)
+            if digest is not None:
+                self._refs.move_to_end(key)
+                return digest, False
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        with self._lock:
+            first_seen = key not in self._refs
+            self._refs[key] = digest
+            while len(self._refs) > self.cache_size:
+                self._refs.popitem(last=False)
+        return digest, first_seen
+
+    def path_for(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.txt.gz"
+
+    def write(self, digest: str, content: str):
+        path = self.path_for(digest)
+        if path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def read(self, digest: str) -> str:
+        with gzip.open(self.path_for(digest), 'rt', encoding='utf-8') as f:
+            return f.read()
+
+
+class PayloadHandler(logging.Handler):
+    """Runs on the listener thread: persists payloads attached to records by log_payload()"""
+
+    def __init__(self, store: PayloadStore):
+        super().__init__(logging.DEBUG)
+        self.store = store
+
+    def emit(self, record: logging.LogRecord):
+        payload = getattr(record, 'payload', None)
+        if payload is None:
+            return
+        try:
+            self.store.write(record.payload_ref, payload)
+        except Exception:
+            self.handleError(record)
+
+
+def log_payload(logger: logging.Logger, label: str, content: Optional[str], level: int = logging.DEBUG):
+    """
+    Log a large payload (prompt message, response) by reference. The content is stored once per
+    unique hash on the listener thread; the log line only carries the hash and size.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    store = _payload_store
+    if store is None or not content:
+        logger.log(level, f"{label}: {content}")
+        return
+
+    digest, first_seen = store.reference(content)
+    extra = {'payload': content, 'payload_ref': digest} if first_seen else None
+    seen = '' if first_seen else ', seen before'
+    logger.log(level, f"{label}: [payload sha256:{digest} | {len(content):,} chars{seen}]", extra=extra)
+
+
+def configure_async_logging(routes: List[Tuple[logging.Logger, List[logging.Handler]]],
+                            payload_dir: Optional[str] = None):
+    """
+    Attach one QueueHandler per logger and serve every destination handler from a single
+    background listener thread. Safe to call again: the previous setup is torn down first.
+    routes: (logger, handlers) pairs; handlers should carry LoggerRouteFilter where loggers share them.
+    """
+    global _listener, _payload_store
+    stop_async_logging()
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    handlers: List[logging.Handler] = []
+    with _lock:
+        for target_logger, target_handlers in routes:
+            queue_handler = QueueHandler(log_queue)
+            target_logger.addHandler(queue_handler)
+            _installed.append((target_logger, queue_handler))
+            handlers.extend(h for h in target_handlers if h not in handlers)
+
+        if payload_dir:
+            _payload_store = PayloadStore(payload_dir)
+            handlers.append(PayloadHandler(_payload_store))
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def stop_async_logging():
+    """Flush queued records, close the file handlers and detach the queue handlers"""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+        installed = list(_installed)
+        _installed.clear()
+
+    for target_logger, queue_handler in installed:
+        target_logger.removeHandler(queue_handler)
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def attach_sync_handler(target_logger: logging.Logger, handler: logging.Handler):
+    """Handlers that must stay synchronous (console) but should still be replaced on re-setup"""
+    with _lock:
+        target_logger.addHandler(handler)
+        _installed.append((target_logger, handler))
+
+
+atexit.register(stop_async_logging)
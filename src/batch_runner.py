@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Batch Runner for Whimperizer
+Submits every group's request through the provider's batch endpoint instead of calling the API
+once per group. Job IDs and conversation state are persisted after every step so an overnight
+job can be resumed, and outputs are written with the same filenames as Whimperizer.save_output.
+
+Rounds:
+  1. One "normal" request per group (whole group content)
+  2. Iterative turns - turn N for every group goes out together in one batch per round
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from call_context import call_context
+from model_registry import get_model_registry, RequestValidationError
+from usage_ledger import get_ledger
+
+logger = logging.getLogger(__name__)
+
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class BatchBackend:
+    """Base class for provider batch APIs"""
+    def __init__(self, provider):
+        self.provider = provider
+        self.client = provider.client
+        self.responses: Dict[str, Any] = {}  # custom_id -> SDK-style response from the last results()
+
+    def submit(self, requests: List[Tuple[str, List[Dict]]]) -> str:
+        """Submit (custom_id, messages) pairs, return the provider's batch ID"""
+        raise NotImplementedError
+
+    def status(self, batch_id: str) -> str:
+        """RUNNING, DONE or FAILED"""
+        raise NotImplementedError
+
+    def results(self, batch_id: str) -> Dict[str, Optional[str]]:
+        """custom_id -> response text (None for failed requests); responses are kept for the usage ledger"""
+        raise NotImplementedError
+
+
+def _namespace(value):
+    """JSON response body as attributes, so the ledger reads it like an SDK response object"""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _namespace(v) for k, v in value.items()})
+    return value
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI Batch API: upload a JSONL file of chat completion requests, poll, download output"""
+
+    def submit(self, requests):
+        lines = []
+        for custom_id, messages in requests:
+            lines.append(json.dumps({
+                'custom_id': custom_id,
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': self.provider.build_api_params(messages),
+            }))
+        payload = '\n'.join(lines).encode('utf-8')
+        batch_file = self.client.files.create(file=('whimperizer-batch.jsonl', payload), purpose='batch')
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        # Expired batches still return whatever finished inside the window
+        if batch.status in ('completed', 'expired'):
+            return DONE
+        if batch.status in ('failed', 'cancelled'):
+            return FAILED
+        return RUNNING
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        results = {}
+        self.responses = {}
+        if batch.output_file_id:
+            content = self.client.files.content(batch.output_file_id).text
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get('response') or {}
+                body = response.get('body') or {}
+                if response.get('status_code') == 200 and body.get('choices'):
+                    results[record['custom_id']] = body['choices'][0]['message']['content']
+                    self.responses[record['custom_id']] = _namespace(body)
+                else:
+                    logger.error(f"Batch request {record.get('custom_id')} failed: {record.get('error') or body}")
+                    results[record['custom_id']] = None
+        if batch.error_file_id:
+            content = self.client.files.content(batch.error_file_id).text
+            for line in content.splitlines():
+                if line.strip():
+                    record = json.loads(line)
+                    logger.error(f"Batch request {record.get('custom_id')} failed: {record.get('error')}")
+                    results.setdefault(record['custom_id'], None)
+        return results
+
+
+class AnthropicBatchBackend(BatchBackend):
+    """Anthropic Message Batches API"""
+
+    def submit(self, requests):
+        batch = self.client.messages.batches.create(requests=[
+            {'custom_id': custom_id, 'params': self.provider.build_api_params(messages)}
+            for custom_id, messages in requests
+        ])
+        return batch.id
+
+    def status(self, batch_id):
+        batch = self.client.messages.batches.retrieve(batch_id)
+        return DONE if batch.processing_status == 'ended' else RUNNING
+
+    def results(self, batch_id):
+        results = {}
+        self.responses = {}
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == 'succeeded':
+                results[entry.custom_id] = entry.result.message.content[0].text
+                self.responses[entry.custom_id] = entry.result.message
+            else:
+                logger.error(f"Batch request {entry.custom_id} failed: {entry.result.type}")
+                results[entry.custom_id] = None
+        return results
+
+
+BATCH_BACKENDS = {
+    'openai': OpenAIBatchBackend,
+    'anthropic': AnthropicBatchBackend,
+}
+
+
+class BatchWhimperizer:
+    """Drives a Whimperizer through batch rounds, persisting state to a JSON file"""
+
+    def __init__(self, whimperizer, state_path: Optional[str] = None, poll_interval: float = 60):
+        self.whimperizer = whimperizer
+        self.poll_interval = poll_interval
+
+        backend_class = BATCH_BACKENDS.get(whimperizer.provider_name)
+        if backend_class is None:
+            raise ValueError(f"Batch mode is not supported for provider '{whimperizer.provider_name}' "
+                             f"(supported: {', '.join(BATCH_BACKENDS)})")
+        self.backend = backend_class(whimperizer.ai_provider)
+        model = whimperizer.ai_provider.config['model']
+        if not get_model_registry().capabilities(whimperizer.provider_name, model)['supports_batch']:
+            logger.warning(f"{whimperizer.provider_name}/{model} is not marked as batch-capable in the model "
+                           f"registry; the batch may be rejected (set supports_batch in config api.models)")
+
+        if state_path:
+            self.state_path = Path(state_path)
+        else:
+            jobs_dir = Path(whimperizer.config['processing']['output_dir']) / 'batch_jobs'
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            self.state_path = jobs_dir / f"batch-{whimperizer.provider_name}-{timestamp}.json"
+        self.state = None
+
+    # ---- state persistence ----
+
+    def save_state(self):
+        """Atomically write state so a crash never leaves a half-written job file"""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.state_path.with_suffix('.json.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    def load_or_create_state(self, target_groups=None):
+        if self.state_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+            logger.info(f"Resuming batch job from {self.state_path}")
+            print(f"♻️  Resuming batch job: {self.state_path}")
+            return
+
+        grouped_files = self.whimperizer.select_groups(target_groups)
+        self.state = {
+            'provider': self.whimperizer.provider_name,
+            'model': self.whimperizer.ai_provider.config['model'],
+            'created': datetime.now().isoformat(),
+            'round_number': 0,
+            'round': None,
+            'groups': {
+                group_key: {
+                    'files': [
+                        {'filename': f['filename'], 'path': str(f['path']), 'line': f['line']}
+                        for f in group_files
+                    ],
+                    'status': 'pending',
+                    'messages': None,
+                    'next_file': 0,
+                    'pending_message': None,
+                    'parts': [],
+                    'normal_length': 0,
+                    'normal_file': None,
+                    'iterative_file': None,
+                }
+                for group_key, group_files in grouped_files.items()
+            },
+        }
+        self.save_state()
+        print(f"📝 Batch job state: {self.state_path}")
+
+    # ---- rounds ----
+
+    def next_round_requests(self) -> List[Tuple[str, str, List[Dict]]]:
+        """(custom_id, group_key, messages) for every group that still needs a response"""
+        requests = []
+        round_number = self.state['round_number'] + 1
+        for index, (group_key, group) in enumerate(self.state['groups'].items()):
+            custom_id = f"r{round_number}-g{index}"
+
+            if group['status'] == 'pending':
+                combined_content = self.whimperizer.combine_group_content(self._file_infos(group))
+                if not combined_content.strip():
+                    logger.warning(f"No content found for group {group_key}")
+                    group['status'] = 'failed'
+                    continue
+                messages = self.whimperizer.build_messages(combined_content)
+                if self._rejected(group_key, messages):
+                    group['status'] = 'failed'
+                    continue
+                requests.append((custom_id, group_key, messages))
+
+            elif group['status'] == 'iterating':
+                file_message = self._next_file_message(group)
+                if file_message is None:
+                    self.finish_group(group_key, group)
+                    continue
+                messages = group['messages'] + [file_message]
+                if self._rejected(group_key, messages):
+                    group['parts'] = []  # Same as a failed turn: keep the normal version
+                    self.finish_group(group_key, group)
+                    continue
+                group['pending_message'] = file_message
+                requests.append((custom_id, group_key, messages))
+        return requests
+
+    def _rejected(self, group_key: str, messages: List[Dict]) -> bool:
+        """Validate against the model registry so one oversized group can't fail the whole batch"""
+        try:
+            self.whimperizer.ai_provider.build_api_params(messages)
+            return False
+        except RequestValidationError as e:
+            logger.error(f"Group {group_key} not submitted: {e}")
+            print(f"💥 Group {group_key} skipped: {e}")
+            return True
+
+    def _file_infos(self, group):
+        return [{'filename': f['filename'], 'path': Path(f['path']), 'line': f['line']} for f in group['files']]
+
+    def _next_file_message(self, group) -> Optional[Dict]:
+        """Skip unreadable files (like call_iterative_api) and build the next turn's user message"""
+        while group['next_file'] < len(group['files']):
+            file_info = group['files'][group['next_file']]
+            file_content = self.whimperizer.read_file_content(file_info['path'])
+            if file_content:
+                file_number = group['next_file'] + 1
+                return {'role': 'user', 'content': self.whimperizer.iterative_file_message(file_number, file_content)}
+            logger.warning(f"Could not read file {file_info['filename']}")
+            group['next_file'] += 1
+        return None
+
+    def apply_results(self, results: Dict[str, Optional[str]]):
+        round_info = self.state['round']
+        for custom_id, group_key in round_info['requests'].items():
+            group = self.state['groups'][group_key]
+            content = results.get(custom_id)
+            line_numbers = [f['line'] for f in group['files']]
+            self.record_usage(custom_id, group_key, 'normal' if group['status'] == 'pending' else 'iterative')
+
+            if group['status'] == 'pending':
+                if not content:
+                    print(f"💥 Group {group_key} failed: batch request returned no content")
+                    group['status'] = 'failed'
+                    continue
+                group['normal_file'] = self.whimperizer.save_output(group_key, content, "normal", line_numbers)
+                group['normal_length'] = len(content)
+                if isinstance(self.whimperizer.conversation_history, list):
+                    # Same starting point as call_iterative_api: prompt history + overview response
+                    group['messages'] = self.whimperizer.conversation_history.copy()
+                    group['messages'].append({'role': 'assistant', 'content': content})
+                    group['status'] = 'iterating'
+                else:
+                    logger.warning("Using legacy format for iterative processing - not supported")
+                    self.finish_group(group_key, group)
+
+            elif group['status'] == 'iterating':
+                if not content:
+                    logger.error(f"Iterative turn failed for group {group_key}, keeping normal version")
+                    group['parts'] = []
+                    self.finish_group(group_key, group)
+                    continue
+                group['messages'].append(group['pending_message'])
+                group['messages'].append({'role': 'assistant', 'content': content})
+                group['parts'].append(content)
+                group['pending_message'] = None
+                group['next_file'] += 1
+
+        self.state['round'] = None
+        self.save_state()
+
+    def record_usage(self, custom_id: str, group_key: str, stage: str):
+        """Ledger entry at batch pricing; no latency, since queue time says nothing about the group"""
+        response = self.backend.responses.get(custom_id)
+        if response is None:
+            return
+        with call_context(group=group_key, stage=stage):
+            get_ledger().record(self.whimperizer.provider_name, self.state['model'], response, None, batch=True)
+
+    def finish_group(self, group_key, group):
+        """Save the iterative version (if complete) and pick the final mode like process_group"""
+        group['status'] = 'done'
+        if group['parts']:
+            combined = "\n\n".join(group['parts'])
+            line_numbers = [f['line'] for f in group['files']]
+            group['iterative_file'] = self.whimperizer.save_output(group_key, combined, "iterative", line_numbers)
+            group['final_mode'] = 'iterative' if len(combined) > group['normal_length'] else 'normal'
+        else:
+            group['final_mode'] = 'normal'
+        group['messages'] = None  # Transcript no longer needed once outputs are on disk
+
+    def wait_for_round(self):
+        batch_id = self.state['round']['batch_id']
+        while True:
+            status = self.backend.status(batch_id)
+            if status == DONE:
+                return self.backend.results(batch_id)
+            if status == FAILED:
+                logger.error(f"Batch {batch_id} failed")
+                return {}
+            logger.info(f"Batch {batch_id} still running, checking again in {self.poll_interval}s")
+            time.sleep(self.poll_interval)
+
+    def run(self, target_groups=None):
+        self.load_or_create_state(target_groups)
+        if not self.state['groups']:
+            logger.error("No groups to process")
+            return []
+
+        while True:
+            if self.state['round']:
+                round_info = self.state['round']
+                print(f"⏳ Waiting for batch {round_info['batch_id']} "
+                      f"(round {self.state['round_number']}, {len(round_info['requests'])} requests)...")
+                self.apply_results(self.wait_for_round())
+
+            requests = self.next_round_requests()
+            if not requests:
+                self.save_state()
+                break
+
+            self.state['round_number'] += 1
+            batch_id = self.backend.submit([(custom_id, messages) for custom_id, _, messages in requests])
+            self.state['round'] = {
+                'batch_id': batch_id,
+                'submitted': datetime.now().isoformat(),
+                'requests': {custom_id: group_key for custom_id, group_key, _ in requests},
+            }
+            self.save_state()
+            logger.info(f"Submitted batch {batch_id} with {len(requests)} requests")
+            print(f"📤 Round {self.state['round_number']}: submitted {len(requests)} request(s) as batch {batch_id}")
+
+        return self.summarize()
+
+    def summarize(self):
+        group_results = []
+        failed = 0
+        for group_key, group in self.state['groups'].items():
+            if group['status'] != 'done' or not group['normal_file']:
+                failed += 1
+                continue
+            final_mode = group.get('final_mode', 'normal')
+            group_results.append({
+                "normal_file": group['normal_file'],
+                "iterative_file": group['iterative_file'],
+                "final_mode": final_mode,
+                "final_file": group['iterative_file'] if final_mode == 'iterative' else group['normal_file'],
+            })
+
+        total = len(self.state['groups'])
+        print(f"\n🎯 Batch processing complete: {len(group_results)}/{total} groups successful")
+        if failed:
+            print(f"💥 {failed} group(s) failed")
+        for result in group_results:
+            print(f"   🎯 {Path(result['final_file']).name} ({result['final_mode']})")
+        return group_results
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark for the CLI Entry Points
+Measures each entry point's import cost with `python -X importtime`, checks that no heavy
+library (provider SDKs, pandas, selenium, reportlab, Pillow) is imported at startup, and times
+the quick commands end to end. Exits non-zero when anything is over budget, so it can gate CI.
+
+Usage:
+  python benchmark_startup.py
+  python benchmark_startup.py --budget-ms 150 --command-budget 0.5 --json startup.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+SRC_DIR = Path(__file__).resolve().parent
+
+ENTRY_POINTS = ('pipeline', 'whimperizer', 'consolidator', 'multi_runner', 'multi_pipeline',
+                'wimpy_pdf_generator', 'bulk_downloader', 'artifact_catalog', 'batch_runner')
+
+# Only the code path that uses them may import these
+HEAVY_MODULES = ('openai', 'anthropic', 'google.generativeai', 'pandas', 'selenium', 'reportlab', 'PIL')
+
+QUICK_COMMANDS = (
+    ('whimperizer.py', '--list-providers'),
+    ('wimpy_pdf_generator.py', '--list-resources'),
+    ('pipeline.py', '--dry-run', '--skip-download', '--skip-pdf'),
+)
+
+DEFAULT_IMPORT_BUDGET_MS = 250
+DEFAULT_COMMAND_BUDGET_SECONDS = 1.0
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) for every line of -X importtime output"""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def heavy_imports(modules: List[str]) -> List[str]:
+    return sorted({name for name in modules
+                   if any(name == heavy or name.startswith(heavy + '.') for heavy in HEAVY_MODULES)})
+
+
+def measure_imports(module: str, repeat: int = 3) -> Dict:
+    """Import cost of one module in a fresh interpreter (best of `repeat`), its heavy imports and slowest children"""
+    best = None
+    for _ in range(max(1, repeat)):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                                cwd=SRC_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"importing {module} failed: {result.stderr.strip().splitlines()[-1]}")
+        rows = parse_importtime(result.stderr)
+        if best is None or rows[-1][2] < best[-1][2]:
+            best = rows
+
+    rows = best
+    # Children are printed before their parent: the module's direct imports are the depth-1
+    # lines between the previous top-level import and the module's own (last) line
+    start = max((i for i, row in enumerate(rows[:-1]) if row[3] == 0), default=-1) + 1
+    children = [(name, cumulative) for name, _, cumulative, depth in rows[start:-1] if depth == 1]
+    total = rows[-1][2]
+    return {
+        'module': module,
+        'import_ms': round(total / 1000, 1),
+        'heavy': heavy_imports([name for name, _, _, _ in rows]),
+        'slowest': [(name, round(us / 1000, 1)) for name, us in sorted(children, key=lambda c: -c[1])[:5]],
+    }
+
+
+def time_command(command: Tuple[str, ...], repeat: int = 3) -> Dict:
+    """Wall-clock seconds (best of `repeat`) of a quick command, interpreter startup included"""
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, *command], cwd=SRC_DIR, capture_output=True, text=True,
+                                stdin=subprocess.DEVNULL)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return {'command': ' '.join(command), 'seconds': round(best, 3), 'exit_code': result.returncode}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check CLI import time and quick-command latency against a budget")
+    parser.add_argument('--modules', nargs='+', default=list(ENTRY_POINTS), help='Entry-point modules to measure')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_IMPORT_BUDGET_MS,
+                        help=f'Import budget per entry point in ms (default: {DEFAULT_IMPORT_BUDGET_MS})')
+    parser.add_argument('--command-budget', type=float, default=DEFAULT_COMMAND_BUDGET_SECONDS,
+                        help=f'Budget per quick command in seconds (default: {DEFAULT_COMMAND_BUDGET_SECONDS})')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the best is kept (default: 3)')
+    parser.add_argument('--skip-commands', action='store_true', help='Only measure imports')
+    parser.add_argument('--json', metavar='PATH', help='Also write the results as JSON')
+    args = parser.parse_args()
+
+    failures = []
+    imports = []
+    print(f"⏱️  Import time per entry point (budget {args.budget_ms:.0f} ms):")
+    for module in args.modules:
+        try:
+            measured = measure_imports(module, args.repeat)
+        except RuntimeError as e:
+            print(f"  ❌ {module}: {e}")
+            failures.append(module)
+            continue
+        imports.append(measured)
+        over = measured['import_ms'] > args.budget_ms
+        mark = '❌' if over or measured['heavy'] else '✅'
+        slowest = ', '.join(f"{name} {ms:.0f}" for name, ms in measured['slowest'][:3])
+        print(f"  {mark} {module:<22} {measured['import_ms']:>8.1f} ms   ({slowest})")
+        if measured['heavy']:
+            print(f"     ⚠️ imports {', '.join(measured['heavy'])} at startup")
+        if over or measured['heavy']:
+            failures.append(module)
+
+    commands = []
+    if not args.skip_commands:
+        print(f"\n⏱️  Quick commands (budget {args.command_budget:.2f} s, interpreter startup included):")
+        for command in QUICK_COMMANDS:
+            measured = time_command(command, args.repeat)
+            commands.append(measured)
+            over = measured['seconds'] > args.command_budget
+            print(f"  {'❌' if over else '✅'} {measured['command']:<50} {measured['seconds']:>6.3f} s")
+            if over:
+                failures.append(measured['command'])
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'imports': imports, 'commands': commands,
+                                               'budget_ms': args.budget_ms,
+                                               'command_budget_seconds': args.command_budget}, indent=2))
+        print(f"\n📄 Results written to {args.json}")
+
+    if failures:
+        print(f"\n❌ {len(failures)} over budget: {', '.join(failures)}")
+        return 1
+    print("\n✅ All entry points within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
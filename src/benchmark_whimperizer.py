@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Whimperize Stage
+Runs Whimperizer.run over synthetic groups against the deterministic fake model - either the
+in-process `fake` provider or the OpenAI provider pointed at fake_openai_server.py - and reports
+groups/minute and orchestration overhead per API call. No real API calls are made.
+
+Usage:
+  python benchmark_whimperizer.py --groups 20 --files-per-group 3
+  python benchmark_whimperizer.py --mode server --latency-mean 0.2 --rate-limit-rate 0.05
+  python benchmark_whimperizer.py --time-scale 0 --json bench.json   # pure overhead, no sleeping
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+import contextlib
+from pathlib import Path
+
+import yaml
+
+from fake_openai_server import add_fake_llm_arguments, fake_settings_from_args, make_server
+
+
+def create_inputs(input_dir: Path, groups: int, files_per_group: int, file_chars: int):
+    """bench-gNNN-L.txt files, matching the downloader's group1-group2-line naming"""
+    input_dir.mkdir(parents=True, exist_ok=True)
+    sentence = "Today the teacher said we would have a quiz, and Rowley thought she meant a pizza party. "
+    body = (sentence * (file_chars // len(sentence) + 1))[:file_chars]
+    for g in range(groups):
+        for line in range(1, files_per_group + 1):
+            (input_dir / f"bench-g{g:03d}-{line}.txt").write_text(
+                f"Group {g} file {line}\n\n{body}", encoding='utf-8')
+
+
+def build_config(base_config: dict, work_dir: Path, provider: str, fake_settings: dict,
+                 base_url: str = None) -> dict:
+    config = copy.deepcopy(base_config)
+    config['processing'] = {
+        'input_dir': str(work_dir / 'input'),
+        'output_dir': str(work_dir / 'output'),
+    }
+    config['api']['default_provider'] = provider
+    config['api']['fallbacks'] = {}  # Measure the primary path only
+    config.setdefault('usage', {})['ledger_path'] = str(work_dir / 'usage.sqlite')
+
+    fake_config = dict(config['api']['providers'].get('fake') or {'model': 'fake-diary', 'max_tokens': 4000})
+    fake_config.update(fake_settings)
+    config['api']['providers']['fake'] = fake_config
+    if base_url:
+        openai_config = dict(config['api']['providers'].get('openai') or {})
+        openai_config.update({'base_url': base_url, 'model': 'gpt-4.1-mini', 'max_tokens': 4000, 'temperature': 0.7})
+        config['api']['providers']['openai'] = openai_config
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Whimperizer.run against a fake model")
+    parser.add_argument('--config', default='../config/config.yaml', help='Base configuration file')
+    parser.add_argument('--mode', choices=['inprocess', 'server'], default='inprocess',
+                        help='inprocess = fake provider; server = OpenAI provider via fake_openai_server (default: inprocess)')
+    parser.add_argument('--groups', type=int, default=10, help='Number of synthetic groups (default: 10)')
+    parser.add_argument('--files-per-group', type=int, default=3, help='Input files per group (default: 3)')
+    parser.add_argument('--file-chars', type=int, default=4000, help='Characters per input file (default: 4000)')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='Multiply simulated delays; 0 measures pure overhead (default: 1.0)')
+    parser.add_argument('--json', metavar='PATH', help='Also write the results as JSON')
+    parser.add_argument('--keep', action='store_true', help='Keep the temporary work directory')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Show whimperizer output')
+    add_fake_llm_arguments(parser)
+    parser.set_defaults(latency_mean=0.2, latency_stddev=0.3)
+    args = parser.parse_args()
+
+    import whimperizer as whimperizer_module
+    whimperizer_module.setup_logging(logging.INFO if args.verbose else logging.WARNING)
+
+    fake_settings = fake_settings_from_args(args)
+    fake_settings['time_scale'] = args.time_scale
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        base_config = yaml.safe_load(f)
+
+    work_dir = Path(tempfile.mkdtemp(prefix='whimperizer-bench-'))
+    server = None
+    try:
+        create_inputs(work_dir / 'input', args.groups, args.files_per_group, args.file_chars)
+
+        base_url = None
+        if args.mode == 'server':
+            server = make_server(port=0, fake_settings=fake_settings)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}/v1"
+            os.environ.setdefault('OPENAI_API_KEY', 'fake-benchmark-key')
+
+        provider = 'openai' if args.mode == 'server' else 'fake'
+        config = build_config(base_config, work_dir, provider, fake_settings, base_url)
+        config_path = work_dir / 'config.yaml'
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(config, f)
+
+        print(f"🏁 Benchmark: {args.groups} groups x {args.files_per_group} files, mode={args.mode}, "
+              f"latency={args.latency_dist}(mean={args.latency_mean}s), time_scale={args.time_scale}")
+
+        output = sys.stdout if args.verbose else open(os.devnull, 'w')
+        with contextlib.redirect_stdout(output):
+            whimperizer = whimperizer_module.Whimperizer(str(config_path), provider)
+            started = time.perf_counter()
+            group_results = whimperizer.run()
+            wall = time.perf_counter() - started
+        if output is not sys.stdout:
+            output.close()
+
+        llm = server.state.llm if server else whimperizer.ai_provider.llm
+        stats = llm.snapshot()
+        calls = stats['calls']
+        overhead = wall - stats['simulated_seconds']
+        results = {
+            'mode': args.mode,
+            'groups': args.groups,
+            'groups_succeeded': len(group_results),
+            'files_per_group': args.files_per_group,
+            'api_calls': calls,
+            'failures_injected': stats['failures'],
+            'rate_limits_injected': stats['rate_limited'],
+            'wall_seconds': round(wall, 3),
+            'simulated_api_seconds': round(stats['simulated_seconds'], 3),
+            'groups_per_minute': round(len(group_results) / wall * 60, 2) if wall else None,
+            # Calls run one after another, so time not spent inside the fake model is orchestration
+            'overhead_seconds': round(overhead, 3),
+            'overhead_ms_per_call': round(overhead / calls * 1000, 2) if calls else None,
+        }
+
+        print(f"\n📊 Results:")
+        print(f"   Groups: {results['groups_succeeded']}/{args.groups} succeeded")
+        print(f"   API calls: {calls} ({stats['failures']} injected failures, {stats['rate_limited']} injected 429s)")
+        print(f"   Wall time: {wall:.2f}s (simulated API time {stats['simulated_seconds']:.2f}s)")
+        print(f"   Throughput: {results['groups_per_minute']} groups/minute")
+        print(f"   Overhead: {results['overhead_ms_per_call']} ms per call")
+
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"💾 Results written to {args.json}")
+        return 0
+
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+        if args.keep:
+            print(f"📁 Work directory kept: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
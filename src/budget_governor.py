@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Budget Governor for Whimperizer
+Caps a pipeline job's tokens, dollars, wall time and concurrent API calls. Spend is read from the
+shared usage ledger, so calls made by child processes (multi_runner runs, consolidator) count too.
+As a limit approaches the job degrades instead of failing: cheaper models are tried first,
+hedging stops and extra runs take no new groups. Once a limit is hit no new API call starts.
+"""
+
+import os
+import json
+import atexit
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from call_context import get_call_context
+from usage_ledger import get_ledger
+
+# budget in config.yaml; pipeline.py / multi_pipeline.py flags override it
+DEFAULT_BUDGET_SETTINGS = {
+    'max_tokens': None,            # Prompt + completion tokens for the whole job
+    'max_dollars': None,           # Priced with usage.pricing
+    'max_wall_minutes': None,
+    'max_concurrent_calls': None,  # In-flight API calls per process (each subprocess run gets its own)
+    'soft_limit': 0.8,             # Share of any limit at which the job starts degrading
+    'keep_runs': 1,                # Runs that keep taking new groups while degraded
+    'refresh_seconds': 2.0,        # How often the ledger is re-read
+}
+LIMITS = ('max_tokens', 'max_dollars', 'max_wall_minutes')
+
+# Child processes inherit the job's limits and start time through this variable
+BUDGET_ENV = 'WHIMPERIZER_BUDGET'
+
+# Governor states
+OK, DEGRADED, EXHAUSTED = 'ok', 'degraded', 'exhausted'
+
+
+class BudgetExceeded(RuntimeError):
+    """No API call may start: the job has used up one of its budgets"""
+
+
+def run_number(run: Any) -> int:
+    """1 for the single-run case, N for a run_N label"""
+    try:
+        return int(str(run).rsplit('_', 1)[-1]) if run else 1
+    except ValueError:
+        return 1
+
+
+class BudgetGovernor:
+    """Process-wide budget tracker; every check is a no-op until a limit is configured"""
+
+    def __init__(self):
+        self.settings = dict(DEFAULT_BUDGET_SETTINGS)
+        self.started = time.time()
+        self._semaphore: Optional[threading.BoundedSemaphore] = None
+        self._lock = threading.Lock()
+        self._spent: Dict[str, float] = {'tokens': 0, 'dollars': 0.0}
+        self._read_at = 0.0
+        self._announced = OK
+        self.logger = logging.getLogger('whimperizer.budget')
+        inherited = os.environ.get(BUDGET_ENV)
+        if inherited:
+            try:
+                self.configure(json.loads(inherited))
+            except (ValueError, TypeError) as e:
+                self.logger.warning(f"Ignoring malformed {BUDGET_ENV}: {e}")
+
+    def configure(self, settings: Optional[dict]):
+        """Apply limits; 'started_at' (epoch seconds) lets child processes share the job's clock"""
+        settings = dict(settings or {})
+        with self._lock:
+            self.settings = dict(DEFAULT_BUDGET_SETTINGS)
+            self.settings.update({k: v for k, v in settings.items() if k in DEFAULT_BUDGET_SETTINGS and v is not None})
+            self.started = float(settings.get('started_at') or time.time())
+            calls = self.settings['max_concurrent_calls']
+            self._semaphore = threading.BoundedSemaphore(int(calls)) if calls else None
+            self._spent = {'tokens': 0, 'dollars': 0.0}
+            self._read_at = 0.0
+            self._announced = OK
+
+    @property
+    def active(self) -> bool:
+        return any(self.settings.get(name) for name in LIMITS + ('max_concurrent_calls',))
+
+    def export_env(self):
+        """Hand the limits to every child process started from now on"""
+        os.environ[BUDGET_ENV] = json.dumps({**{k: v for k, v in self.settings.items() if v is not None},
+                                             'started_at': self.started})
+
+    def spent(self) -> Dict[str, float]:
+        """Tokens and dollars recorded in the ledger since the job started, plus elapsed minutes"""
+        now = time.time()
+        with self._lock:
+            if now - self._read_at >= self.settings['refresh_seconds']:
+                self._read_at = now
+                since = datetime.fromtimestamp(self.started).isoformat(timespec='seconds')
+                try:
+                    rows = get_ledger().report(group_by=(), since=since)
+                except Exception as e:
+                    self.logger.debug(f"Could not read the usage ledger: {e}")
+                    rows = []
+                if rows and rows[0]['calls']:
+                    self._spent = {'tokens': (rows[0]['prompt_tokens'] or 0) + (rows[0]['completion_tokens'] or 0),
+                                   'dollars': rows[0]['cost_usd'] or 0.0}
+            return {**self._spent, 'minutes': (now - self.started) / 60}
+
+    def pressure(self) -> Tuple[float, Optional[str]]:
+        """Largest used share of any limit, and which limit it is"""
+        if not self.active:
+            return 0.0, None
+        spent = self.spent()
+        used = {'max_tokens': spent['tokens'], 'max_dollars': spent['dollars'], 'max_wall_minutes': spent['minutes']}
+        shares = [(used[name] / self.settings[name], name) for name in LIMITS if self.settings.get(name)]
+        return max(shares) if shares else (0.0, None)
+
+    def state(self) -> str:
+        share, limit = self.pressure()
+        state = EXHAUSTED if share >= 1.0 else DEGRADED if share >= self.settings['soft_limit'] else OK
+        if state != self._announced and state != OK:
+            self._announced = state
+            if state == EXHAUSTED:
+                self.logger.warning(f"🛑 Budget exhausted ({limit} at {share:.0%}): no new API calls will start")
+            else:
+                self.logger.warning(f"⚠️ Budget at {share:.0%} of {limit}: trying cheaper models first, "
+                                    f"no hedging, runs after run {self.settings['keep_runs']} take no new groups")
+        return state
+
+    def admit(self) -> Tuple[bool, str]:
+        """May the current run start another group (or consolidation)?"""
+        state = self.state()
+        if state == EXHAUSTED:
+            return False, 'budget exhausted'
+        if state == DEGRADED and run_number(get_call_context().get('run')) > self.settings['keep_runs']:
+            return False, 'budget nearly used, extra runs are winding down'
+        return True, ''
+
+    def allow_hedge(self) -> bool:
+        return self.state() == OK
+
+    def order_attempts(self, attempts: List[Any], price: Callable[[Any], Optional[float]]) -> List[Any]:
+        """Cheapest first once degraded (unpriced models keep their place after the priced ones)"""
+        if self.state() == OK:
+            return attempts
+        return sorted(attempts, key=lambda attempt: (price(attempt) is None, price(attempt) or 0.0))
+
+    @contextmanager
+    def call_slot(self):
+        """Wrap one API call: refuses once exhausted and holds a max_concurrent_calls slot"""
+        if self.active and self.state() == EXHAUSTED:
+            raise BudgetExceeded("job budget exhausted")
+        if self._semaphore is None:
+            yield
+            return
+        with self._semaphore:
+            yield
+
+    def summary(self) -> str:
+        spent = self.spent()
+        parts = [f"{spent['tokens']:,.0f} tokens", f"${spent['dollars']:.4f}", f"{spent['minutes']:.1f} min"]
+        limits = [f"{name}={self.settings[name]}" for name in LIMITS + ('max_concurrent_calls',) if self.settings.get(name)]
+        return f"💰 Budget: used {', '.join(parts)} (limits: {', '.join(limits)}; state: {self.state()})"
+
+
+def budget_settings(config: dict, args) -> dict:
+    """config.yaml budget section with the command-line limits on top"""
+    settings = dict(config.get('budget') or {})
+    for name in LIMITS + ('max_concurrent_calls',):
+        value = getattr(args, name, None)
+        if value is not None:
+            settings[name] = value
+    return settings
+
+
+def add_budget_arguments(parser):
+    """The budget flags shared by pipeline.py and multi_pipeline.py"""
+    parser.add_argument('--max-tokens', type=int, metavar='N',
+                        help='Stop starting API calls once the job has used this many tokens (default: config budget)')
+    parser.add_argument('--max-dollars', type=float, metavar='USD',
+                        help='Stop starting API calls once the job has cost this much (default: config budget)')
+    parser.add_argument('--max-wall-minutes', type=float, metavar='MIN',
+                        help='Stop starting API calls after this many minutes (default: config budget)')
+    parser.add_argument('--max-concurrent-calls', type=int, metavar='N',
+                        help='In-flight API calls per process (default: config budget)')
+
+
+def start_job_budget(config: dict, args) -> BudgetGovernor:
+    """Configure the governor for a pipeline job and hand its limits to every child process"""
+    governor = get_governor()
+    governor.configure(budget_settings(config, args))
+    if not governor.active:
+        return governor
+    usage = config.get('usage') or {}
+    get_ledger().configure(usage)
+    if not usage.get('enabled', True) and (governor.settings['max_tokens'] or governor.settings['max_dollars']):
+        print("⚠️  usage.enabled is false: token and dollar budgets cannot be tracked")
+    governor.export_env()
+    atexit.register(lambda: print(f"\n{governor.summary()}"))
+    return governor
+
+
+_governor = BudgetGovernor()
+
+
+def get_governor() -> BudgetGovernor:
+    """Return the process-wide budget governor"""
+    return _governor
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Build Cache for Whimperizer
+Make-style incremental builds for pipeline.py: every artifact (downloads, whimperized /
+consolidated text, PDFs) is recorded in a JSON manifest with content hashes of its inputs and
+the config that shaped it, and a step is skipped while nothing upstream has changed
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# build_cache in config.yaml
+DEFAULT_BUILD_CACHE_SETTINGS = {
+    'enabled': True,
+    'manifest_path': '../output/build_manifest.json',
+}
+
+PROMPT_FILE = Path('../config/whimperizer_prompt.txt')
+INPUT_FILE = re.compile(r'^(.+?)-(.+?)-(.+?)\.txt$')  # group1-group2-line.txt, as whimperizer parses it
+
+
+def hash_value(value: Any) -> str:
+    """Hash of a config value / list of rows (canonical JSON)"""
+    payload = json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def input_files_by_group(input_dir: str, groups: Optional[List[str]] = None) -> Dict[str, List[Path]]:
+    """Downloaded .txt inputs per group1-group2, sorted by name"""
+    grouped: Dict[str, List[Path]] = {}
+    for path in sorted(Path(input_dir).glob('*.txt')):
+        match = INPUT_FILE.match(path.name)
+        if not match:
+            continue
+        group_key = f"{match.group(1)}-{match.group(2)}"
+        if not groups or group_key in groups:
+            grouped.setdefault(group_key, []).append(path)
+    return grouped
+
+
+# What each step depends on. Paths (or lists of paths) are hashed by content, anything else as JSON.
+
+def download_inputs(urls: Any, downloader: str, download_format: str = 'txt') -> Dict[str, Any]:
+    return {'urls': urls, 'downloader': [downloader, download_format]}
+
+
+def whimperize_inputs(config: dict, input_files: List[Path], runs: int = 1,
+                      provider_override: Optional[str] = None) -> Dict[str, Any]:
+    api = config.get('api', {})
+    multi_run = config.get('multi_run', {})
+    model = {
+        'provider': provider_override or api.get('default_provider'),
+        'providers': api.get('providers'),
+        'fallbacks': api.get('fallbacks'),
+        'runs': runs,
+    }
+    if runs > 1:
+        model['run_models'] = multi_run.get('run_models')
+        model['consolidation'] = multi_run.get('consolidation')
+    return {'inputs': list(input_files), 'prompt': PROMPT_FILE, 'model': model, 'options': config.get('options')}
+
+
+def pdf_inputs(config: dict, text_file: Path, style: str, resources_dir: str) -> Dict[str, Any]:
+    return {'text': text_file, 'pdf': [config.get('pdf'), style, resources_dir]}
+
+
+class BuildCache:
+    """Manifest of built artifacts; disabled until pipeline.py configures it"""
+
+    def __init__(self):
+        self.settings = dict(DEFAULT_BUILD_CACHE_SETTINGS)
+        self.enabled = False
+        self.force = False
+        self.explain = False
+        self._entries: Optional[Dict[str, dict]] = None
+        self._hashes: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('whimperizer.build_cache')
+
+    def configure(self, settings: Optional[dict] = None, force: bool = False, explain: bool = False):
+        """Apply config.yaml build_cache settings and the --force / --explain flags"""
+        with self._lock:
+            self.settings.update(settings or {})
+            self.enabled = bool(self.settings.get('enabled', True))
+            self.force = force
+            self.explain = explain
+            self._entries = None
+
+    @property
+    def path(self) -> Path:
+        return Path(self.settings['manifest_path'])
+
+    def _load(self) -> Dict[str, dict]:
+        """Caller must hold self._lock"""
+        if self._entries is None:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding='utf-8')).get('artifacts', {})
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"⚠️ Ignoring unreadable build manifest {self.path}: {e}")
+                self._entries = {}
+        return self._entries
+
+    def hash_file(self, path: Path) -> str:
+        """Content hash, memoized per (path, size, mtime) so unchanged files are read once"""
+        path = Path(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            return 'missing'
+        key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+        if key not in self._hashes:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            self._hashes[key] = digest.hexdigest()[:16]
+        return self._hashes[key]
+
+    def fingerprint(self, inputs: Dict[str, Any]) -> Dict[str, str]:
+        hashes = {}
+        for name, value in inputs.items():
+            if isinstance(value, Path):
+                hashes[name] = self.hash_file(value)
+            elif isinstance(value, (list, tuple)) and value and all(isinstance(v, Path) for v in value):
+                hashes[name] = hash_value([[v.name, self.hash_file(v)] for v in value])
+            else:
+                hashes[name] = hash_value(value)
+        return hashes
+
+    def lookup(self, step: str, key: str, inputs: Dict[str, Any]) -> Optional[dict]:
+        """The recorded build when it is still up to date, otherwise None (and say why with --explain)"""
+        if not self.enabled:
+            return None
+        label = f"{step} {key}"
+        if self.force:
+            self._explain(f"🔁 {label}: rebuilding (--force)")
+            return None
+        fingerprint = self.fingerprint(inputs)
+        with self._lock:
+            entry = self._load().get(f"{step}:{key}")
+        if entry is None:
+            self._explain(f"🔁 {label}: rebuilding (no previous build)")
+            return None
+        changed = sorted(name for name in set(fingerprint) | set(entry['inputs'])
+                         if fingerprint.get(name) != entry['inputs'].get(name))
+        if changed:
+            self._explain(f"🔁 {label}: rebuilding ({', '.join(changed)} changed)")
+            return None
+        missing = [output for output in entry['outputs'] if not Path(output).exists()]
+        if missing:
+            self._explain(f"🔁 {label}: rebuilding (output missing: {Path(missing[0]).name})")
+            return None
+        self._explain(f"✅ {label}: up to date ({', '.join(Path(o).name for o in entry['outputs']) or 'no outputs'})")
+        return entry
+
+    def record(self, step: str, key: str, inputs: Dict[str, Any], outputs: List[Path], **extra):
+        """Remember a successful build (extra fields, e.g. mode, come back from lookup)"""
+        if not self.enabled:
+            return
+        entry = {
+            'inputs': self.fingerprint(inputs),
+            'outputs': [str(output) for output in outputs],
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+            **extra,
+        }
+        with self._lock:
+            self._load()[f"{step}:{key}"] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps({'artifacts': self._entries}, indent=2, sort_keys=True), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+
+    def _explain(self, message: str):
+        if self.explain:
+            print(message)
+
+
+_cache = BuildCache()
+
+
+def get_build_cache() -> BuildCache:
+    """Return the process-wide build cache"""
+    return _cache
@@ -12,7 +12,6 @@ import json
 import csv
 from urllib.parse import urlparse
 import logging
-import pandas as pd
 import random
 
 # Configure logging
@@ -58,6 +57,7 @@ class BulkHTMLDownloader:
         
     def read_csv_urls(self):
         """Read URLs from CSV file with columns: line, value, group1, group2"""
+        import pandas as pd  # Only needed here; keeps importing the downloader cheap
         try:
             df = pd.read_csv(self.input_file)
             
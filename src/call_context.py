@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Call Context for Whimperizer
+Carries "which group / stage / run is this API call for" down to the providers without
+changing every generate() signature. Backed by a ContextVar so concurrent groups don't mix.
+"""
+
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict
+
+_call_context: contextvars.ContextVar = contextvars.ContextVar('whimperizer_call_context', default={})
+
+
+def get_call_context() -> Dict[str, Any]:
+    """Current context, e.g. {'group': 'zaltz-1a', 'stage': 'iterative', 'run': 2}"""
+    return _call_context.get()
+
+
+@contextmanager
+def call_context(**values):
+    """Layer values on top of the current context for the duration of the block"""
+    merged = dict(_call_context.get())
+    merged.update(values)
+    token = _call_context.set(merged)
+    try:
+        yield merged
+    finally:
+        _call_context.reset(token)
+
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    """executor.submit() that carries the caller's context into the worker thread"""
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args, **kwargs)
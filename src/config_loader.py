@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Config Loader for Whimperizer
+One place that reads config.yaml: each file is parsed and validated once per process (re-read
+only when it changes on disk), and callers get their own copy. Per-run settings are overlays
+merged into a fresh copy in memory, so multi-run jobs write no temporary config files and one
+run's settings can never leak into another's.
+"""
+
+import copy
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+NUMBER = (int, float)
+
+# Expected shape of config.yaml. A type checks the value; a dict describes a section ('*' applies to
+# every entry of a mapping). Keys not listed are allowed, so sections can grow without touching this.
+SCHEMA = {
+    'api': {
+        'default_provider': str,
+        'fallbacks': {'*': {'provider': str, 'model': str, 'max_tokens': int, 'temperature': NUMBER}},
+        'circuit_breaker': dict,
+        'hedging': dict,
+        'rate_limits': dict,
+        'models': {'*': dict},
+        'providers': {'*': {'base_url': str, 'model': str, 'max_tokens': int, 'temperature': NUMBER}},
+    },
+    'multi_run': {
+        'run_models': {'*': {'provider': str, 'model': str, 'max_tokens': int, 'temperature': NUMBER}},
+        'parallel': {'default_max_runs': int, 'max_runs_per_provider': {'*': int}},
+        'consolidation': {'provider': str, 'model': str, 'max_tokens': int, 'temperature': NUMBER,
+                          'tree': dict, 'ranking': dict},
+    },
+    'usage': {'enabled': bool, 'ledger_path': str, 'pricing': {'*': {'*': NUMBER}}, 'batch_discount': NUMBER},
+    'pipeline': {'streaming': {'*': int}},
+    'build_cache': {'enabled': bool, 'manifest_path': str},
+    'budget': {'max_tokens': int, 'max_dollars': NUMBER, 'max_wall_minutes': NUMBER,
+               'max_concurrent_calls': int, 'soft_limit': NUMBER, 'keep_runs': int, 'refresh_seconds': NUMBER},
+    'scheduling': {'order': str, 'priority': list, 'seconds_per_call': NUMBER, 'chars_per_second': NUMBER},
+    'processing': {'input_dir': str, 'output_dir': str},
+    'pdf': {'page_size': {'width_inches': NUMBER, 'height_inches': NUMBER}},
+    'patterns': {'*': str},
+    'options': {'*': bool},
+}
+
+# Needed by every stage that calls a model
+REQUIRED = (('api', 'default_provider'), ('api', 'providers'))
+
+# Providers that need no entry under api.providers
+BUILTIN_PROVIDERS = ('fake',)
+
+
+class ConfigError(ValueError):
+    """config.yaml is missing, unreadable or does not match the schema"""
+
+
+def _type_name(expected) -> str:
+    if isinstance(expected, tuple):
+        return ' or '.join(t.__name__ for t in expected)
+    return expected.__name__
+
+
+def _check(value: Any, spec, where: str, problems: List[str]):
+    if value is None:
+        return  # null means "use the default" throughout config.yaml
+    if isinstance(spec, dict):
+        if not isinstance(value, dict):
+            problems.append(f"{where}: expected a mapping, got {type(value).__name__}")
+            return
+        for key, item in value.items():
+            item_spec = spec.get(key, spec.get('*'))
+            if item_spec is not None:
+                _check(item, item_spec, f"{where}.{key}" if where else str(key), problems)
+        return
+    if spec is int and isinstance(value, bool) or not isinstance(value, spec):
+        problems.append(f"{where}: expected {_type_name(spec)}, got {type(value).__name__} ({value!r})")
+
+
+def validate_config(config: Any) -> List[str]:
+    """Every schema problem in a parsed config (empty when valid)"""
+    problems: List[str] = []
+    if not isinstance(config, dict):
+        return [f"top level: expected a mapping, got {type(config).__name__}"]
+    _check(config, SCHEMA, '', problems)
+    for path in REQUIRED:
+        section = config
+        for key in path:
+            section = section.get(key) if isinstance(section, dict) else None
+        if section is None:
+            problems.append(f"{'.'.join(path)}: required")
+
+    api = config.get('api') or {}
+    providers = api.get('providers') or {}
+    default = api.get('default_provider')
+    if isinstance(default, str) and isinstance(providers, dict) and default not in providers \
+            and default not in BUILTIN_PROVIDERS:
+        problems.append(f"api.default_provider: '{default}' has no entry under api.providers")
+    for section, entries in (('api.fallbacks', api.get('fallbacks')),
+                             ('multi_run.run_models', (config.get('multi_run') or {}).get('run_models'))):
+        for name, entry in (entries or {}).items():
+            if isinstance(entry, dict) and not entry.get('provider'):
+                problems.append(f"{section}.{name}.provider: required")
+    return problems
+
+
+def merge(base: Dict, overlay: Dict) -> Dict:
+    """New dict: base with overlay merged in (nested mappings merge, anything else replaces); inputs untouched"""
+    merged = copy.deepcopy(base)
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def run_overlay(run_model_config: Dict) -> Dict:
+    """Overlay that points the default provider at a multi_run.run_models entry"""
+    provider = run_model_config['provider']
+    provider_settings = {'model': run_model_config['model'],
+                         'temperature': run_model_config.get('temperature', 0.7)}
+    if 'max_tokens' in run_model_config:
+        provider_settings['max_tokens'] = run_model_config['max_tokens']
+    return {'api': {'default_provider': provider, 'providers': {provider: provider_settings}}}
+
+
+class ConfigLoader:
+    """Process-wide parse cache keyed by resolved path; entries are revalidated when the file changes"""
+
+    def __init__(self):
+        self._cache: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0  # Files actually parsed (for tests and --verbose diagnostics)
+        self.logger = logging.getLogger('whimperizer.config')
+
+    def load(self, path: str, overlays: Optional[List[Dict]] = None) -> Dict:
+        """A private copy of the validated config, with overlays applied in order"""
+        resolved = Path(path).resolve()
+        try:
+            stat = resolved.stat()
+        except OSError as e:
+            raise ConfigError(f"Configuration file {path} not found") from e
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._cache.get(str(resolved))
+            if cached is None or cached[0] != version:
+                cached = (version, self._parse(resolved))
+                self._cache[str(resolved)] = cached
+        config = copy.deepcopy(cached[1])
+
+        for overlay in overlays or []:
+            config = merge(config, overlay)
+        if overlays:
+            problems = validate_config(config)
+            if problems:
+                raise ConfigError(f"Invalid configuration {path} with overrides:\n  " + '\n  '.join(problems))
+        return config
+
+    def _parse(self, path: Path) -> Dict:
+        import yaml
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f)
+        except (OSError, yaml.YAMLError) as e:
+            raise ConfigError(f"Failed to load config from {path}: {e}") from e
+        problems = validate_config(config)
+        if problems:
+            raise ConfigError(f"Invalid configuration {path}:\n  " + '\n  '.join(problems))
+        self.loads += 1
+        self.logger.debug(f"Loaded configuration from {path}")
+        return config
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+_loader = ConfigLoader()
+
+
+def get_config_loader() -> ConfigLoader:
+    """Return the process-wide config loader"""
+    return _loader
+
+
+def load_config(path: str, overlays: Optional[List[Dict]] = None) -> Dict:
+    """Parse-once, validated config.yaml (a private copy per call)"""
+    return _loader.load(path, overlays)
+
+
+def parse_overlay(text: str) -> Dict:
+    """An overlay passed on the command line (JSON), e.g. by multi_runner for each run"""
+    try:
+        overlay = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"Config overlay is not valid JSON: {e}") from e
+    if not isinstance(overlay, dict):
+        raise ConfigError("Config overlay must be a JSON object")
+    return overlay
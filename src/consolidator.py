@@ -4,36 +4,47 @@ Consolidator for Whimperizer
 Takes multiple AI-generated outputs and combines the best pieces into one final product
 """
 
-import os
 import sys
-import yaml
 import argparse
 import logging
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import re
-from collections import defaultdict
-
-# AI Provider imports (reusing from whimperizer)
-import openai
-try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
-
-try:
-    import google.generativeai as genai
-    GOOGLE_AVAILABLE = True
-except ImportError:
-    GOOGLE_AVAILABLE = False
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from dotenv import load_dotenv
 
+from provider_registry import get_registry, config_key, sdk_available
+from config_loader import load_config
+from rate_limiter import get_scheduler
+from budget_governor import BudgetExceeded, get_governor
+from group_scheduler import CONSOLIDATION_STAGES, get_group_scheduler
+from model_registry import get_model_registry, estimate_tokens
+from call_context import call_context, submit_with_context
+from usage_ledger import get_ledger
+from fake_llm import FakeLLM
+from run_ranker import select_runs
+from artifact_catalog import get_catalog
+from tracing import get_tracer
+
+# AI Provider SDKs are imported by the provider registry when a provider is first used
+ANTHROPIC_AVAILABLE = sdk_available('anthropic')
+GOOGLE_AVAILABLE = sdk_available('google')
+
 # Load environment variables
 load_dotenv()
 
+# multi_run.consolidation.tree in config.yaml
+DEFAULT_TREE_SETTINGS = {
+    'enabled': False,           # Always tree-reduce (otherwise only when one prompt would not fit)
+    'max_fan_in': 4,            # Most run outputs merged by a single call
+    'max_prompt_tokens': None,  # Per-call prompt budget; None = derived from the model's context window
+    'parallel': 4,              # Concurrent merge calls within one level
+}
+FALLBACK_PROMPT_TOKENS = 100000  # Budget when neither config nor the model registry gives one
+
 def setup_logging(verbose: bool = False):
     """Setup logging for consolidator"""
     level = logging.DEBUG if verbose else logging.INFO
@@ -43,16 +54,8 @@ def setup_logging(verbose: bool = False):
     )
     return logging.getLogger(__name__)
 
-def load_config(config_path: str) -> dict:
-    """Load configuration from YAML file"""
-    try:
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
-    except Exception as e:
-        raise Exception(f"Failed to load config from {config_path}: {e}")
-
 def find_whimperized_files(whimper_dir: str, groups: Optional[List[str]] = None) -> Dict[str, List[Path]]:
-    """Find whimperized files grouped by group key"""
+    """Find whimperized files grouped by group key, newest first (from the directory's artifact catalog)"""
     logger = logging.getLogger(__name__)
     
     whimper_path = Path(whimper_dir)
@@ -60,38 +63,7 @@ def find_whimperized_files(whimper_dir: str, groups: Optional[List[str]] = None)
         logger.error(f"Whimperized content directory not found: {whimper_dir}")
         return {}
     
-    # Find all whimperized files
-    all_files = list(whimper_path.glob('*whimperized*.md'))
-    all_files.extend(list(whimper_path.glob('*whimperized*.txt')))
-    
-    # Group files by group key
-    grouped_files = defaultdict(list)
-    
-    for file_path in all_files:
-        # Extract group key from filename
-        # Format: zaltz-2a-whimperized-iterative-gpt-4-1-20250724_164521.md
-        name_parts = file_path.stem.split('-whimperized-')
-        if len(name_parts) >= 2:
-            full_prefix = name_parts[0]  # e.g., "zaltz-2a" or "zaltz-2a-16to21"
-            
-            # Extract actual group key (first two dash-separated parts)
-            prefix_parts = full_prefix.split('-')
-            if len(prefix_parts) >= 2:
-                group_key = f"{prefix_parts[0]}-{prefix_parts[1]}"  # e.g., "zaltz-2a"
-            else:
-                group_key = full_prefix
-            
-            # Filter by groups if specified
-            if groups and group_key not in groups:
-                continue
-            
-            grouped_files[group_key].append(file_path)
-    
-    # Sort files within each group by timestamp (newest first)
-    for group_key in grouped_files:
-        grouped_files[group_key].sort(key=lambda x: x.stat().st_mtime, reverse=True)
-    
-    return dict(grouped_files)
+    return get_catalog(whimper_dir).files_by_group(groups)
 
 def read_file_content(file_path: Path) -> str:
     """Read content from a file"""
@@ -197,20 +169,34 @@ class AIProvider:
 class OpenAIProvider(AIProvider):
     def __init__(self, config: dict):
         super().__init__(config)
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        self.client = openai.OpenAI(api_key=api_key)
+        self.client = get_registry().get_client('openai', config.get('base_url'))
+    
+    def _send(self, model: str, messages: List[Dict], params: Dict):
+        raw_response = self.client.chat.completions.with_raw_response.create(
+            model=model, messages=messages, **params
+        )
+        return raw_response.parse(), raw_response.headers
     
     def generate(self, prompt: str) -> Optional[str]:
         try:
-            response = self.client.chat.completions.create(
-                model=self.config.get('model', 'gpt-4'),
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.config.get('temperature', 0.7),
-                max_tokens=self.config.get('max_tokens', 4000)
+            messages = [{"role": "user", "content": prompt}]
+            model = self.config.get('model', 'gpt-4')
+            # Output cap and temperature support from the model registry (raises before sending if invalid)
+            params = get_model_registry().request_params(
+                'openai', model, messages,
+                max_tokens=self.config.get('max_tokens', 4000), temperature=self.config.get('temperature', 0.7)
+            )
+            scheduler = get_scheduler()
+            started = time.monotonic()
+            response = scheduler.run(
+                'openai', model, scheduler.estimate(messages, 'openai', model),
+                send=lambda: self._send(model, messages, params),
+                usage_tokens=lambda r: r.usage.total_tokens if getattr(r, 'usage', None) else None
             )
+            get_ledger().record('openai', model, response, time.monotonic() - started)
             return response.choices[0].message.content
+        except BudgetExceeded:
+            raise
         except Exception as e:
             logging.getLogger(__name__).error(f"OpenAI API error: {e}")
             return None
@@ -220,20 +206,34 @@ class AnthropicProvider(AIProvider):
         super().__init__(config)
         if not ANTHROPIC_AVAILABLE:
             raise ImportError("Anthropic library not available")
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = get_registry().get_client('anthropic', config.get('base_url'))
+    
+    def _send(self, model: str, messages: List[Dict], params: Dict):
+        raw_response = self.client.messages.with_raw_response.create(
+            model=model, messages=messages, **params
+        )
+        return raw_response.parse(), raw_response.headers
     
     def generate(self, prompt: str) -> Optional[str]:
         try:
-            response = self.client.messages.create(
-                model=self.config.get('model', 'claude-3-sonnet-20240229'),
-                max_tokens=self.config.get('max_tokens', 4000),
-                temperature=self.config.get('temperature', 0.7),
-                messages=[{"role": "user", "content": prompt}]
+            messages = [{"role": "user", "content": prompt}]
+            model = self.config.get('model', 'claude-3-sonnet-20240229')
+            # Output cap and temperature support from the model registry (raises before sending if invalid)
+            params = get_model_registry().request_params(
+                'anthropic', model, messages,
+                max_tokens=self.config.get('max_tokens', 4000), temperature=self.config.get('temperature', 0.7)
+            )
+            scheduler = get_scheduler()
+            started = time.monotonic()
+            response = scheduler.run(
+                'anthropic', model, scheduler.estimate(messages, 'anthropic', model),
+                send=lambda: self._send(model, messages, params),
+                usage_tokens=lambda r: r.usage.input_tokens + r.usage.output_tokens if getattr(r, 'usage', None) else None
             )
+            get_ledger().record('anthropic', model, response, time.monotonic() - started)
             return response.content[0].text
+        except BudgetExceeded:
+            raise
         except Exception as e:
             logging.getLogger(__name__).error(f"Anthropic API error: {e}")
             return None
@@ -243,41 +243,169 @@ class GoogleProvider(AIProvider):
         super().__init__(config)
         if not GOOGLE_AVAILABLE:
             raise ImportError("Google GenerativeAI library not available")
-        api_key = os.getenv('GOOGLE_API_KEY')
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY environment variable not set")
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(self.config.get('model', 'gemini-pro'))
+        self.genai = get_registry().get_client('google', config.get('base_url'))
+        self.model = self.genai.GenerativeModel(self.config.get('model', 'gemini-pro'))
     
     def generate(self, prompt: str) -> Optional[str]:
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.config.get('temperature', 0.7),
-                    max_output_tokens=self.config.get('max_tokens', 4000)
-                )
+            model = self.config.get('model', 'gemini-pro')
+            messages = [{"role": "user", "content": prompt}]
+            params = get_model_registry().request_params(
+                'google', model, messages,
+                max_tokens=self.config.get('max_tokens', 4000), temperature=self.config.get('temperature', 0.7)
             )
+            generation_config = self.genai.types.GenerationConfig(
+                temperature=params.get('temperature'),
+                max_output_tokens=params.get('max_tokens')
+            )
+            scheduler = get_scheduler()
+            started = time.monotonic()
+            response = scheduler.run(
+                'google', model, scheduler.estimate(messages, 'google', model),
+                send=lambda: (self.model.generate_content(prompt, generation_config=generation_config), None),
+                usage_tokens=lambda r: r.usage_metadata.total_token_count if getattr(r, 'usage_metadata', None) else None
+            )
+            get_ledger().record('google', model, response, time.monotonic() - started)
             return response.text
+        except BudgetExceeded:
+            raise
         except Exception as e:
             logging.getLogger(__name__).error(f"Google API error: {e}")
             return None
 
+class FakeProvider(AIProvider):
+    """Deterministic in-process fake model (see fake_llm.py) for load tests"""
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self.llm = FakeLLM(config)
+    
+    def generate(self, prompt: str) -> Optional[str]:
+        try:
+            messages = [{"role": "user", "content": prompt}]
+            model = self.config.get('model', 'fake-model')
+            scheduler = get_scheduler()
+            started = time.monotonic()
+            content, usage, _ = scheduler.run(
+                'fake', model, scheduler.estimate(messages, 'fake', model),
+                send=lambda: (self.llm.complete(messages, model), None),
+                usage_tokens=lambda r: r[1]['prompt_tokens'] + r[1]['completion_tokens']
+            )
+            get_ledger().record('fake', model, usage, time.monotonic() - started)
+            return content
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Fake API error: {e}")
+            return None
+
 def create_ai_provider(config: dict) -> AIProvider:
-    """Create AI provider based on configuration"""
+    """Create AI provider based on configuration (cached per process via the provider registry)"""
     provider_type = config.get('provider', 'openai')
-    
-    if provider_type == 'openai':
-        return OpenAIProvider(config)
-    elif provider_type == 'anthropic':
-        return AnthropicProvider(config)
-    elif provider_type == 'google':
-        return GoogleProvider(config)
-    else:
+    provider_classes = {
+        'openai': OpenAIProvider,
+        'anthropic': AnthropicProvider,
+        'google': GoogleProvider,
+        'fake': FakeProvider,
+    }
+    
+    provider_class = provider_classes.get(provider_type)
+    if provider_class is None:
         raise ValueError(f"Unknown provider: {provider_type}")
+    
+    key = ('consolidator', provider_type, config_key(config))
+    return get_registry().get_provider(key, lambda: provider_class(config))
+
+def tree_settings(settings: Optional[dict] = None) -> dict:
+    merged = dict(DEFAULT_TREE_SETTINGS)
+    merged.update(settings or {})
+    return merged
 
-def consolidate_group(group_key: str, files: List[Path], ai_provider: AIProvider, output_dir: str, verbose: bool = False) -> Optional[str]:
-    """Consolidate multiple whimperized files for a single group"""
+def prompt_token_budget(provider_config: dict, settings: dict) -> Optional[int]:
+    """Largest consolidation prompt one call may send: config cap and/or context window minus output"""
+    registry = get_model_registry()
+    provider = provider_config.get('provider', 'openai')
+    model = provider_config.get('model', '')
+    window = registry.capabilities(provider, model)['context_window']
+    budgets = [settings['max_prompt_tokens']] if settings.get('max_prompt_tokens') else []
+    if window:
+        output = registry.max_output_tokens(provider, model, provider_config.get('max_tokens')) or 0
+        budgets.append(int((window - output) * 0.9))  # Headroom for the rough chars/4 estimate
+    return min(budgets) if budgets else None
+
+def prompt_tokens(contents: List[str]) -> int:
+    return estimate_tokens([{'role': 'user', 'content': create_consolidation_prompt(contents)}])
+
+def plan_fan_in(contents: List[str], budget: int, max_fan_in: int) -> List[List[int]]:
+    """
+    Pack contents (in order) into merge batches of up to max_fan_in whose prompt stays within
+    budget. Batches of one are carried to the next level unmerged.
+    """
+    overhead = prompt_tokens([])
+    sizes = [estimate_tokens([{'role': 'user', 'content': c}]) for c in contents]
+    batches, current, current_tokens = [], [], overhead
+    for index, size in enumerate(sizes):
+        if current and (len(current) >= max_fan_in or current_tokens + size > budget):
+            batches.append(current)
+            current, current_tokens = [], overhead
+        current.append(index)
+        current_tokens += size
+    if current:
+        batches.append(current)
+    return batches
+
+def tree_consolidate(group_key: str, contents: List[str], ai_provider: AIProvider, settings: dict,
+                     budget: Optional[int]) -> Optional[str]:
+    """
+    Reduce contents level by level: each level merges k-ary batches in parallel, so every call
+    stays within the prompt budget and N outputs take O(log N) rounds
+    """
+    logger = logging.getLogger(__name__)
+    budget = budget or FALLBACK_PROMPT_TOKENS
+    max_fan_in = max(2, int(settings['max_fan_in']))
+    level = 0
+    
+    while len(contents) > 1:
+        level += 1
+        batches = plan_fan_in(contents, budget, max_fan_in)
+        if all(len(batch) == 1 for batch in batches):
+            logger.error(f"Group {group_key}: no two outputs fit a {budget:,}-token prompt, cannot tree-consolidate")
+            return None
+        logger.info(f"🌳 Group {group_key} level {level}: {len(contents)} outputs -> {len(batches)} "
+                    f"(fan-in {', '.join(str(len(b)) for b in batches)})")
+        
+        def merge(batch: List[int]) -> Optional[str]:
+            if len(batch) == 1:
+                return contents[batch[0]]
+            return ai_provider.generate(create_consolidation_prompt([contents[i] for i in batch]))
+        
+        # A failed merge fails the group: carrying an unmerged run upward would end up saved
+        # (and cached) as the consolidated output
+        with ThreadPoolExecutor(max_workers=max(1, int(settings['parallel'])), thread_name_prefix='merge') as executor:
+            futures = [submit_with_context(executor, merge, batch) for batch in batches]
+            next_level = []
+            for future, batch in zip(futures, batches):
+                try:
+                    merged = future.result()
+                except BudgetExceeded:
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                except Exception as e:
+                    logger.error(f"Group {group_key} level {level}: merge raised an error: {e}")
+                    merged = None
+                if not merged:
+                    logger.error(f"Group {group_key} level {level}: merge of {len(batch)} outputs failed")
+                    for pending in futures:
+                        pending.cancel()
+                    return None
+                next_level.append(merged)
+        contents = next_level
+    
+    return contents[0] if contents else None
+
+def consolidate_group(group_key: str, files: List[Path], ai_provider: AIProvider, output_dir: str, verbose: bool = False,
+                      tree: Optional[dict] = None) -> Optional[str]:
+    """Consolidate multiple whimperized files for a single group (tree-reduced when needed, see tree_consolidate)"""
     logger = logging.getLogger(__name__)
     
     if len(files) < 2:
@@ -299,15 +427,27 @@ def consolidate_group(group_key: str, files: List[Path], ai_provider: AIProvider
         logger.warning(f"Could not read enough valid content for group {group_key}")
         return None
     
-    # Create consolidation prompt
-    prompt = create_consolidation_prompt(contents)
-    
-    if verbose:
-        logger.debug(f"Consolidation prompt length: {len(prompt)} characters")
-    
-    # Generate consolidated content
-    logger.info(f"🤖 Running AI consolidation for group {group_key}")
-    consolidated_content = ai_provider.generate(prompt)
+    # Tree-reduce when asked to, or when a single prompt with every run would exceed the budget
+    settings = tree_settings(tree)
+    budget = prompt_token_budget(ai_provider.config, settings)
+    try:
+        if settings['enabled'] or (budget and prompt_tokens(contents) > budget):
+            logger.info(f"🌳 Tree-consolidating {len(contents)} outputs for group {group_key} "
+                        f"(budget {budget or FALLBACK_PROMPT_TOKENS:,} tokens per call)")
+            consolidated_content = tree_consolidate(group_key, contents, ai_provider, settings, budget)
+        else:
+            # Create consolidation prompt
+            prompt = create_consolidation_prompt(contents)
+            
+            if verbose:
+                logger.debug(f"Consolidation prompt length: {len(prompt)} characters")
+            
+            # Generate consolidated content
+            logger.info(f"🤖 Running AI consolidation for group {group_key}")
+            consolidated_content = ai_provider.generate(prompt)
+    except BudgetExceeded:
+        logger.warning(f"🛑 Job budget exhausted - group {group_key} not consolidated")
+        return None
     
     if not consolidated_content:
         logger.error(f"Failed to generate consolidated content for group {group_key}")
@@ -321,6 +461,7 @@ def consolidate_group(group_key: str, files: List[Path], ai_provider: AIProvider
     try:
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(consolidated_content)
+        get_catalog(output_dir).register(output_path, group_key, 'consolidated', ai_provider.config.get('model'))
         
         logger.info(f"✅ Saved consolidated content: {output_path}")
         return str(output_path)
@@ -329,6 +470,60 @@ def consolidate_group(group_key: str, files: List[Path], ai_provider: AIProvider
         logger.error(f"Failed to save consolidated content: {e}")
         return None
 
+def is_consolidated(file_path: Path) -> bool:
+    return '-whimperized-consolidated-' in file_path.name
+
+def split_consolidated(files: List[Path]) -> Tuple[List[Path], List[Path]]:
+    """(run outputs, previous consolidated outputs)"""
+    runs = [f for f in files if not is_consolidated(f)]
+    consolidated = [f for f in files if is_consolidated(f)]
+    return runs, consolidated
+
+def is_fresh(files: List[Path]) -> bool:
+    """True when a consolidated output is newer than every run output it could be built from"""
+    runs, consolidated = split_consolidated(files)
+    if not runs or not consolidated:
+        return False
+    return max(f.stat().st_mtime for f in consolidated) > max(f.stat().st_mtime for f in runs)
+
+def consolidate_groups(grouped_files: Dict[str, List[Path]], ai_provider: AIProvider, output_dir: str,
+                       parallel: int = 1, verbose: bool = False,
+                       tree: Optional[dict] = None) -> Dict[str, Optional[str]]:
+    """
+    Consolidate groups on a bounded worker pool. API calls still go through the shared rate
+    limiter, and an exception in one group is logged as that group's failure only.
+    """
+    logger = logging.getLogger(__name__)
+    results: Dict[str, Optional[str]] = {}
+    
+    def run_group(group_key: str, files: List[Path]) -> Optional[str]:
+        admitted, reason = get_governor().admit()
+        if not admitted:
+            logger.warning(f"⏭️ Skipping consolidation of {group_key}: {reason}")
+            return None
+        logger.info(f"\n📋 Processing group: {group_key}")
+        tracer = get_tracer()
+        with call_context(group=group_key, stage='consolidation'), tracer.span(group_key, 'consolidation'), \
+                tracer.profile('consolidation'):
+            return consolidate_group(group_key, files, ai_provider, output_dir, verbose, tree)
+    
+    with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix='consolidate') as executor:
+        # Priority and longest groups first, so a big group doesn't start last and set the finish time
+        order = get_group_scheduler().order(grouped_files, grouped_files, CONSOLIDATION_STAGES)
+        futures = {submit_with_context(executor, run_group, group_key, grouped_files[group_key]): group_key
+                   for group_key in order}
+        for future in as_completed(futures):
+            group_key = futures[future]
+            try:
+                results[group_key] = future.result()
+            except Exception as e:
+                logger.error(f"❌ Group {group_key} raised an error: {e}")
+                results[group_key] = None
+            if not results[group_key]:
+                logger.error(f"Failed to consolidate group {group_key}")
+    
+    return results
+
 def main():
     parser = argparse.ArgumentParser(
         description="Consolidator for Whimperizer - Combine multiple AI outputs into one best version",
@@ -349,6 +544,18 @@ Examples:
   
   # Verbose output
   python consolidator.py --groups zaltz-1a --verbose
+  
+  # Consolidate up to 4 groups at once; groups already consolidated since their last run are skipped
+  python consolidator.py --parallel 4
+  
+  # Re-consolidate everything even if up to date
+  python consolidator.py --parallel 4 --force
+  
+  # Send only the 3 best-scoring, most different runs of each group to the model
+  python consolidator.py --top-k 3
+  
+  # Merge many runs in rounds of 3 (each call sees at most 3 outputs)
+  python consolidator.py --tree --max-fan-in 3
         """
     )
     
@@ -366,6 +573,19 @@ Examples:
                         help='Verbose output')
     parser.add_argument('--dry-run', action='store_true',
                         help='Show what would be done without executing')
+    parser.add_argument('--parallel', type=int, default=1, metavar='N',
+                        help='Consolidate up to N groups concurrently (default: 1)')
+    parser.add_argument('--tree', action='store_true',
+                        help='Tree-reduce: merge outputs in parallel k-ary rounds instead of one big prompt')
+    parser.add_argument('--max-fan-in', type=int, metavar='K',
+                        help='Most outputs merged by one call in tree mode (default: multi_run.consolidation.tree, else 4)')
+    parser.add_argument('--top-k', type=int, metavar='K',
+                        help='Consolidate only the K best-ranked, diverse runs per group '
+                             '(default: multi_run.consolidation.ranking, else 4)')
+    parser.add_argument('--no-ranking', action='store_true',
+                        help='Send every run output to the consolidator (skip local pre-ranking)')
+    parser.add_argument('--force', action='store_true',
+                        help='Consolidate groups even if their consolidated output is newer than every run')
     
     args = parser.parse_args()
     
@@ -437,14 +657,42 @@ Examples:
             logger.error("No whimperized files found")
             sys.exit(1)
         
+        ranking = dict(consolidation_config.get('ranking') or {})
+        if args.no_ranking:
+            ranking['enabled'] = False
+        if args.top_k:
+            ranking['top_k'] = args.top_k
+        
         logger.info(f"Found {len(grouped_files)} group(s) to consolidate:")
-        for group_key, files in grouped_files.items():
-            logger.info(f"  📁 {group_key}: {len(files)} files")
+        up_to_date = []
+        for group_key, files in list(grouped_files.items()):
+            if not args.force and is_fresh(files):
+                up_to_date.append(group_key)
+                del grouped_files[group_key]
+                continue
+            # Earlier consolidated outputs are not examples for the next consolidation
+            grouped_files[group_key], _ = split_consolidated(files)
+            logger.info(f"  📁 {group_key}: {len(grouped_files[group_key])} files")
+            # Local pre-ranking: only the top-K diverse runs go to the model
+            grouped_files[group_key] = select_runs(group_key, grouped_files[group_key], ranking)
+        
+        if up_to_date:
+            logger.info(f"⏭️  Skipping {len(up_to_date)} up-to-date group(s) (use --force to redo): "
+                        f"{', '.join(sorted(up_to_date))}")
+        if not grouped_files:
+            logger.info("🎉 All groups are already consolidated")
+            return 0
     
     if args.dry_run:
         logger.info("[DRY RUN] Would consolidate the above groups")
         sys.exit(0)
     
+    # Client-side RPM/TPM limits for the consolidation model
+    get_model_registry().configure(config.get('api', {}).get('models'))
+    get_scheduler().configure(config.get('api', {}).get('rate_limits'))
+    get_ledger().configure(config.get('usage'))
+    get_group_scheduler().configure(config.get('scheduling'))
+    
     # Create AI provider
     try:
         ai_provider = create_ai_provider(consolidation_config)
@@ -454,24 +702,16 @@ Examples:
         sys.exit(1)
     
     # Consolidate each group
-    successful_consolidations = 0
     total_groups = len(grouped_files)
-    
-    for group_key, files in grouped_files.items():
-        logger.info(f"\n📋 Processing group: {group_key}")
-        
-        result_path = consolidate_group(
-            group_key, 
-            files, 
-            ai_provider, 
-            args.output_dir, 
-            args.verbose
-        )
-        
-        if result_path:
-            successful_consolidations += 1
-        else:
-            logger.error(f"Failed to consolidate group {group_key}")
+    if args.parallel > 1:
+        logger.info(f"⚡ Consolidating {total_groups} group(s), up to {args.parallel} at a time")
+    tree = dict(consolidation_config.get('tree') or {})
+    if args.tree:
+        tree['enabled'] = True
+    if args.max_fan_in:
+        tree['max_fan_in'] = args.max_fan_in
+    results = consolidate_groups(grouped_files, ai_provider, args.output_dir, args.parallel, args.verbose, tree)
+    successful_consolidations = sum(1 for path in results.values() if path)
     
     # Summary
     logger.info(f"\n📊 Consolidation Summary:")
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Fake LLM for Whimperizer
+Deterministic stand-in for a chat model, used by the in-process `fake` provider and by
+fake_openai_server.py. Latency follows a configurable distribution plus output-token throughput,
+and failures / 429s are injected at configurable rates. Every random draw is seeded from the
+request content and how many times that request has been seen, so a given workload replays
+identically regardless of thread scheduling.
+"""
+
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_FAKE_SETTINGS = {
+    'seed': 42,
+    'latency': {
+        'distribution': 'lognormal',  # fixed | uniform | normal | lognormal
+        'mean': 1.0,                  # Seconds (median for lognormal)
+        'stddev': 0.5,                # normal: seconds; lognormal: sigma of the underlying normal
+        'min': 0.0,
+        'max': 60.0,
+    },
+    'tokens_per_second': 0,           # Output throughput; 0 = output time not simulated
+    'output_tokens': 800,             # Approximate length of each response
+    'failure_rate': 0.0,              # Share of calls that fail with a server error
+    'rate_limit_rate': 0.0,           # Share of calls that return 429
+    'retry_after_seconds': 1.0,       # retry-after sent with injected 429s
+    'time_scale': 1.0,                # Multiply every simulated delay (0 = no sleeping at all)
+}
+
+CHARS_PER_TOKEN = 4
+
+
+class FakeServerError(Exception):
+    """Injected 5xx-style failure"""
+    status_code = 500
+
+
+class FakeRateLimitError(Exception):
+    """Injected 429; carries retry-after the way SDK errors do (error.response.headers)"""
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.response = type('FakeResponse', (), {'headers': {'retry-after': f"{retry_after:g}"}})()
+
+
+def merge_settings(settings: Optional[dict]) -> dict:
+    merged = dict(DEFAULT_FAKE_SETTINGS)
+    merged['latency'] = dict(DEFAULT_FAKE_SETTINGS['latency'])
+    for key, value in (settings or {}).items():
+        if key == 'latency' and isinstance(value, dict):
+            merged['latency'].update(value)
+        elif key in DEFAULT_FAKE_SETTINGS:
+            merged[key] = value
+    return merged
+
+
+def fake_completion_text(messages: List[Dict], model: str, output_tokens: int = 0) -> str:
+    """Deterministic diary-style response derived from the request content"""
+    last_message = messages[-1]['content'] if messages else ''
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode('utf-8')).hexdigest()
+    text = (
+        f"## Monday\n\n"
+        f"Dear diary, this is a fake response from {model}.\n\n"
+        f"\"The last message was {len(last_message):,} characters long,\" I said.\n\n"
+        f"Request fingerprint: {digest[:16]}\n"
+    )
+    filler = "Mom says the whole thing was a Learning Experience, which is what she says when stuff goes wrong. "
+    target_chars = output_tokens * CHARS_PER_TOKEN
+    if len(text) < target_chars:
+        text += "\n" + filler * math.ceil((target_chars - len(text)) / len(filler))
+    return text
+
+
+class FakeLLM:
+    """Thread-safe fake model with latency/failure injection and call statistics"""
+
+    def __init__(self, settings: Optional[dict] = None):
+        self.settings = merge_settings(settings)
+        self._lock = threading.Lock()
+        self._seen: Dict[str, int] = defaultdict(int)
+        self.stats = {'calls': 0, 'failures': 0, 'rate_limited': 0, 'simulated_seconds': 0.0}
+
+    def _rng(self, messages: List[Dict], model: str) -> random.Random:
+        key = hashlib.sha256(json.dumps([model, messages], sort_keys=True).encode('utf-8')).hexdigest()
+        with self._lock:
+            attempt = self._seen[key]
+            self._seen[key] += 1
+        return random.Random(f"{self.settings['seed']}:{key}:{attempt}")
+
+    def sample_latency(self, rng: random.Random, completion_tokens: int = 0) -> float:
+        latency = self.settings['latency']
+        distribution = latency.get('distribution', 'fixed')
+        mean = float(latency.get('mean', 0))
+        stddev = float(latency.get('stddev', 0))
+        if distribution == 'uniform':
+            value = rng.uniform(max(0.0, mean - stddev), mean + stddev)
+        elif distribution == 'normal':
+            value = rng.gauss(mean, stddev)
+        elif distribution == 'lognormal':
+            value = mean * math.exp(rng.gauss(0, stddev)) if mean > 0 else 0.0
+        else:
+            value = mean
+        value = min(max(value, float(latency.get('min', 0))), float(latency.get('max', value)))
+        if self.settings['tokens_per_second']:
+            value += completion_tokens / float(self.settings['tokens_per_second'])
+        return value * float(self.settings['time_scale'])
+
+    def complete(self, messages: List[Dict], model: str, sleep: bool = True) -> Tuple[str, Dict[str, int], float]:
+        """
+        Return (text, usage, simulated_latency), sleeping for the latency unless sleep=False.
+        Raises FakeRateLimitError / FakeServerError at the configured rates (after the latency).
+        """
+        rng = self._rng(messages, model)
+        roll = rng.random()
+        text = fake_completion_text(messages, model, int(self.settings['output_tokens']))
+        usage = {
+            'prompt_tokens': sum(len(m.get('content') or '') for m in messages) // CHARS_PER_TOKEN,
+            'completion_tokens': len(text) // CHARS_PER_TOKEN,
+        }
+
+        rate_limited = roll < self.settings['rate_limit_rate']
+        failed = not rate_limited and roll < self.settings['rate_limit_rate'] + self.settings['failure_rate']
+        latency = self.sample_latency(rng, 0 if (rate_limited or failed) else usage['completion_tokens'])
+        if rate_limited:
+            latency = min(latency, 0.05 * float(self.settings['time_scale']))  # 429s come back fast
+
+        with self._lock:
+            self.stats['calls'] += 1
+            self.stats['simulated_seconds'] += latency
+            if rate_limited:
+                self.stats['rate_limited'] += 1
+            elif failed:
+                self.stats['failures'] += 1
+
+        if sleep and latency > 0:
+            time.sleep(latency)
+        if rate_limited:
+            raise FakeRateLimitError("Rate limit reached (injected by fake LLM)", self.settings['retry_after_seconds'])
+        if failed:
+            raise FakeServerError("Internal server error (injected by fake LLM)")
+        return text, usage, latency
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI-compatible Server for Whimperizer
+Local stand-in for the OpenAI Chat Completions, Files and Batch endpoints so the pipeline and
+batch mode can be exercised (and load-tested) without paying for real API calls.
+Responses are deterministic; latency, throughput, failures and 429s come from fake_llm.py.
+
+Usage:
+  python fake_openai_server.py --port 8765 --batch-delay 2
+  python fake_openai_server.py --latency-mean 3 --latency-dist lognormal --rate-limit-rate 0.05
+
+Then point the openai provider at it in config.yaml:
+  base_url: "http://127.0.0.1:8765/v1"
+"""
+
+import json
+import time
+import argparse
+import threading
+import email.parser
+import email.policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from fake_llm import FakeLLM, FakeRateLimitError, FakeServerError, fake_completion_text
+
+
+def chat_completion_body(request_body: dict, request_id: str, content: Optional[str] = None,
+                         usage: Optional[Dict[str, int]] = None) -> dict:
+    messages = request_body.get('messages', [])
+    model = request_body.get('model', 'fake-model')
+    if content is None:
+        content = fake_completion_text(messages, model)
+    prompt_tokens = (usage or {}).get('prompt_tokens', sum(len(m.get('content') or '') for m in messages) // 4)
+    completion_tokens = (usage or {}).get('completion_tokens', len(content) // 4)
+    return {
+        'id': f"chatcmpl-{request_id}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop',
+        }],
+        'usage': {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class FakeOpenAIState:
+    """In-memory files and batches plus the fake model serving chat completions"""
+
+    def __init__(self, batch_delay: float = 1.0, fake_settings: Optional[dict] = None):
+        self.batch_delay = batch_delay
+        self.llm = FakeLLM(fake_settings)
+        self.lock = threading.Lock()
+        self.files: Dict[str, dict] = {}
+        self.batches: Dict[str, dict] = {}
+        self.counter = 0
+
+    def next_id(self, prefix: str) -> str:
+        with self.lock:
+            self.counter += 1
+            return f"{prefix}-{self.counter:06d}"
+
+    def add_file(self, filename: str, content: bytes, purpose: str) -> dict:
+        file_id = self.next_id('file')
+        record = {
+            'id': file_id,
+            'object': 'file',
+            'bytes': len(content),
+            'created_at': int(time.time()),
+            'filename': filename,
+            'purpose': purpose,
+            'status': 'processed',
+        }
+        self.files[file_id] = {'meta': record, 'content': content}
+        return record
+
+    def create_batch(self, body: dict) -> dict:
+        batch_id = self.next_id('batch')
+        batch = {
+            'id': batch_id,
+            'object': 'batch',
+            'endpoint': body.get('endpoint', '/v1/chat/completions'),
+            'input_file_id': body['input_file_id'],
+            'completion_window': body.get('completion_window', '24h'),
+            'status': 'in_progress',
+            'created_at': int(time.time()),
+            'output_file_id': None,
+            'error_file_id': None,
+            'request_counts': {'total': 0, 'completed': 0, 'failed': 0},
+        }
+        self.batches[batch_id] = batch
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[dict]:
+        batch = self.batches.get(batch_id)
+        if batch and batch['status'] == 'in_progress' and time.time() - batch['created_at'] >= self.batch_delay:
+            self.complete_batch(batch)
+        return batch
+
+    def complete_batch(self, batch: dict):
+        input_lines = self.files[batch['input_file_id']]['content'].decode('utf-8').splitlines()
+        output_lines = []
+        for line in input_lines:
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            request_id = self.next_id('req')
+            output_lines.append(json.dumps({
+                'id': request_id,
+                'custom_id': request['custom_id'],
+                'response': {
+                    'status_code': 200,
+                    'request_id': request_id,
+                    'body': chat_completion_body(request['body'], request_id),
+                },
+                'error': None,
+            }))
+        output = self.add_file('batch_output.jsonl', '\n'.join(output_lines).encode('utf-8'), 'batch_output')
+        batch['status'] = 'completed'
+        batch['output_file_id'] = output['id']
+        batch['completed_at'] = int(time.time())
+        batch['request_counts'] = {'total': len(output_lines), 'completed': len(output_lines), 'failed': 0}
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    state: FakeOpenAIState = None  # Set by make_server
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+    def send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str):
+        self.send_json({'error': {'message': message, 'type': 'invalid_request_error', 'code': None}}, status)
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_POST(self):
+        path = self.path.split('?')[0].rstrip('/')
+        body = self.read_body()
+
+        if path == '/v1/chat/completions':
+            return self.chat_completion(json.loads(body or b'{}'))
+
+        if path == '/v1/files':
+            filename, content, purpose = self.parse_upload(body)
+            return self.send_json(self.state.add_file(filename, content, purpose))
+
+        if path == '/v1/batches':
+            request = json.loads(body or b'{}')
+            if request.get('input_file_id') not in self.state.files:
+                return self.send_error_json(404, f"No such file: {request.get('input_file_id')}")
+            return self.send_json(self.state.create_batch(request))
+
+        self.send_error_json(404, f"Unknown endpoint: POST {path}")
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        parts = path.split('/')
+
+        if len(parts) == 4 and parts[2] == 'batches':
+            batch = self.state.get_batch(parts[3])
+            if batch is None:
+                return self.send_error_json(404, f"No such batch: {parts[3]}")
+            return self.send_json(batch)
+
+        if len(parts) >= 4 and parts[2] == 'files':
+            record = self.state.files.get(parts[3])
+            if record is None:
+                return self.send_error_json(404, f"No such file: {parts[3]}")
+            if len(parts) == 5 and parts[4] == 'content':
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(len(record['content'])))
+                self.end_headers()
+                self.wfile.write(record['content'])
+                return
+            return self.send_json(record['meta'])
+
+        self.send_error_json(404, f"Unknown endpoint: GET {path}")
+
+    def chat_completion(self, request: dict):
+        messages = request.get('messages', [])
+        model = request.get('model', 'fake-model')
+        try:
+            content, usage, _ = self.state.llm.complete(messages, model)
+        except FakeRateLimitError as e:
+            body = json.dumps({'error': {'message': str(e), 'type': 'rate_limit_error',
+                                         'code': 'rate_limit_exceeded'}}).encode('utf-8')
+            self.send_response(429)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in e.response.headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        except FakeServerError as e:
+            return self.send_json({'error': {'message': str(e), 'type': 'server_error', 'code': None}}, 500)
+        self.send_json(chat_completion_body(request, self.state.next_id('req'), content, usage))
+
+    def parse_upload(self, body: bytes):
+        """Extract file + purpose from a multipart/form-data upload"""
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode('utf-8')
+        message = email.parser.BytesParser(policy=email.policy.default).parsebytes(header + body)
+        filename, content, purpose = 'upload.jsonl', b'', 'batch'
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if name == 'file':
+                filename = part.get_filename() or filename
+                content = part.get_payload(decode=True) or b''
+            elif name == 'purpose':
+                purpose = part.get_content().strip()
+        return filename, content, purpose
+
+
+def make_server(host: str = '127.0.0.1', port: int = 8765, batch_delay: float = 1.0,
+                fake_settings: Optional[dict] = None) -> ThreadingHTTPServer:
+    """Create (but do not start) a fake server; port 0 picks a free port"""
+    state = FakeOpenAIState(batch_delay, fake_settings)
+    handler = type('BoundFakeOpenAIHandler', (FakeOpenAIHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def add_fake_llm_arguments(parser: argparse.ArgumentParser):
+    """Latency/failure flags shared with benchmark_whimperizer.py"""
+    parser.add_argument('--latency-dist', choices=['fixed', 'uniform', 'normal', 'lognormal'], default='lognormal',
+                        help='Latency distribution (default: lognormal)')
+    parser.add_argument('--latency-mean', type=float, default=1.0,
+                        help='Mean latency in seconds (median for lognormal, default: 1.0)')
+    parser.add_argument('--latency-stddev', type=float, default=0.5,
+                        help='Latency spread (seconds; sigma for lognormal, default: 0.5)')
+    parser.add_argument('--tokens-per-second', type=float, default=0,
+                        help='Simulated output throughput; 0 disables (default: 0)')
+    parser.add_argument('--output-tokens', type=int, default=800, help='Approximate response length (default: 800)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Share of calls returning 500 (default: 0)')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of calls returning 429 (default: 0)')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='retry-after for injected 429s (default: 1)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+
+
+def fake_settings_from_args(args) -> dict:
+    return {
+        'seed': args.seed,
+        'latency': {'distribution': args.latency_dist, 'mean': args.latency_mean, 'stddev': args.latency_stddev},
+        'tokens_per_second': args.tokens_per_second,
+        'output_tokens': args.output_tokens,
+        'failure_rate': args.failure_rate,
+        'rate_limit_rate': args.rate_limit_rate,
+        'retry_after_seconds': args.retry_after,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server for local testing and load tests")
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port (default: 8765)')
+    parser.add_argument('--batch-delay', type=float, default=1.0,
+                        help='Seconds before a submitted batch reports completed (default: 1.0)')
+    add_fake_llm_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.batch_delay, fake_settings_from_args(args))
+    print(f"🧪 Fake OpenAI server listening on http://{args.host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Per-Group Streaming Pipeline for Whimperizer
+`pipeline.py --engine per-group`: every group1-group2 moves through download -> whimperize
+(+ consolidate) -> PDF on its own as soon as its inputs are complete. Stages are worker pools
+connected by bounded queues, so the first PDF arrives after one group's latency and a slow
+stage applies back-pressure instead of letting finished work pile up.
+"""
+
+import time
+import queue
+import random
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from build_cache import download_inputs, get_build_cache, input_files_by_group
+from call_context import call_context
+from config_loader import load_config
+from group_scheduler import WHIMPERIZE_STAGES, configure_scheduling
+from tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+# pipeline.streaming in config.yaml; --*-workers / --queue-size override
+DEFAULT_STREAM_SETTINGS = {
+    'download_workers': 1,     # Keep low: each worker hits the site with its own delay
+    'whimperize_workers': 2,
+    'pdf_workers': 1,
+    'queue_size': 2,           # Groups allowed to wait between two stages
+}
+
+_STOP = object()
+
+
+@dataclass
+class GroupItem:
+    """One group travelling through the stages"""
+    group_key: str
+    urls: List[dict] = field(default_factory=list)
+    final_file: Optional[Path] = None
+    mode: Optional[str] = None
+    pdf: Optional[Path] = None
+    error: Optional[str] = None
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+
+
+class Stage:
+    """A pool of worker threads taking items from a bounded inbox and passing them on"""
+
+    def __init__(self, name: str, handle: Callable[[GroupItem, Any], None], workers: int,
+                 inbox: queue.Queue, outbox: Optional[queue.Queue] = None,
+                 setup: Optional[Callable[[], Any]] = None, teardown: Optional[Callable[[Any], None]] = None,
+                 on_success: Optional[Callable[[GroupItem], None]] = None):
+        self.name = name
+        self.handle = handle
+        self.workers = max(1, workers)
+        self.inbox = inbox
+        self.outbox = outbox
+        self.setup = setup
+        self.teardown = teardown
+        self.on_success = on_success
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"{self.name}_{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        resource = None
+        try:
+            resource = self.setup() if self.setup else None
+        except Exception as e:
+            logger.error(f"❌ {self.name} worker could not start: {e}")
+        try:
+            while True:
+                item = self.inbox.get()
+                if item is _STOP:
+                    return
+                if self.setup and resource is None:
+                    self._fail(item, f"{self.name} worker is unavailable")
+                    continue
+                started = time.perf_counter()
+                try:
+                    with call_context(group=item.group_key, stage=self.name), get_tracer().span(self.name, 'stage'):
+                        self.handle(item, resource)
+                except Exception as e:
+                    self._fail(item, f"{self.name}: {e}")
+                    continue
+                finally:
+                    seconds = time.perf_counter() - started
+                    item.stage_seconds[self.name] = round(seconds, 2)
+                    with self._lock:
+                        self.busy_seconds += seconds
+                if self.outbox is not None:
+                    self.outbox.put(item)  # Blocks while the next stage is saturated
+                elif self.on_success:
+                    self.on_success(item)
+        finally:
+            if resource is not None and self.teardown:
+                self.teardown(resource)
+
+    def _fail(self, item: GroupItem, error: str):
+        item.error = error
+        logger.error(f"❌ Group {item.group_key} failed in {error}")
+
+    def close(self):
+        """Wait for every queued item, then stop the workers"""
+        for _ in self._threads:
+            self.inbox.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+
+
+def stream_settings(config: dict, args) -> dict:
+    """Defaults < config < CLI flags"""
+    settings = dict(DEFAULT_STREAM_SETTINGS)
+    settings.update((config.get('pipeline') or {}).get('streaming') or {})
+    for key in DEFAULT_STREAM_SETTINGS:
+        value = getattr(args, key, None)
+        if value is not None:
+            settings[key] = value
+    return settings
+
+
+def url_groups(args) -> Dict[str, List[dict]]:
+    """URL rows from the CSV, grouped by group1-group2 in file order"""
+    from bulk_downloader import BulkHTMLDownloader
+    grouped: Dict[str, List[dict]] = OrderedDict()
+    for row in BulkHTMLDownloader(args.urls, args.download_dir).read_csv_urls():
+        group_key = f"{row['group1']}-{row['group2']}"
+        if not args.groups or group_key in args.groups:
+            grouped.setdefault(group_key, []).append(row)
+    return grouped
+
+
+def input_groups(args) -> List[str]:
+    """Groups that already have downloaded inputs (--skip-download)"""
+    return sorted(input_files_by_group(args.download_dir, args.groups))
+
+
+def make_downloader(args):
+    if args.downloader == 'basic':
+        from bulk_downloader import BulkHTMLDownloader
+        return BulkHTMLDownloader(args.urls, args.download_dir, args.download_delay)
+    from selenium_downloader import BulkHTMLDownloaderSelenium
+    downloader = BulkHTMLDownloaderSelenium(args.urls, args.download_dir, args.download_delay, args.headless)
+    return downloader if downloader.setup_driver() else None
+
+
+def close_downloader(downloader):
+    if getattr(downloader, 'driver', None):
+        downloader.driver.quit()
+
+
+def download_group(item: GroupItem, downloader, args) -> None:
+    """Fetch and save every URL of one group (the downloader's own politeness delay applies)"""
+    cache = get_build_cache()
+    inputs = download_inputs(item.urls, args.downloader, 'txt')
+    if cache.lookup('download', item.group_key, inputs):
+        return
+    extracted = []
+    for i, url_data in enumerate(item.urls):
+        with get_tracer().span('fetch', 'download', url=url_data['url']):
+            html = downloader.download_html(url_data['url'])
+        if html:
+            extracted.append(downloader.extract_content(html, url_data))
+        if i < len(item.urls) - 1:
+            time.sleep(downloader.delay + random.uniform(0.2, 0.8))
+    saved = [entry for entry in extracted if entry['status'] == 'success']
+    if not saved:
+        raise RuntimeError(f"none of {len(item.urls)} URL(s) downloaded")
+    downloader.save_as_individual_txt(extracted)
+    cache.record('download', item.group_key, inputs,
+                 [Path(args.download_dir) / downloader.create_filename(entry, 'txt') for entry in saved])
+
+
+def whimperize_group(item: GroupItem, args, config: dict) -> None:
+    from pipeline_graph import consolidate_stage, whimperize_stage
+    final = consolidate_stage(args, config, whimperize_stage(args, config, [item.group_key]))
+    item.final_file, item.mode = final.files[item.group_key]
+
+
+def make_pdf_generator(args):
+    from wimpy_pdf_generator import WimpyPDFGenerator, load_reportlab
+    load_reportlab()  # Fail in setup, not on the first group
+    return WimpyPDFGenerator(args.resources_dir, args.config)
+
+
+def render_group(item: GroupItem, generator, args, config: dict) -> None:
+    from pipeline_graph import render_group_pdf
+    item.pdf = render_group_pdf(args, config, generator, args.pdf_style, item.group_key, item.final_file, item.mode)
+
+
+def run_group_pipeline(args) -> bool:
+    """pipeline.py --engine per-group entry point; returns True when every group finished"""
+    from pipeline import find_best_whimperized_files
+    from pipeline_graph import group_key_for, stage_dirs_overlay
+
+    config = load_config(args.config, [stage_dirs_overlay(args)])
+    settings = stream_settings(config, args)
+
+    # Seed items for the first stage that will run
+    if not args.skip_download:
+        items = [GroupItem(group_key, urls=rows) for group_key, rows in url_groups(args).items()]
+    elif not args.skip_whimperize:
+        items = [GroupItem(group_key) for group_key in input_groups(args)]
+    else:
+        items = [GroupItem(group_key_for(path), final_file=path, mode=mode)
+                 for path, mode in find_best_whimperized_files(args.whimper_dir, args.groups)]
+
+    # Priority groups enter first, then the longest, so the biggest group doesn't set the finish time
+    if args.skip_whimperize:
+        files, stages = {item.group_key: [item.final_file] for item in items}, ()
+    else:
+        files, stages = input_files_by_group(config['processing']['input_dir'], args.groups), WHIMPERIZE_STAGES
+    by_key = {item.group_key: item for item in items}
+    items = [by_key[group_key] for group_key in configure_scheduling(config).order(by_key, files, stages)]
+
+    stage_names = [name for name, skipped in (('download', args.skip_download),
+                                              ('whimperize', args.skip_whimperize),
+                                              ('pdf', args.skip_pdf)) if not skipped]
+    print(f"🚰 Per-group pipeline: {len(items)} group(s) through {' -> '.join(stage_names) or 'nothing'} "
+          f"(workers: " + ', '.join(f"{name} {settings[f'{name}_workers']}" for name in stage_names)
+          + f"; queue size {settings['queue_size']})")
+    if args.dry_run or not items or not stage_names:
+        return bool(items) or args.dry_run
+
+    started = time.perf_counter()
+    first_done: List[float] = []
+    done_lock = threading.Lock()
+
+    def finished(item: GroupItem):
+        with done_lock:
+            elapsed = time.perf_counter() - started
+            first_done.append(elapsed)
+            what = f"PDF {item.pdf.name}" if item.pdf else f"{item.mode} text {item.final_file.name}"
+            print(f"✅ {item.group_key}: {what} ready after {elapsed:.1f}s")
+
+    # One bounded inbox per stage; the last stage reports each finished group
+    queues = [queue.Queue(maxsize=max(1, settings['queue_size'])) for _ in stage_names]
+    handlers = {
+        'download': dict(handle=lambda item, downloader: download_group(item, downloader, args), setup=lambda: make_downloader(args), teardown=close_downloader),
+        'whimperize': dict(handle=lambda item, _: whimperize_group(item, args, config)),
+        'pdf': dict(handle=lambda item, generator: render_group(item, generator, args, config),
+                    setup=lambda: make_pdf_generator(args)),
+    }
+    stages = []
+    for i, name in enumerate(stage_names):
+        last = i == len(stage_names) - 1
+        stages.append(Stage(name, workers=settings[f'{name}_workers'], inbox=queues[i],
+                            outbox=None if last else queues[i + 1], on_success=finished if last else None,
+                            **handlers[name]))
+    for stage in stages:
+        stage.start()
+
+    for item in items:
+        queues[0].put(item)
+    for stage in stages:
+        stage.close()  # In order: a stage only stops once everything upstream has drained into it
+
+    elapsed = time.perf_counter() - started
+    failed = [item for item in items if item.error]
+    print(f"\n📊 Per-group summary ({elapsed:.1f}s):")
+    if first_done:
+        print(f"   First group ready after {first_done[0]:.1f}s")
+    for stage in stages:
+        print(f"   {stage.name:<11} {stage.workers} worker(s), busy {stage.busy_seconds:.1f}s")
+    for item in items:
+        timings = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in item.stage_seconds.items())
+        outcome = f"❌ {item.error}" if item.error else '✅'
+        print(f"   📁 {item.group_key}: {outcome} ({timings})")
+    return not failed
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Group Scheduler for Whimperizer
+Decides the order in which groups start. Priority groups (--priority, scheduling.priority) go
+first; the rest start longest-first (LPT), so with parallel workers the big groups don't end up
+last and set the makespan. A group's cost comes from its past API latency in the usage ledger,
+or from its file count and size, calibrated against groups that do have history.
+"""
+
+import os
+import logging
+from fnmatch import fnmatch
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from usage_ledger import get_ledger
+
+# scheduling in config.yaml
+DEFAULT_SCHEDULING_SETTINGS = {
+    'order': 'longest-first',   # or 'input' (discovery order; priorities still apply)
+    'priority': [],             # Group keys or patterns (zaltz-1*) started first, in this order
+    'seconds_per_call': 5.0,    # Cost model until the ledger has history: per input file...
+    'chars_per_second': 400.0,  # ...plus the time to rewrite its text
+}
+ORDERS = ('longest-first', 'input')
+
+# Ledger stages that make up a whimperize pass and a consolidation
+WHIMPERIZE_STAGES = ('normal', 'iterative')
+CONSOLIDATION_STAGES = ('consolidation',)
+
+# pipeline.py --priority reaches child processes through this variable (comma separated)
+PRIORITY_ENV = 'WHIMPERIZER_PRIORITY'
+
+
+def group_size(files: Optional[Iterable[Any]]) -> tuple:
+    """(file count, bytes) for a list of paths or whimperizer file_info dicts"""
+    count, size = 0, 0
+    for entry in files or []:
+        path = Path(entry['path'] if isinstance(entry, dict) else entry)
+        count += 1
+        try:
+            size += path.stat().st_size
+        except OSError:
+            pass
+    return count, size
+
+
+class GroupScheduler:
+    """Process-wide group ordering policy"""
+
+    def __init__(self):
+        self.settings = dict(DEFAULT_SCHEDULING_SETTINGS)
+        self.pinned: List[str] = [p for p in os.environ.get(PRIORITY_ENV, '').split(',') if p]
+        self.logger = logging.getLogger('whimperizer.scheduler')
+
+    def configure(self, settings: Optional[dict]):
+        """Apply config.yaml scheduling settings (command-line priorities are kept)"""
+        self.settings = dict(DEFAULT_SCHEDULING_SETTINGS)
+        self.settings.update({k: v for k, v in (settings or {}).items() if v is not None})
+        if self.settings['order'] not in ORDERS:
+            self.logger.warning(f"Unknown scheduling.order '{self.settings['order']}', using longest-first")
+            self.settings['order'] = 'longest-first'
+
+    def pin(self, patterns: Optional[Sequence[str]], export: bool = False):
+        """Command-line priorities, ahead of scheduling.priority; export hands them to child processes"""
+        self.pinned = list(patterns or [])
+        if export and self.pinned:
+            os.environ[PRIORITY_ENV] = ','.join(self.pinned)
+
+    @property
+    def priorities(self) -> List[str]:
+        return self.pinned + [p for p in self.settings['priority'] or [] if p not in self.pinned]
+
+    def priority_rank(self, group_key: str) -> Optional[int]:
+        """Index of the first priority pattern the group matches (None: not a priority group)"""
+        for rank, pattern in enumerate(self.priorities):
+            if group_key == pattern or fnmatch(group_key, pattern):
+                return rank
+        return None
+
+    def estimates(self, files: Mapping[str, Any], stages: Sequence[str] = WHIMPERIZE_STAGES) -> Dict[str, float]:
+        """Expected seconds per group: ledger history when there is some, else the calibrated size model"""
+        base = {}
+        for group_key, group_files in files.items():
+            count, size = group_size(group_files)
+            base[group_key] = count * self.settings['seconds_per_call'] + size / self.settings['chars_per_second']
+
+        history = {}
+        if stages:
+            try:
+                history = get_ledger().group_latency(stages)
+            except Exception as e:
+                self.logger.debug(f"No latency history from the usage ledger: {e}")
+        # Scale the size model so groups without history are comparable to those with it
+        ratios = [history[g] / base[g] for g in base if g in history and base[g] > 0]
+        scale = median(ratios) if ratios else 1.0
+        return {g: history.get(g, base[g] * scale) for g in base}
+
+    def order(self, group_keys: Iterable[str], files: Optional[Mapping[str, Any]] = None,
+              stages: Sequence[str] = WHIMPERIZE_STAGES) -> List[str]:
+        """Priority groups first (in priority order), then the rest longest-first (or in input order)"""
+        keys = list(group_keys)
+        position = {key: i for i, key in enumerate(keys)}
+        cost = {}
+        if self.settings['order'] == 'longest-first':
+            cost = self.estimates({key: (files or {}).get(key) for key in keys}, stages)
+
+        def rank(key):
+            priority = self.priority_rank(key)
+            return (priority is None, priority or 0, -cost.get(key, 0.0), position[key])
+
+        ordered = sorted(keys, key=rank)
+        if ordered != keys:
+            self.logger.info("Group order: " + ', '.join(
+                f"{key} (~{cost[key]:.0f}s)" if key in cost else key for key in ordered))
+        return ordered
+
+
+def configure_scheduling(config: dict) -> GroupScheduler:
+    """Scheduler settings plus the ledger its latency history comes from"""
+    get_ledger().configure(config.get('usage'))
+    _scheduler.configure(config.get('scheduling'))
+    return _scheduler
+
+
+_scheduler = GroupScheduler()
+
+
+def get_group_scheduler() -> GroupScheduler:
+    """Return the process-wide group scheduler"""
+    return _scheduler
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Model Capability Registry for Whimperizer
+One table of what each model accepts - context window, max output tokens, which token-limit
+parameter it takes, temperature/streaming/batch support, and RPM/TPM limits - so requests are
+validated and shaped before they are sent instead of failing after a round trip.
+config.yaml api.models entries override or extend the built-in table.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional
+
+# Rough characters-per-token ratio used to estimate request size before sending
+CHARS_PER_TOKEN = 4
+
+# Used for any field a model entry does not set (and for unknown models)
+DEFAULT_CAPABILITIES = {
+    'context_window': None,         # Total tokens (prompt + output); None = unknown, not checked
+    'max_output_tokens': None,      # Largest accepted max-tokens value; None = not checked
+    'token_param': 'max_tokens',    # OpenAI reasoning models take max_completion_tokens instead
+    'supports_temperature': True,
+    'supports_streaming': True,
+    'supports_batch': False,
+    'rpm': None,
+    'tpm': None,
+}
+
+# Built-in capabilities. Keys are matched exactly, then by longest prefix (dated model names).
+BUILTIN_MODELS = {
+    # OpenAI chat models
+    'openai/gpt-4.1': {'context_window': 1047576, 'max_output_tokens': 32768, 'supports_batch': True},
+    'openai/gpt-4.1-mini': {'context_window': 1047576, 'max_output_tokens': 32768, 'supports_batch': True},
+    'openai/gpt-4o': {'context_window': 128000, 'max_output_tokens': 16384, 'supports_batch': True},
+    'openai/gpt-4o-mini': {'context_window': 128000, 'max_output_tokens': 16384, 'supports_batch': True},
+    'openai/gpt-4-turbo': {'context_window': 128000, 'max_output_tokens': 4096, 'supports_batch': True},
+    'openai/gpt-4': {'context_window': 8192, 'max_output_tokens': 8192, 'supports_batch': True},
+    'openai/gpt-3.5-turbo': {'context_window': 16385, 'max_output_tokens': 4096, 'supports_batch': True},
+    # OpenAI reasoning models: max_completion_tokens, fixed temperature
+    'openai/o1': {'context_window': 200000, 'max_output_tokens': 100000, 'token_param': 'max_completion_tokens',
+                  'supports_temperature': False, 'supports_batch': True},
+    'openai/o1-mini': {'context_window': 128000, 'max_output_tokens': 65536,
+                       'token_param': 'max_completion_tokens', 'supports_temperature': False,
+                       'supports_batch': True},
+    'openai/o1-preview': {'context_window': 128000, 'max_output_tokens': 32768,
+                          'token_param': 'max_completion_tokens', 'supports_temperature': False,
+                          'supports_streaming': False, 'supports_batch': True},
+    'openai/o3': {'context_window': 200000, 'max_output_tokens': 100000, 'token_param': 'max_completion_tokens',
+                  'supports_temperature': False, 'supports_batch': True},
+    'openai/o3-mini': {'context_window': 200000, 'max_output_tokens': 100000,
+                       'token_param': 'max_completion_tokens', 'supports_temperature': False,
+                       'supports_batch': True},
+    'openai/o4-mini': {'context_window': 200000, 'max_output_tokens': 100000,
+                       'token_param': 'max_completion_tokens', 'supports_temperature': False,
+                       'supports_batch': True},
+    # Anthropic
+    'anthropic/claude-3-opus': {'context_window': 200000, 'max_output_tokens': 4096, 'supports_batch': True},
+    'anthropic/claude-3-sonnet': {'context_window': 200000, 'max_output_tokens': 4096, 'supports_batch': True},
+    'anthropic/claude-3-haiku': {'context_window': 200000, 'max_output_tokens': 4096, 'supports_batch': True},
+    'anthropic/claude-3-5-sonnet': {'context_window': 200000, 'max_output_tokens': 8192, 'supports_batch': True},
+    'anthropic/claude-3-5-haiku': {'context_window': 200000, 'max_output_tokens': 8192, 'supports_batch': True},
+    'anthropic/claude-3-7-sonnet': {'context_window': 200000, 'max_output_tokens': 64000, 'supports_batch': True},
+    # Google
+    'google/gemini-pro': {'context_window': 32760, 'max_output_tokens': 8192},
+    'google/gemini-1.5-pro': {'context_window': 2097152, 'max_output_tokens': 8192},
+    'google/gemini-1.5-flash': {'context_window': 1048576, 'max_output_tokens': 8192},
+}
+
+
+class RequestValidationError(ValueError):
+    """The request would be rejected by the API for this model; raised before anything is sent"""
+
+
+def estimate_tokens(messages: List[Dict], expected_output_tokens: int = 0) -> int:
+    """Cheap pre-send token estimate for a chat message list"""
+    chars = sum(len(msg.get('content') or '') for msg in messages)
+    return chars // CHARS_PER_TOKEN + 4 * len(messages) + expected_output_tokens
+
+
+def _dash_prefix(name: str, prefix: str) -> bool:
+    return name.startswith(prefix + '-')
+
+
+class ModelRegistry:
+    """Process-wide capability lookup shared by the providers, batch runner and rate limiter"""
+
+    def __init__(self, models: Optional[Dict[str, dict]] = None):
+        self._lock = threading.Lock()
+        self._models: Dict[str, dict] = {k: dict(v) for k, v in BUILTIN_MODELS.items()}
+        self._warned = set()
+        self.logger = logging.getLogger('whimperizer.models')
+        self.configure(models)
+
+    def configure(self, models: Optional[Dict[str, dict]]):
+        """Merge config.yaml api.models entries ('provider/model' or bare model name) into the table"""
+        with self._lock:
+            for name, caps in (models or {}).items():
+                self._models.setdefault(name, {}).update(caps or {})
+
+    def _lookup(self, provider: str, model: str) -> dict:
+        """
+        Caller must hold self._lock. Exact key or bare model name first, then the longest key that
+        is a dash-separated prefix ('claude-3-sonnet' matches 'claude-3-sonnet-20240229' but
+        'gpt-4' does not match 'gpt-4o').
+        """
+        full_name = f"{provider}/{model}"
+        for key in (full_name, model):
+            if key in self._models:
+                return self._models[key]
+        candidates = [k for k in self._models
+                      if _dash_prefix(full_name if '/' in k else model, k)]
+        return self._models[max(candidates, key=len)] if candidates else {}
+
+    def capabilities(self, provider: str, model: str) -> dict:
+        with self._lock:
+            caps = dict(DEFAULT_CAPABILITIES)
+            caps.update(self._lookup(provider, model))
+            return caps
+
+    def is_known(self, provider: str, model: str) -> bool:
+        with self._lock:
+            return bool(self._lookup(provider, model))
+
+    def rate_limits(self, provider: str, model: str) -> Dict[str, Optional[float]]:
+        caps = self.capabilities(provider, model)
+        return {'rpm': caps['rpm'], 'tpm': caps['tpm']}
+
+    def max_output_tokens(self, provider: str, model: str, requested: Optional[int] = None) -> Optional[int]:
+        """requested capped at the model's limit (the limit itself when nothing was requested)"""
+        limit = self.capabilities(provider, model)['max_output_tokens']
+        if requested is None:
+            return limit
+        return min(requested, limit) if limit else requested
+
+    def request_params(self, provider: str, model: str, messages: List[Dict],
+                       max_tokens: Optional[int] = None, temperature: Optional[float] = None) -> Dict:
+        """
+        Validate a request and return the token-limit/temperature parameters this model accepts.
+        max_tokens above the model's output limit is clamped, temperature is dropped for models
+        that reject it, and a prompt that cannot fit the context window raises RequestValidationError.
+        """
+        caps = self.capabilities(provider, model)
+        name = f"{provider}/{model}"
+
+        prompt_tokens = estimate_tokens(messages)
+        if caps['context_window'] and prompt_tokens >= caps['context_window']:
+            raise RequestValidationError(
+                f"{name}: prompt is ~{prompt_tokens:,} tokens but the context window is "
+                f"{caps['context_window']:,}")
+
+        params = {}
+        if max_tokens:
+            limit = caps['max_output_tokens']
+            if limit and max_tokens > limit:
+                self._warn_once((name, 'max_tokens'),
+                                f"{name}: max_tokens {max_tokens:,} exceeds the model limit, using {limit:,}")
+                max_tokens = limit
+            params[caps['token_param']] = max_tokens
+
+        if temperature is not None:
+            if caps['supports_temperature']:
+                params['temperature'] = temperature
+            else:
+                self._warn_once((name, 'temperature'),
+                                f"{name}: model does not support temperature, omitting it")
+        return params
+
+    def _warn_once(self, key, message: str):
+        with self._lock:
+            if key in self._warned:
+                return
+            self._warned.add(key)
+        self.logger.warning(message)
+
+
+_model_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the process-wide model capability registry"""
+    return _model_registry
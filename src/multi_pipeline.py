@@ -13,6 +13,8 @@ import time
 from pathlib import Path
 from typing import List, Optional
 
+from budget_governor import EXHAUSTED, add_budget_arguments, start_job_budget
+
 def setup_logging(verbose: bool = False):
     """Setup logging for multi-pipeline"""
     level = logging.DEBUG if verbose else logging.INFO
@@ -124,7 +126,7 @@ Examples (run from src/ directory):
                         help='Run selenium in headless mode')
     
     # AI/Whimperizer Options
-    parser.add_argument('--provider', choices=['openai', 'anthropic', 'google'],
+    parser.add_argument('--provider', choices=['openai', 'anthropic', 'google', 'fake'],
                         help='AI provider for first run (default: from config)')
     parser.add_argument('--groups', nargs='+', metavar='GROUP',
                         help='Process specific groups (e.g., zaltz-1a zaltz-1b)')
@@ -139,6 +141,9 @@ Examples (run from src/ directory):
     parser.add_argument('--resources-dir', type=str, default='../resources',
                         help='Resources directory (default: ../resources)')
     
+    # Budget Options
+    add_budget_arguments(parser)
+    
     # General Options
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Verbose output')
@@ -166,6 +171,14 @@ Examples (run from src/ directory):
     if not check_dependencies():
         sys.exit(1)
     
+    # Job budget (tokens, dollars, wall time, concurrent calls), shared with every child process
+    from config_loader import ConfigError, load_config
+    try:
+        governor = start_job_budget(load_config(args.config), args)
+    except ConfigError as e:
+        logger.error(f"❌ {e}")
+        sys.exit(1)
+    
     # Create output directories
     Path(args.download_dir).mkdir(exist_ok=True)
     Path(args.whimper_dir).mkdir(exist_ok=True)
@@ -275,6 +288,8 @@ Examples (run from src/ directory):
         
         if args.dry_run:
             logger.info(f"Would run: {' '.join(cmd)}")
+        elif governor.state() == EXHAUSTED:
+            logger.warning("🛑 Job budget exhausted - skipping consolidation, using individual runs for PDFs")
         else:
             success = run_command(cmd, "Consolidating outputs", args.verbose)
             if not success:
@@ -292,51 +307,9 @@ Examples (run from src/ directory):
         
         def find_best_whimperized_files(whimper_dir, target_groups=None):
             """Find the best whimperized file for each group (consolidated > iterative > normal)"""
-            all_files = list(Path(whimper_dir).glob('*whimperized*.md'))
-            all_files.extend(list(Path(whimper_dir).glob('*whimperized*.txt')))
-            
-            # Group files by group key
-            groups = {}
-            for file_path in all_files:
-                name_parts = file_path.stem.split('-whimperized-')
-                if len(name_parts) >= 2:
-                    full_prefix = name_parts[0]
-                    mode_and_timestamp = name_parts[1]
-                    
-                    prefix_parts = full_prefix.split('-')
-                    if len(prefix_parts) >= 2:
-                        group_key = f"{prefix_parts[0]}-{prefix_parts[1]}"
-                    else:
-                        group_key = full_prefix
-                    
-                    if target_groups and group_key not in target_groups:
-                        continue
-                        
-                    if group_key not in groups:
-                        groups[group_key] = {}
-                    
-                    if mode_and_timestamp.startswith('consolidated-'):
-                        groups[group_key]['consolidated'] = file_path
-                    elif mode_and_timestamp.startswith('iterative-'):
-                        groups[group_key]['iterative'] = file_path
-                    elif mode_and_timestamp.startswith('normal-'):
-                        groups[group_key]['normal'] = file_path
-            
-            # Select best file for each group (consolidated > iterative > normal)
+            from artifact_catalog import get_catalog
             best_files = []
-            for group_key, versions in groups.items():
-                if 'consolidated' in versions:
-                    chosen_file = versions['consolidated']
-                    mode = 'consolidated'
-                elif 'iterative' in versions:
-                    chosen_file = versions['iterative']
-                    mode = 'iterative'
-                elif 'normal' in versions:
-                    chosen_file = versions['normal']
-                    mode = 'normal'
-                else:
-                    continue
-                
+            for group_key, (chosen_file, mode) in sorted(get_catalog(whimper_dir).best_per_group(target_groups).items()):
                 best_files.append((chosen_file, mode))
                 logger.info(f"📄 Group {group_key}: Using {mode} version")
             
@@ -6,30 +6,36 @@ Handles running the whimperizer multiple times with different models
 
 import os
 import sys
-import yaml
+import json
+import time
+import threading
 import argparse
 import subprocess
 import logging
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def setup_logging(verbose: bool = False):
+from async_logging import log_dir
+from config_loader import load_config, merge, run_overlay
+
+def setup_logging(verbose: bool = False, in_process: bool = False):
     """Setup logging for multi-runner"""
     level = logging.DEBUG if verbose else logging.INFO
+    if in_process:
+        # Runs share this process, so use whimperizer's file + console logging for everything
+        import whimperizer as whimperizer_module
+        whimperizer_module.setup_logging(level)
+        return logging.getLogger(__name__)
     logging.basicConfig(
         level=level,
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
     return logging.getLogger(__name__)
 
-def load_config(config_path: str) -> dict:
-    """Load configuration from YAML file"""
-    try:
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f)
-    except Exception as e:
-        raise Exception(f"Failed to load config from {config_path}: {e}")
+RUN_LOG_ROOT = log_dir() / 'multi_runner'
+DEFAULT_MAX_RUNS_PER_PROVIDER = 1
 
 def get_run_model_config(config: dict, run_number: int) -> Optional[Dict]:
     """Get model configuration for a specific run number"""
@@ -44,58 +50,75 @@ def get_run_model_config(config: dict, run_number: int) -> Optional[Dict]:
     # If no specific model, return None (will use default)
     return None
 
-def create_temp_config(base_config: dict, run_model_config: Dict, run_number: int, temp_dir: Path) -> str:
-    """Create a temporary config file with run-specific model settings"""
-    # Make a copy of the base config
-    temp_config = base_config.copy()
-    
-    # Override the default provider and model settings
-    if 'api' not in temp_config:
-        temp_config['api'] = {}
-    
-    # Set the provider from run model config
-    temp_config['api']['default_provider'] = run_model_config['provider']
-    
-    # Update provider-specific settings
-    if 'providers' not in temp_config['api']:
-        temp_config['api']['providers'] = {}
-    
-    provider = run_model_config['provider']
-    if provider not in temp_config['api']['providers']:
-        temp_config['api']['providers'][provider] = {}
-    
-    # Update the model settings for this provider
-    temp_config['api']['providers'][provider]['model'] = run_model_config['model']
-    temp_config['api']['providers'][provider]['temperature'] = run_model_config.get('temperature', 0.7)
-    
-    if 'max_tokens' in run_model_config:
-        temp_config['api']['providers'][provider]['max_tokens'] = run_model_config['max_tokens']
-    
-    # Write temporary config file
-    temp_config_path = temp_dir / f"config_run_{run_number}.yaml"
-    with open(temp_config_path, 'w') as f:
-        yaml.dump(temp_config, f, default_flow_style=False)
-    
-    return str(temp_config_path)
+def build_run_config(base_config: dict, run_model_config: Dict) -> dict:
+    """Return a new config with run-specific model settings applied (the base is never modified)"""
+    return merge(base_config, run_overlay(run_model_config))
+
+def run_provider(base_config: dict, run_model_config: Optional[Dict]) -> str:
+    """Provider a run will call (its run_N_model, else the default provider)"""
+    if run_model_config:
+        return run_model_config['provider']
+    return os.getenv('DEFAULT_AI_PROVIDER') or base_config['api']['default_provider']
+
+def provider_caps(base_config: dict, default_cap: Optional[int] = None) -> Dict[str, int]:
+    """Concurrent runs allowed per provider: multi_run.parallel.max_runs_per_provider, '*' = everyone else"""
+    if default_cap is not None:
+        return {'*': default_cap}  # --max-runs-per-provider applies to every provider
+    parallel_config = base_config.get('multi_run', {}).get('parallel') or {}
+    caps = dict(parallel_config.get('max_runs_per_provider') or {})
+    caps['*'] = parallel_config.get('default_max_runs', DEFAULT_MAX_RUNS_PER_PROVIDER)
+    return caps
 
-def run_whimperizer(config_path: str, groups: List[str], run_number: int, verbose: bool = False) -> bool:
-    """Run whimperizer with specified configuration"""
+def log_tail(log_path: Path, lines: int = 20) -> str:
+    try:
+        with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+            return ''.join(f.readlines()[-lines:])
+    except OSError:
+        return ''
+
+def run_whimperizer(config_path: str, groups: List[str], run_number: int, verbose: bool = False,
+                    batch: bool = False, batch_poll_interval: float = 60,
+                    log_path: Optional[Path] = None, overlay: Optional[Dict] = None) -> bool:
+    """Run whimperizer with specified configuration (output goes to log_path when given)"""
     logger = logging.getLogger(__name__)
     
     cmd = [
         'python', 'whimperizer.py',
-        '--config', config_path
+        '--config', config_path,
+        '--run-label', f"run_{run_number}"
     ]
     
+    if overlay:
+        # Run settings travel on the command line; no per-run config file is written
+        cmd.extend(['--config-overlay', json.dumps(overlay, sort_keys=True)])
+    
     if groups:
         cmd.extend(['--groups'] + groups)
     
     if verbose:
         cmd.append('--verbose')
     
+    if batch:
+        cmd.extend(['--batch', '--batch-poll-interval', str(batch_poll_interval)])
+    
     logger.info(f"🔄 Running whimperizer (Run {run_number})")
     logger.debug(f"Command: {' '.join(cmd)}")
     
+    if log_path is not None:
+        # Parallel runs: each run's stdout/stderr goes to its own file instead of interleaving
+        with open(log_path, 'w', encoding='utf-8') as log_file:
+            log_file.write(f"$ {' '.join(cmd)}\n")
+            log_file.flush()
+            returncode = subprocess.run(cmd, stdout=log_file, stderr=subprocess.STDOUT, text=True).returncode
+        if returncode == 0:
+            logger.info(f"✅ Run {run_number} completed successfully")
+            return True
+        logger.error(f"❌ Run {run_number} failed (exit code {returncode}), see {log_path}")
+        tail = log_tail(log_path)
+        if tail:
+            logger.error(f"Last lines of run {run_number}:\n{tail}")
+        return False
+    
     try:
         result = subprocess.run(
             cmd, 
@@ -116,6 +139,134 @@ def run_whimperizer(config_path: str, groups: List[str], run_number: int, verbos
             logger.error(f"Output: {e.stdout}")
         return False
 
+def run_in_process(base_config: dict, run_numbers: List[int], groups: Optional[List[str]] = None,
+                   batch: bool = False, batch_poll_interval: float = 60,
+                   on_group_done: Optional[Callable[[int, str, Optional[dict]], None]] = None) -> Dict[int, bool]:
+    """
+    Run every variant inside this process, concurrently, one thread per run.
+    Inputs (prompt, group discovery, file contents) are loaded once and shared, and all runs
+    use the process-wide provider clients, circuit breakers, rate limiter and usage ledger.
+    Outputs are written exactly as the subprocess path writes them.
+    on_group_done(run_number, group_key, result_or_None) fires as each run finishes each group
+    (not in batch mode), which lets pipeline.py --stream start consolidating early.
+    """
+    logger = logging.getLogger(__name__)
+    import whimperizer as whimperizer_module
+    from call_context import call_context, submit_with_context
+    
+    # Build every run's Whimperizer up front; the first one loads the shared inputs
+    whimperizers = {}
+    grouped_files = None
+    for run_num in run_numbers:
+        run_model_config = get_run_model_config(base_config, run_num)
+        run_config = build_run_config(base_config, run_model_config) if run_model_config else merge(base_config, {})
+        if grouped_files is None:
+            first = whimperizer_module.Whimperizer(config=run_config)
+            grouped_files = first.select_groups(groups)
+            first.preload_inputs(grouped_files)
+            whimperizers[run_num] = first
+            logger.info(f"📂 Loaded {sum(len(f) for f in grouped_files.values())} input files "
+                        f"in {len(grouped_files)} group(s) once for {len(run_numbers)} runs")
+            continue
+        whimperizers[run_num] = whimperizer_module.Whimperizer(
+            config=run_config,
+            conversation_history=first.conversation_history,
+            input_cache=first.input_cache,
+        )
+    
+    def execute(run_num: int):
+        whimperizer = whimperizers[run_num]
+        if batch:
+            from batch_runner import BatchWhimperizer
+            BatchWhimperizer(whimperizer, None, batch_poll_interval).run(groups)
+        else:
+            callback = (lambda group_key, result: on_group_done(run_num, group_key, result)) if on_group_done else None
+            whimperizer.run(groups, grouped_files=grouped_files, on_group_done=callback)
+    
+    results = {}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(run_numbers), thread_name_prefix='run') as executor:
+        futures = {}
+        for run_num in run_numbers:
+            whimperizer = whimperizers[run_num]
+            logger.info(f"🔄 Starting run {run_num} in-process "
+                        f"({whimperizer.provider_name}/{whimperizer.ai_provider.config.get('model', 'default')})")
+            with call_context(run=f"run_{run_num}"):
+                futures[submit_with_context(executor, execute, run_num)] = run_num
+        
+        for future in as_completed(futures):
+            run_num = futures[future]
+            try:
+                future.result()
+                results[run_num] = True
+                logger.info(f"✅ Run {run_num} completed successfully")
+            except Exception as e:
+                results[run_num] = False
+                logger.error(f"❌ Run {run_num} failed: {e}")
+    
+    logger.info(f"⏱️  {len(run_numbers)} in-process runs finished in {time.perf_counter() - started:.1f}s")
+    return results
+
+def run_parallel(run_plans: List[Dict], groups: Optional[List[str]], caps: Dict[str, int],
+                 verbose: bool = False, batch: bool = False, batch_poll_interval: float = 60,
+                 log_dir: Path = RUN_LOG_ROOT) -> List[Dict]:
+    """
+    Launch every planned run as its own subprocess at once, holding at most caps[provider]
+    runs per provider. Returns one status dict per run for the combined report.
+    """
+    logger = logging.getLogger(__name__)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    semaphores = {provider: threading.Semaphore(max(1, caps.get(provider, caps['*'])))
+                  for provider in {plan['provider'] for plan in run_plans}}
+    statuses = {plan['run']: {'run': plan['run'], 'provider': plan['provider'], 'model': plan['model'],
+                              'status': 'queued', 'seconds': None, 'log': str(log_dir / f"run_{plan['run']}.log")}
+                for plan in run_plans}
+    status_lock = threading.Lock()
+    
+    def execute(plan: Dict) -> bool:
+        status = statuses[plan['run']]
+        with semaphores[plan['provider']]:
+            with status_lock:
+                status['status'] = 'running'
+                running = sum(1 for s in statuses.values() if s['status'] == 'running')
+            logger.info(f"🔄 Run {plan['run']} started ({plan['provider']}/{plan['model']}), {running} running")
+            started = time.perf_counter()
+            success = run_whimperizer(plan['config_path'], groups, plan['run'], verbose,
+                                      batch, batch_poll_interval, log_path=Path(status['log']),
+                                      overlay=plan.get('overlay'))
+        with status_lock:
+            status['status'] = 'succeeded' if success else 'failed'
+            status['seconds'] = round(time.perf_counter() - started, 1)
+            finished = sum(1 for s in statuses.values() if s['status'] in ('succeeded', 'failed'))
+        logger.info(f"📊 {finished}/{len(statuses)} runs finished")
+        return success
+    
+    with ThreadPoolExecutor(max_workers=len(run_plans), thread_name_prefix='run') as executor:
+        futures = {executor.submit(execute, plan): plan['run'] for plan in run_plans}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                run_num = futures[future]
+                logger.error(f"❌ Run {run_num} could not be launched: {e}")
+                with status_lock:
+                    statuses[run_num]['status'] = 'failed'
+    
+    results = [statuses[plan['run']] for plan in run_plans]
+    with open(log_dir / 'status.json', 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return results
+
+def format_status_report(statuses: List[Dict]) -> str:
+    """Combined view of all runs: model, outcome, duration and where its log is"""
+    lines = [f"  {'run':<5} {'model':<40} {'status':<10} {'time':>8}  log"]
+    for status in statuses:
+        seconds = f"{status['seconds']:.1f}s" if status['seconds'] is not None else '-'
+        icon = '✅' if status['status'] == 'succeeded' else '❌'
+        lines.append(f"  {status['run']:<5} {(status['provider'] + '/' + status['model'])[:40]:<40} "
+                     f"{icon} {status['status']:<8} {seconds:>8}  {status['log']}")
+    return '\n'.join(lines)
+
 def main():
     parser = argparse.ArgumentParser(
         description="Multi-Runner for Whimperizer - Run whimperizer multiple times with different models",
@@ -130,6 +281,15 @@ Examples:
   
   # Verbose output
   python multi_runner.py --runs 3 --groups zaltz-1a --verbose
+  
+  # Submit each run through the provider batch API (overnight jobs)
+  python multi_runner.py --runs 3 --batch
+  
+  # Launch all runs at once as subprocesses, at most 2 per provider, one log file per run
+  python multi_runner.py --runs 3 --parallel-runs --max-runs-per-provider 2
+  
+  # Run all variants concurrently in this process, sharing inputs and clients
+  python multi_runner.py --runs 3 --in-process
         """
     )
     
@@ -143,10 +303,21 @@ Examples:
                         help='Verbose output')
     parser.add_argument('--dry-run', action='store_true',
                         help='Show what would be done without executing')
+    parser.add_argument('--batch', action='store_true',
+                        help='Use the provider batch API for each run (openai/anthropic only)')
+    parser.add_argument('--batch-poll-interval', type=float, default=60,
+                        help='Seconds between batch status checks (default: 60)')
+    parser.add_argument('--parallel-runs', action='store_true',
+                        help='Launch runs concurrently (one subprocess and log file each)')
+    parser.add_argument('--max-runs-per-provider', type=int, metavar='N',
+                        help='Concurrent runs per provider with --parallel-runs '
+                             '(default: multi_run.parallel in config, else 1)')
+    parser.add_argument('--in-process', action='store_true',
+                        help='Run all variants concurrently in this process instead of one subprocess each')
     
     args = parser.parse_args()
     
-    logger = setup_logging(args.verbose)
+    logger = setup_logging(args.verbose, args.in_process)
     
     # Validate inputs
     if args.runs < 1:
@@ -163,57 +334,94 @@ Examples:
         logger.error(f"Failed to load configuration: {e}")
         sys.exit(1)
     
-    # Create temporary directory for run-specific configs
-    temp_dir = Path('./temp_configs')
-    temp_dir.mkdir(exist_ok=True)
+    if args.in_process:
+        return run_in_process_main(args, base_config, logger)
     
-    logger.info(f"🚀 Starting multi-run with {args.runs} runs")
+    logger.info(f"🚀 Starting multi-run with {args.runs} runs" + (" in parallel" if args.parallel_runs else ""))
     if args.groups:
         logger.info(f"Processing groups: {', '.join(args.groups)}")
     
     success_count = 0
     
-    try:
-        for run_num in range(1, args.runs + 1):
-            logger.info(f"\n📋 Preparing Run {run_num}/{args.runs}")
-            
-            # Get model config for this run
-            run_model_config = get_run_model_config(base_config, run_num)
-            
-            if run_model_config:
-                logger.info(f"Using model: {run_model_config['provider']}/{run_model_config['model']}")
-                # Create temporary config with run-specific model
-                config_path = create_temp_config(base_config, run_model_config, run_num, temp_dir)
-            else:
-                logger.info(f"Using default model (no run_{run_num}_model configured)")
-                config_path = args.config
-            
-            if args.dry_run:
-                logger.info(f"[DRY RUN] Would run whimperizer with config: {config_path}")
-                continue
-            
+    run_plans = []
+    for run_num in range(1, args.runs + 1):
+        logger.info(f"\n📋 Preparing Run {run_num}/{args.runs}")
+        
+        # Get model config for this run
+        run_model_config = get_run_model_config(base_config, run_num)
+        
+        if run_model_config:
+            logger.info(f"Using model: {run_model_config['provider']}/{run_model_config['model']}")
+            # The run's settings are an overlay on the base config, applied in the whimperizer process
+            overlay = run_overlay(run_model_config)
+        else:
+            logger.info(f"Using default model (no run_{run_num}_model configured)")
+            overlay = None
+        
+        if args.dry_run:
+            logger.info(f"[DRY RUN] Would run whimperizer with config: {args.config}"
+                        + (f" + {json.dumps(overlay, sort_keys=True)}" if overlay else ""))
+            continue
+        
+        provider = run_provider(base_config, run_model_config)
+        run_plans.append({
+            'run': run_num,
+            'config_path': args.config,
+            'overlay': overlay,
+            'provider': provider,
+            'model': run_model_config['model'] if run_model_config
+                     else base_config['api']['providers'].get(provider, {}).get('model', 'default'),
+        })
+    
+    if args.parallel_runs and run_plans:
+        caps = provider_caps(base_config, args.max_runs_per_provider)
+        log_dir = RUN_LOG_ROOT / datetime.now().strftime('%Y%m%d_%H%M%S')
+        logger.info(f"⚡ Per-provider run caps: " + ', '.join(f"{p}={n}" for p, n in sorted(caps.items())))
+        statuses = run_parallel(run_plans, args.groups, caps, args.verbose,
+                                args.batch, args.batch_poll_interval, log_dir)
+        success_count = sum(1 for status in statuses if status['status'] == 'succeeded')
+        logger.info(f"\n📋 Run status (logs in {log_dir}):\n{format_status_report(statuses)}")
+    else:
+        for plan in run_plans:
             # Run whimperizer
-            success = run_whimperizer(config_path, args.groups, run_num, args.verbose)
+            success = run_whimperizer(plan['config_path'], args.groups, plan['run'], args.verbose,
+                                      args.batch, args.batch_poll_interval, overlay=plan.get('overlay'))
             
             if success:
                 success_count += 1
             else:
-                logger.error(f"Run {run_num} failed - continuing with remaining runs")
+                logger.error(f"Run {plan['run']} failed - continuing with remaining runs")
     
-    finally:
-        # Clean up temporary config files
-        if temp_dir.exists():
-            for temp_file in temp_dir.glob("config_run_*.yaml"):
-                temp_file.unlink()
-            temp_dir.rmdir()
+    return report_summary(args.runs, success_count, logger)
+
+def run_in_process_main(args, base_config: dict, logger) -> int:
+    """--in-process: no subprocesses; every run's config is built in memory"""
+    run_numbers = list(range(1, args.runs + 1))
+    logger.info(f"🚀 Starting in-process multi-run with {args.runs} runs")
+    for run_num in run_numbers:
+        run_model_config = get_run_model_config(base_config, run_num)
+        model = (f"{run_model_config['provider']}/{run_model_config['model']}" if run_model_config
+                 else "default model")
+        logger.info(f"📋 Run {run_num}/{args.runs}: {model}")
+    if args.dry_run:
+        logger.info("[DRY RUN] Would run all variants concurrently in this process")
+        return 0
     
-    # Summary
+    try:
+        results = run_in_process(base_config, run_numbers, args.groups, args.batch, args.batch_poll_interval)
+    except Exception as e:
+        logger.error(f"❌ Could not start in-process runs: {e}")
+        return 2
+    return report_summary(args.runs, sum(results.values()), logger)
+
+def report_summary(runs: int, success_count: int, logger) -> int:
+    """Log the multi-run summary and return the exit code"""
     logger.info(f"\n📊 Multi-run Summary:")
-    logger.info(f"Total runs: {args.runs}")
+    logger.info(f"Total runs: {runs}")
     logger.info(f"Successful runs: {success_count}")
-    logger.info(f"Failed runs: {args.runs - success_count}")
+    logger.info(f"Failed runs: {runs - success_count}")
     
-    if success_count == args.runs:
+    if success_count == runs:
         logger.info("🎉 All runs completed successfully!")
         return 0
     elif success_count > 0:
@@ -6,11 +6,18 @@ Orchestrates the full process: Download -> AI Transform -> PDF Generation
 
 import os
 import sys
+import atexit
 import argparse
 import subprocess
+import threading
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+
+from budget_governor import EXHAUSTED, add_budget_arguments, start_job_budget
+from tracing import default_trace_path, get_tracer
 
 def run_command(cmd: List[str], description: str, verbose: bool = False) -> bool:
     """Run a command and handle errors"""
@@ -19,7 +26,8 @@ def run_command(cmd: List[str], description: str, verbose: bool = False) -> bool
         print(f"Command: {' '.join(cmd)}")
     
     try:
-        result = subprocess.run(cmd, capture_output=not verbose, text=True, check=True)
+        with get_tracer().span(description, 'subprocess'):
+            result = subprocess.run(cmd, capture_output=not verbose, text=True, check=True)
         if verbose and result.stdout:
             print(result.stdout)
         return True
@@ -33,6 +41,15 @@ def run_command(cmd: List[str], description: str, verbose: bool = False) -> bool
             print(f"Output: {e.stdout}")
         return False
 
+def report_trace(args):
+    """Export the trace and print the per-span timeline (and, with --profile, the hot functions)"""
+    tracer = get_tracer()
+    path = tracer.export(args.trace or default_trace_path())
+    print(f"\n{tracer.summary()}")
+    if args.profile:
+        print(f"\n{tracer.profile_report(args.profile_top)}")
+    print(f"\n🧭 Trace written to {path} (open in chrome://tracing or https://ui.perfetto.dev)")
+
 def check_dependencies():
     """Check if required Python files exist"""
     required_files = [
@@ -57,6 +74,196 @@ def check_dependencies():
         return False
     return True
 
+def find_best_whimperized_files(whimper_dir, target_groups=None):
+    """Find the best whimperized file for each group (consolidated > iterative > normal, newest first)"""
+    if not Path(whimper_dir).is_dir():
+        return []
+    from artifact_catalog import get_catalog
+    best_files = []
+    for group_key, (chosen_file, mode) in sorted(get_catalog(whimper_dir).best_per_group(target_groups).items()):
+        best_files.append((chosen_file, mode))
+        print(f"📄 Group {group_key}: Using {mode} version")
+    
+    return best_files
+
+def pdf_name_for(whimper_file: Path) -> str:
+    """PDF filename for a whimperized file: <group>-<model>-<timestamp>.pdf"""
+    # Create output PDF name - extract group key and timestamp from filename
+    # Handle both old and new formats with line numbers
+    full_prefix = whimper_file.stem.split('-whimperized-')[0]  # e.g., "zaltz-2a" or "zaltz-2a-16to21"
+    prefix_parts = full_prefix.split('-')
+    if len(prefix_parts) >= 2:
+        base_name = f"{prefix_parts[0]}-{prefix_parts[1]}"  # e.g., "zaltz-2a"
+    else:
+        base_name = full_prefix  # fallback
+    
+    # Extract timestamp and model name from whimperized filename
+    # New format: zaltz-2a-16to21-whimperized-iterative-gpt-4-1-20250724_164521.md
+    # Old format: zaltz-2a-16to21-whimperized-iterative-20250724_164521.md
+    filename_parts = whimper_file.stem.split('-whimperized-')
+    if len(filename_parts) >= 2:
+        mode_and_rest = filename_parts[1]  # e.g., "iterative-gpt-4-1-20250724_164521"
+        rest_parts = mode_and_rest.split('-')
+    
+        # Find timestamp (looks like YYYYMMDD_HHMMSS)
+        timestamp_idx = -1
+        model_name = ""
+        for i, part in enumerate(rest_parts):
+            if len(part) == 15 and '_' in part and part.replace('_', '').replace('-', '').isdigit():
+                timestamp_idx = i
+                timestamp = part
+                # Everything between mode and timestamp is model name
+                if i > 1:  # Skip mode part
+                    model_name = '-'.join(rest_parts[1:i])
+                break
+    
+        if timestamp_idx > 0 and model_name:
+            pdf_name = f"{base_name}-{model_name}-{timestamp}.pdf"
+        elif timestamp_idx > 0:
+            pdf_name = f"{base_name}-{timestamp}.pdf"
+        else:
+            # Fallback: use current timestamp
+            from datetime import datetime
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            pdf_name = f"{base_name}-{timestamp}.pdf"
+    else:
+        # Fallback: use current timestamp
+        from datetime import datetime
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        pdf_name = f"{base_name}-{timestamp}.pdf"
+    
+    return pdf_name
+
+def pdf_command(args, whimper_file: Path, pdf_path: Path) -> List[str]:
+    """wimpy_pdf_generator.py command line for one whimperized file"""
+    cmd = [
+        'python', 'wimpy_pdf_generator.py',
+        '--input', str(whimper_file),
+        '--output', str(pdf_path),
+        '--style', args.pdf_style,
+        '--resources', args.resources_dir
+    ]
+    
+    if args.pdf_font:
+        cmd.extend(['--font', args.pdf_font])
+    
+    if args.pdf_background:
+        cmd.extend(['--background', args.pdf_background])
+    
+    # Note: PDF generation doesn't support --verbose flag
+    # if args.verbose:
+    #     cmd.append('--verbose')
+    
+    return cmd
+    
+class StreamingConsolidator:
+    """
+    pipeline.py --stream: consolidate each group (then render its PDF) as soon as K of its
+    runs have finished, while the remaining runs and groups keep going
+    """
+    
+    def __init__(self, args, total_runs: int, min_runs: int, consolidation_config: dict, workers: int = 4):
+        self.args = args
+        self.total_runs = total_runs
+        self.min_runs = min_runs
+        self.consolidation_config = consolidation_config
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='consolidate')
+        self.lock = threading.Lock()
+        self.outputs: Dict[str, List[Tuple[Path, str]]] = defaultdict(list)
+        self.finished: Dict[str, int] = defaultdict(int)
+        self.started = set()
+        self.futures = []
+        self.results: Dict[str, dict] = {}
+    
+    def group_done(self, run_number: int, group_key: str, result: Optional[dict]):
+        """multi_runner.run_in_process callback, called from the run's thread"""
+        with self.lock:
+            self.finished[group_key] += 1
+            if result:
+                self.outputs[group_key].append((Path(result['final_file']), result['final_mode']))
+            ready = (len(self.outputs[group_key]) >= self.min_runs
+                     or self.finished[group_key] >= self.total_runs)
+            if group_key in self.started or not ready:
+                return
+            self.started.add(group_key)
+            outputs = list(self.outputs[group_key])
+        
+        print(f"⚡ Group {group_key}: {len(outputs)}/{self.total_runs} runs done, consolidating now")
+        from call_context import call_context, submit_with_context
+        with call_context(group=group_key, stage='consolidation', run=None):
+            self.futures.append(submit_with_context(self.executor, self.finish_group, group_key, outputs))
+    
+    def finish_group(self, group_key: str, outputs: List[Tuple[Path, str]]):
+        """Consolidate (or fall back to the single run output) and render the PDF"""
+        from consolidator import consolidate_group, create_ai_provider
+        from run_ranker import select_runs
+        
+        final_file, mode = None, None
+        if len(outputs) >= 2:
+            try:
+                provider = create_ai_provider(self.consolidation_config)
+                candidates = select_runs(group_key, [path for path, _ in outputs],
+                                         self.consolidation_config.get('ranking'))
+                consolidated = consolidate_group(group_key, candidates, provider,
+                                                 self.args.whimper_dir, self.args.verbose,
+                                                 self.consolidation_config.get('tree'))
+            except Exception as e:
+                print(f"❌ Consolidation failed for {group_key}: {e}")
+                consolidated = None
+            if consolidated:
+                final_file, mode = Path(consolidated), 'consolidated'
+            else:
+                print(f"⚠️ Consolidation failed for {group_key}, using an individual run for the PDF")
+        if final_file is None and outputs:
+            final_file, mode = outputs[0]
+        
+        result = {'group': group_key, 'runs': len(outputs), 'file': final_file, 'mode': mode, 'pdf': None}
+        if final_file is not None and not self.args.skip_pdf:
+            pdf_path = Path(self.args.pdf_dir) / pdf_name_for(final_file)
+            if run_command(pdf_command(self.args, final_file, pdf_path),
+                           f"Generating PDF: {pdf_path.name} (from {mode} version)", self.args.verbose):
+                result['pdf'] = pdf_path
+                print(f"✅ Generated: {pdf_path} (from {mode} version)")
+            else:
+                print(f"❌ PDF generation failed for {final_file.name} ({mode} version)")
+        with self.lock:
+            self.results[group_key] = result
+    
+    def close(self) -> Dict[str, dict]:
+        """Wait for every started group, then return per-group results"""
+        while True:
+            with self.lock:
+                pending = [f for f in self.futures if not f.done()]
+            if not pending:
+                break
+            wait(pending)
+        self.executor.shutdown()
+        return dict(self.results)
+
+def run_streaming(args) -> bool:
+    """Multi-run in-process and consolidate/render each group as soon as enough runs finish"""
+    from config_loader import load_config
+    from multi_runner import run_in_process
+    
+    config = load_config(args.config)
+    consolidation_config = config.get('multi_run', {}).get('consolidation', {})
+    min_runs = max(2, min(args.consolidate_after or args.runs, args.runs))
+    stream = StreamingConsolidator(args, args.runs, min_runs, consolidation_config, args.consolidation_workers)
+    
+    started = time.perf_counter()
+    run_results = run_in_process(config, list(range(1, args.runs + 1)), args.groups,
+                                 on_group_done=stream.group_done)
+    group_results = stream.close()
+    
+    print(f"\n📊 Streaming summary ({time.perf_counter() - started:.1f}s):")
+    print(f"   Runs succeeded: {sum(run_results.values())}/{args.runs}")
+    for group_key, result in sorted(group_results.items()):
+        outcome = f"{result['mode']} from {result['runs']} run(s)" if result['file'] else "no output"
+        pdf = f", PDF {result['pdf'].name}" if result['pdf'] else ""
+        print(f"   📁 {group_key}: {outcome}{pdf}")
+    
+    return any(result['file'] for result in group_results.values())
+
 def main():
     parser = argparse.ArgumentParser(
         description="Complete Whimperizer Pipeline: Download -> AI Transform -> PDF Generation",
@@ -69,6 +276,9 @@ Examples (run from src/ directory):
   # Multi-run pipeline (runs whimperizer multiple times and consolidates)
   python pipeline.py --runs 3 --groups zaltz-1a
   
+  # Streaming multi-run: consolidate + render each group once 2 of its 3 runs are done
+  python pipeline.py --runs 3 --stream --consolidate-after 2 --skip-download
+  
   # Specify AI model by editing ../config/config.yaml first, then:
   python pipeline.py --provider openai --groups zaltz-1a
   
@@ -128,10 +338,13 @@ Examples (run from src/ directory):
                         help='Run selenium in headless mode (no visible browser window)')
     
     # AI/Whimperizer Options
-    parser.add_argument('--provider', choices=['openai', 'anthropic', 'google'],
+    parser.add_argument('--provider', choices=['openai', 'anthropic', 'google', 'fake'],
                         help='AI provider (default: from config)')
     parser.add_argument('--groups', nargs='+', metavar='GROUP',
                         help='Process specific groups (e.g., zaltz-1a zaltz-1b)')
+    parser.add_argument('--priority', nargs='+', metavar='GROUP',
+                        help='Groups (or patterns like zaltz-1*) to start first, e.g. to get zaltz-1a\'s PDF '
+                             'early; the rest start longest first (default: config scheduling.priority)')
     parser.add_argument('--list-groups', action='store_true',
                         help='List available groups and exit')
     parser.add_argument('--config', type=str, default='../config/config.yaml',
@@ -150,12 +363,63 @@ Examples (run from src/ directory):
     # Multi-run Options
     parser.add_argument('--runs', type=int, default=1,
                         help='Number of whimperizer runs (default: 1, auto-consolidates when > 1)')
+    parser.add_argument('--stream', action='store_true',
+                        help='With --runs > 1: run in-process and consolidate/render each group as soon as '
+                             'enough of its runs finish')
+    parser.add_argument('--consolidate-after', type=int, metavar='K',
+                        help='With --stream: consolidate a group once K runs have finished it (default: all runs)')
+    parser.add_argument('--consolidation-workers', type=int, default=4,
+                        help='Concurrent group consolidations (default: 4)')
+    parser.add_argument('--engine', choices=['subprocess', 'graph', 'per-group'], default='subprocess',
+                        help='subprocess: chain the step scripts (default); graph: run the steps in-process '
+                             'as a stage graph with independent stages overlapping; per-group: stream each group '
+                             'through download -> whimperize -> PDF as soon as its inputs are complete')
+    parser.add_argument('--download-workers', type=int,
+                        help='With --engine per-group: concurrent group downloads (default: config or 1)')
+    parser.add_argument('--whimperize-workers', type=int,
+                        help='With --engine per-group: groups whimperized at once (default: config or 2)')
+    parser.add_argument('--pdf-workers', type=int,
+                        help='With --engine per-group: concurrent PDF renders (default: config or 1)')
+    parser.add_argument('--queue-size', type=int,
+                        help='With --engine per-group: groups allowed to wait between stages (default: config or 2)')
     
     # General Options
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Verbose output')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
                         help='Logging level')
+    # Distributed Options
+    parser.add_argument('--queue', metavar='URL',
+                        help='Enqueue group-level tasks on a shared work queue instead of running them here '
+                             '(sqlite:///path/queue.sqlite); also the queue --worker claims from')
+    parser.add_argument('--worker', action='store_true',
+                        help='Run as a queue worker: claim and execute tasks from --queue')
+    parser.add_argument('--job', type=str,
+                        help='With --queue: job name for the enqueued tasks (default: job-<timestamp>)')
+    parser.add_argument('--no-wait', action='store_true',
+                        help='With --queue: enqueue and exit instead of waiting for the workers')
+    parser.add_argument('--worker-kinds', nargs='+', choices=['download', 'whimperize', 'consolidate', 'render'],
+                        help='With --worker: only claim these task kinds (e.g. render on a CPU box)')
+    parser.add_argument('--worker-threads', type=int, default=1,
+                        help='With --worker: tasks executed concurrently by this process (default: 1)')
+    parser.add_argument('--lease-seconds', type=float, default=300,
+                        help='With --worker: task lease, renewed by heartbeats every third of it (default: 300)')
+    parser.add_argument('--idle-exit', type=float, metavar='SECONDS',
+                        help='With --worker: exit after this long without work (default: keep polling)')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild every step even when the build cache says it is up to date')
+    parser.add_argument('--explain', action='store_true',
+                        help='Say why each artifact is rebuilt or skipped (build cache decisions)')
+    parser.add_argument('--trace', nargs='?', const='', metavar='PATH',
+                        help='Record stage / group / API-call / PDF-page spans and write a Chrome trace '
+                             '(default path: ../output/traces/trace-<timestamp>.json). With the subprocess '
+                             'engine only whole steps are traced')
+    parser.add_argument('--profile', action='store_true',
+                        help='Also cProfile the CPU-heavy stages (ranking, consolidation, PDF rendering) '
+                             'and print their hottest functions; implies --trace')
+    parser.add_argument('--profile-top', type=int, default=25, metavar='N',
+                        help='Functions listed per profiled stage (default: 25)')
+    add_budget_arguments(parser)
     parser.add_argument('--dry-run', action='store_true',
                         help='Show what would be done without executing')
     
@@ -178,6 +442,65 @@ Examples (run from src/ directory):
     Path(args.whimper_dir).mkdir(exist_ok=True)
     Path(args.pdf_dir).mkdir(exist_ok=True)
     
+    # Incremental builds: skip steps whose inputs, prompt and settings are unchanged
+    from config_loader import ConfigError, load_config
+    from build_cache import get_build_cache
+    try:
+        config = load_config(args.config)
+    except ConfigError as e:
+        print(f"❌ {e}")
+        return 1
+    cache = get_build_cache()
+    cache.configure(config.get('build_cache'), force=args.force, explain=args.explain)
+    
+    # Tracing is reported at exit so every engine (and early exits) gets its timeline
+    if args.trace is not None or args.profile:
+        get_tracer().configure(profiling=args.profile)
+        atexit.register(report_trace, args)
+    
+    # Job budget (tokens, dollars, wall time, concurrent calls) for every engine and child process
+    governor = start_job_budget(config, args)
+    
+    # Group order for every engine and child process: priorities first, then longest first
+    from group_scheduler import configure_scheduling
+    scheduler = configure_scheduling(config)
+    scheduler.pin(args.priority, export=True)
+    
+    if args.worker or args.queue:
+        from work_queue import open_queue
+        import queue_pipeline
+        if not args.queue:
+            print("❌ --worker needs --queue")
+            return 1
+        queue = open_queue(args.queue)
+        if args.worker:
+            queue_pipeline.run_workers(queue, args.worker_threads, args.worker_kinds, args.lease_seconds, args.idle_exit)
+            return 0
+        job = args.job or queue_pipeline.default_job_name()
+        if args.dry_run:
+            print(f"Would enqueue job {job} on {args.queue}")
+            return 0
+        groups = queue_pipeline.plan_job(queue, job, args)
+        print(f"📬 Enqueued job {job}: {groups} group(s) on {args.queue}")
+        if args.no_wait:
+            return 0
+        success = queue_pipeline.wait_for_job(queue, job)
+        print(f"\n{'🎉 Pipeline completed!' if success else '❌ Pipeline completed with errors'}")
+        return 0 if success else 1
+    
+    if args.engine == 'graph':
+        from pipeline_graph import run_pipeline_graph
+        if args.stream:
+            print("⚠️  --stream is ignored with --engine graph (groups are consolidated once all runs finish)")
+        success = run_pipeline_graph(args)
+        print(f"\n{'🎉 Pipeline completed!' if success else '❌ Pipeline completed with errors'}")
+        return 0 if success else 1
+    if args.engine == 'per-group':
+        from group_pipeline import run_group_pipeline
+        success = run_group_pipeline(args)
+        print(f"\n{'🎉 Pipeline completed!' if success else '❌ Pipeline completed with errors'}")
+        return 0 if success else 1
+    
     success = True
     
     # Step 1: Download Content
@@ -199,19 +522,51 @@ Examples (run from src/ directory):
         if args.downloader == 'selenium' and args.headless:
             cmd.append('--headless')
         
-        if args.dry_run:
+        from build_cache import download_inputs
+        inputs = download_inputs(Path(args.urls), args.downloader, args.download_format)
+        if cache.lookup('download', 'all', inputs):
+            print("⏭️  Downloads are up to date")
+        elif args.dry_run:
             print(f"Would run: {' '.join(cmd)}")
         else:
             success = run_command(cmd, "Downloading content", args.verbose)
             if not success:
                 print("❌ Download failed")
                 sys.exit(1)
+            cache.record('download', 'all', inputs, sorted(Path(args.download_dir).glob('*.txt')))
     else:
         print("⏭️  Skipping download (using existing content)")
     
     # Step 2: AI Transformation
-    if not args.skip_whimperize and success:
-        if args.runs > 1:
+    streamed = False
+    target_groups = args.groups
+    stale_inputs = {}
+    whimperize_started = time.time()
+    if not args.skip_whimperize and not (args.runs > 1 and args.stream) and cache.enabled:
+        from build_cache import input_files_by_group, whimperize_inputs
+        found = input_files_by_group(config['processing']['input_dir'], args.groups)
+        for group_key, files in found.items():
+            inputs = whimperize_inputs(config, files, args.runs, args.provider)
+            if not cache.lookup('whimperize', group_key, inputs):
+                stale_inputs[group_key] = inputs
+        if found:
+            target_groups = sorted(stale_inputs)
+    
+    if not args.skip_whimperize and success and target_groups == []:
+        print("⏭️  Whimperized content is up to date")
+    elif not args.skip_whimperize and success:
+        if args.runs > 1 and args.stream:
+            print(f"\n🤖 Step 2: Streaming multi-run ({args.runs} runs, consolidating each group "
+                  f"after {args.consolidate_after or args.runs})...")
+            streamed = True
+            if args.dry_run:
+                print(f"Would run {args.runs} runs in-process and consolidate + render each group as it becomes ready")
+            else:
+                success = run_streaming(args)
+                if not success:
+                    print("❌ Streaming multi-run produced no output")
+                    sys.exit(1)
+        elif args.runs > 1:
             print(f"\n🤖 Step 2: AI multi-run transformation ({args.runs} runs)...")
             
             # Multi-run step
@@ -223,8 +578,8 @@ Examples (run from src/ directory):
             if args.provider:
                 cmd.extend(['--provider', args.provider])
             
-            if args.groups:
-                cmd.extend(['--groups'] + args.groups)
+            if target_groups:
+                cmd.extend(['--groups'] + target_groups)
             
             if args.verbose:
                 cmd.append('--verbose')
@@ -248,14 +603,18 @@ Examples (run from src/ directory):
             if args.config != '../config/config.yaml':
                 cmd.extend(['--config', args.config])
             
-            if args.groups:
-                cmd.extend(['--groups'] + args.groups)
+            if target_groups:
+                cmd.extend(['--groups'] + target_groups)
+            
+            cmd.extend(['--parallel', str(args.consolidation_workers)])
             
             if args.verbose:
                 cmd.append('--verbose')
             
             if args.dry_run:
                 print(f"Would run: {' '.join(cmd)}")
+            elif governor.state() == EXHAUSTED:
+                print("🛑 Job budget exhausted - skipping consolidation, will use individual runs for PDFs")
             else:
                 consolidation_success = run_command(cmd, "Consolidation", args.verbose)
                 if not consolidation_success:
@@ -271,8 +630,8 @@ Examples (run from src/ directory):
             if args.provider:
                 cmd.extend(['--provider', args.provider])
             
-            if args.groups:
-                cmd.extend(['--groups'] + args.groups)
+            if target_groups:
+                cmd.extend(['--groups'] + target_groups)
             
             if args.verbose:
                 cmd.append('--verbose')
@@ -290,77 +649,26 @@ Examples (run from src/ directory):
     else:
         print("⏭️  Skipping whimperize (using existing content)")
     
+    # Remember what was just built (outputs older than this step belong to earlier builds)
+    if stale_inputs and success and not args.dry_run and not streamed:
+        from pipeline_graph import group_key_for
+        for whimper_file, mode in find_best_whimperized_files(args.whimper_dir, target_groups):
+            if whimper_file.stat().st_mtime < whimperize_started or (args.runs > 1 and mode != 'consolidated'):
+                continue
+            cache.record('whimperize', group_key_for(whimper_file), stale_inputs[group_key_for(whimper_file)],
+                         [whimper_file], mode=mode)
+    
     # Step 3: PDF Generation
-    if not args.skip_pdf and success:
+    if streamed:
+        print("⏭️  PDFs were rendered as each group finished")
+    elif not args.skip_pdf and success:
         print("\n📚 Step 3: Generating PDFs...")
         
-        # Find whimperized files with smart selection between normal and iterative versions
-        def find_best_whimperized_files(whimper_dir, target_groups=None):
-            """Find the best whimperized file for each group (consolidated > iterative > normal, newest timestamp)"""
-            all_files = list(Path(whimper_dir).glob('*whimperized*.md'))
-            all_files.extend(list(Path(whimper_dir).glob('*whimperized*.txt')))
-            
-            # Group files by group key (everything before '-whimperized')
-            groups = {}
-            for file_path in all_files:
-                # Extract group key from filename - handle both old and new formats:
-                # Old: zaltz-2a-whimperized-iterative-timestamp.md
-                # New: zaltz-2a-16to21-whimperized-iterative-timestamp.md
-                name_parts = file_path.stem.split('-whimperized-')
-                if len(name_parts) >= 2:
-                    full_prefix = name_parts[0]  # e.g., "zaltz-2a" or "zaltz-2a-16to21"
-                    mode_and_timestamp = name_parts[1]  # e.g., "iterative-20250724_020623"
-                    
-                    # Extract actual group key (first two dash-separated parts)
-                    prefix_parts = full_prefix.split('-')
-                    if len(prefix_parts) >= 2:
-                        group_key = f"{prefix_parts[0]}-{prefix_parts[1]}"  # e.g., "zaltz-2a"
-                    else:
-                        group_key = full_prefix  # fallback for unexpected formats
-                    
-                    if target_groups and group_key not in target_groups:
-                        continue
-                        
-                    if group_key not in groups:
-                        groups[group_key] = {'consolidated': [], 'iterative': [], 'normal': []}
-                    
-                    if mode_and_timestamp.startswith('consolidated-'):
-                        groups[group_key]['consolidated'].append(file_path)
-                    elif mode_and_timestamp.startswith('iterative-'):
-                        groups[group_key]['iterative'].append(file_path)
-                    elif mode_and_timestamp.startswith('normal-'):
-                        groups[group_key]['normal'].append(file_path)
-            
-            # Select best file for each group (consolidated > iterative > normal, newest timestamp)
-            best_files = []
-            for group_key, versions in groups.items():
-                if versions['consolidated']:  # List has files
-                    # Pick the newest consolidated file by timestamp
-                    sorted_files = sorted(versions['consolidated'], 
-                                        key=lambda f: f.stem.split('-')[-1], reverse=True)
-                    chosen_file = sorted_files[0]
-                    mode = 'consolidated'
-                elif versions['iterative']:  # List has files
-                    # Pick the newest iterative file by timestamp
-                    sorted_files = sorted(versions['iterative'], 
-                                        key=lambda f: f.stem.split('-')[-1], reverse=True)
-                    chosen_file = sorted_files[0]
-                    mode = 'iterative'
-                elif versions['normal']:  # List has files
-                    # Pick the newest normal file by timestamp
-                    sorted_files = sorted(versions['normal'], 
-                                        key=lambda f: f.stem.split('-')[-1], reverse=True)
-                    chosen_file = sorted_files[0]
-                    mode = 'normal'
-                else:
-                    continue
-                
-                best_files.append((chosen_file, mode))
-                print(f"📄 Group {group_key}: Using {mode} version")
-            
-            return best_files
-        
         best_files = find_best_whimperized_files(args.whimper_dir, args.groups)
+        from pipeline_graph import group_key_for
+        by_group = {group_key_for(path): (path, mode) for path, mode in best_files}
+        best_files = [by_group[group_key] for group_key in
+                      scheduler.order(by_group, {g: [path] for g, (path, _) in by_group.items()}, stages=())]
         
         if not best_files:
             print(f"❌ No whimperized files found in {args.whimper_dir}")
@@ -371,72 +679,16 @@ Examples (run from src/ directory):
         print(f"Found {len(best_files)} optimal whimperized files")
         
         # Generate PDFs
+        from build_cache import pdf_inputs
         for whimper_file, mode in best_files:
-            # Create output PDF name - extract group key and timestamp from filename
-            # Handle both old and new formats with line numbers
-            full_prefix = whimper_file.stem.split('-whimperized-')[0]  # e.g., "zaltz-2a" or "zaltz-2a-16to21"
-            prefix_parts = full_prefix.split('-')
-            if len(prefix_parts) >= 2:
-                base_name = f"{prefix_parts[0]}-{prefix_parts[1]}"  # e.g., "zaltz-2a"
-            else:
-                base_name = full_prefix  # fallback
-            
-            # Extract timestamp and model name from whimperized filename
-            # New format: zaltz-2a-16to21-whimperized-iterative-gpt-4-1-20250724_164521.md
-            # Old format: zaltz-2a-16to21-whimperized-iterative-20250724_164521.md
-            filename_parts = whimper_file.stem.split('-whimperized-')
-            if len(filename_parts) >= 2:
-                mode_and_rest = filename_parts[1]  # e.g., "iterative-gpt-4-1-20250724_164521"
-                rest_parts = mode_and_rest.split('-')
-                
-                # Find timestamp (looks like YYYYMMDD_HHMMSS)
-                timestamp_idx = -1
-                model_name = ""
-                for i, part in enumerate(rest_parts):
-                    if len(part) == 15 and '_' in part and part.replace('_', '').replace('-', '').isdigit():
-                        timestamp_idx = i
-                        timestamp = part
-                        # Everything between mode and timestamp is model name
-                        if i > 1:  # Skip mode part
-                            model_name = '-'.join(rest_parts[1:i])
-                        break
-                
-                if timestamp_idx > 0 and model_name:
-                    pdf_name = f"{base_name}-{model_name}-{timestamp}.pdf"
-                elif timestamp_idx > 0:
-                    pdf_name = f"{base_name}-{timestamp}.pdf"
-                else:
-                    # Fallback: use current timestamp
-                    from datetime import datetime
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    pdf_name = f"{base_name}-{timestamp}.pdf"
-            else:
-                # Fallback: use current timestamp
-                from datetime import datetime
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                pdf_name = f"{base_name}-{timestamp}.pdf"
-            
+            pdf_name = pdf_name_for(whimper_file)
             pdf_path = Path(args.pdf_dir) / pdf_name
+            cmd = pdf_command(args, whimper_file, pdf_path)
+            inputs = pdf_inputs(config, whimper_file, args.pdf_style, args.resources_dir)
             
-            cmd = [
-                'python', 'wimpy_pdf_generator.py',
-                '--input', str(whimper_file),
-                '--output', str(pdf_path),
-                '--style', args.pdf_style,
-                '--resources', args.resources_dir
-            ]
-            
-            if args.pdf_font:
-                cmd.extend(['--font', args.pdf_font])
-            
-            if args.pdf_background:
-                cmd.extend(['--background', args.pdf_background])
-            
-            # Note: PDF generation doesn't support --verbose flag
-            # if args.verbose:
-            #     cmd.append('--verbose')
-            
-            if args.dry_run:
+            if cache.lookup('pdf', group_key_for(whimper_file), inputs):
+                print(f"⏭️  {pdf_name} is up to date")
+            elif args.dry_run:
                 print(f"Would run: {' '.join(cmd)}")
             else:
                 success = run_command(cmd, f"Generating PDF: {pdf_name} (from {mode} version)", args.verbose)
@@ -445,6 +697,7 @@ Examples (run from src/ directory):
                     # Continue with other files
                 else:
                     print(f"✅ Generated: {pdf_path} (from {mode} version)")
+                    cache.record('pdf', group_key_for(whimper_file), inputs, [pdf_path])
     else:
         print("⏭️  Skipping PDF generation")
     
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Pipeline Graph for Whimperizer
+In-process stage graph used by `pipeline.py --engine graph`: download, whimperize / multi-run,
+consolidate and render are nodes with typed outputs that are passed along in memory. Config is
+loaded once, heavy libraries are imported once, and nodes whose inputs are ready run
+concurrently (e.g. the PDF renderer loads its fonts while the model calls are still running).
+"""
+
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from build_cache import download_inputs, get_build_cache, input_files_by_group, pdf_inputs, whimperize_inputs
+from call_context import submit_with_context
+from config_loader import load_config
+from group_scheduler import configure_scheduling, get_group_scheduler
+from tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
+# Node states
+PENDING, RUNNING, DONE, FAILED, SKIPPED = 'pending', 'running', 'done', 'failed', 'skipped'
+
+
+# Typed artifacts passed between nodes
+
+@dataclass
+class Downloads:
+    input_dir: Path
+    files: List[Path]
+
+
+@dataclass
+class RunOutputs:
+    """Whimperized outputs per group: [(file, mode)] with one entry per successful run"""
+    outputs: Dict[str, List[Tuple[Path, str]]]
+    cached: Dict[str, Tuple[Path, str]] = field(default_factory=dict)  # Up-to-date final texts
+    inputs: Dict[str, dict] = field(default_factory=dict)              # Build inputs, recorded once final
+
+
+@dataclass
+class FinalTexts:
+    """The one file per group that gets rendered: (file, mode)"""
+    files: Dict[str, Tuple[Path, str]]
+
+
+@dataclass
+class PdfRenderer:
+    generator: Any
+    style: str
+
+
+@dataclass
+class Pdfs:
+    files: Dict[str, Path]
+    failed: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Node:
+    name: str
+    run: Callable[..., Any]              # Called with one keyword argument per input node
+    inputs: Tuple[str, ...] = ()
+    output_type: Optional[type] = None   # Checked when the node returns
+    status: str = PENDING
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class StageGraph:
+    """Tiny DAG executor: runs every node as soon as all of its inputs have succeeded"""
+
+    def __init__(self, max_workers: int = 4):
+        self.nodes: Dict[str, Node] = {}
+        self.outputs: Dict[str, Any] = {}
+        self.max_workers = max_workers
+
+    def add(self, name: str, run: Callable[..., Any], inputs: Tuple[str, ...] = (),
+            output_type: Optional[type] = None) -> Node:
+        if name in self.nodes:
+            raise ValueError(f"Duplicate node '{name}'")
+        node = Node(name, run, tuple(inputs), output_type)
+        self.nodes[name] = node
+        return node
+
+    def order(self) -> List[str]:
+        """Topological order; raises ValueError on unknown inputs or cycles"""
+        for node in self.nodes.values():
+            for name in node.inputs:
+                if name not in self.nodes:
+                    raise ValueError(f"Node '{node.name}' depends on unknown node '{name}'")
+        ordered, placed = [], set()
+        while len(ordered) < len(self.nodes):
+            ready = [n for n in self.nodes.values()
+                     if n.name not in placed and all(i in placed for i in n.inputs)]
+            if not ready:
+                raise ValueError("Stage graph has a cycle")
+            for node in ready:
+                ordered.append(node.name)
+                placed.add(node.name)
+        return ordered
+
+    def describe(self) -> str:
+        lines = []
+        for name in self.order():
+            node = self.nodes[name]
+            after = f" <- {', '.join(node.inputs)}" if node.inputs else ""
+            produces = f" -> {node.output_type.__name__}" if node.output_type else ""
+            lines.append(f"  • {name}{after}{produces}")
+        return '\n'.join(lines)
+
+    def _execute(self, node: Node):
+        started = time.perf_counter()
+        try:
+            kwargs = {name: self.outputs[name] for name in node.inputs}
+            with get_tracer().span(node.name, 'stage'):
+                result = node.run(**kwargs)
+            if node.output_type is not None and not isinstance(result, node.output_type):
+                raise TypeError(f"Node '{node.name}' returned {type(result).__name__}, "
+                                f"expected {node.output_type.__name__}")
+            return result
+        finally:
+            node.seconds = round(time.perf_counter() - started, 2)
+
+    def run(self) -> Dict[str, Node]:
+        """Run the graph; a failed node skips everything downstream of it"""
+        self.order()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='stage') as executor:
+            running = {}
+            while True:
+                for node in self.nodes.values():
+                    if node.status != PENDING:
+                        continue
+                    upstream = [self.nodes[i].status for i in node.inputs]
+                    if any(s in (FAILED, SKIPPED) for s in upstream):
+                        node.status = SKIPPED
+                        logger.warning(f"⏭️  Skipping stage '{node.name}' (an input stage did not succeed)")
+                    elif all(s == DONE for s in upstream):
+                        node.status = RUNNING
+                        logger.info(f"▶️  Stage '{node.name}' started")
+                        running[submit_with_context(executor, self._execute, node)] = node
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    try:
+                        self.outputs[node.name] = future.result()
+                        node.status = DONE
+                        logger.info(f"✅ Stage '{node.name}' finished in {node.seconds:.1f}s")
+                    except Exception as e:
+                        node.status, node.error = FAILED, str(e)
+                        logger.error(f"❌ Stage '{node.name}' failed after {node.seconds:.1f}s: {e}")
+        return self.nodes
+
+
+# Pipeline stages
+
+def group_key_for(path: Path) -> str:
+    """zaltz-2a-16to21-whimperized-... -> zaltz-2a"""
+    prefix = path.stem.split('-whimperized-')[0]
+    parts = prefix.split('-')
+    return f"{parts[0]}-{parts[1]}" if len(parts) >= 2 else prefix
+
+
+def download_stage(args) -> Downloads:
+    cache = get_build_cache()
+    inputs = download_inputs(Path(args.urls), args.downloader, args.download_format)
+    entry = cache.lookup('download', 'all', inputs)
+    if entry:
+        return Downloads(Path(args.download_dir), [Path(p) for p in entry['outputs']])
+    if args.downloader == 'basic':
+        from bulk_downloader import BulkHTMLDownloader
+        BulkHTMLDownloader(args.urls, args.download_dir, args.download_delay).run(output_format=args.download_format)
+    else:
+        from selenium_downloader import BulkHTMLDownloaderSelenium
+        BulkHTMLDownloaderSelenium(args.urls, args.download_dir, args.download_delay, args.headless).run()
+    input_dir = Path(args.download_dir)
+    files = sorted(input_dir.glob('*.txt'))
+    if files:
+        cache.record('download', 'all', inputs, files)
+    return Downloads(input_dir, files)
+
+
+def whimperize_stage(args, config: dict, groups: Optional[List[str]] = None) -> RunOutputs:
+    """One run (whimperizer) or N runs concurrently (multi_runner's in-process engine); up-to-date groups are skipped"""
+    groups = groups if groups is not None else args.groups
+    runs = RunOutputs({})
+    lock = threading.Lock()
+
+    cache = get_build_cache()
+    if cache.enabled:
+        for group_key, files in input_files_by_group(config['processing']['input_dir'], groups).items():
+            runs.inputs[group_key] = whimperize_inputs(config, files, args.runs, args.provider)
+            entry = cache.lookup('whimperize', group_key, runs.inputs[group_key])
+            if entry:
+                runs.cached[group_key] = (Path(entry['outputs'][0]), entry.get('mode', 'normal'))
+        groups = [group_key for group_key in runs.inputs if group_key not in runs.cached]
+        if not groups:
+            return runs
+
+    def collect(group_key, result):
+        if result:
+            with lock:
+                runs.outputs.setdefault(group_key, []).append((Path(result['final_file']), result['final_mode']))
+
+    if args.runs > 1:
+        from multi_runner import run_in_process
+        results = run_in_process(config, list(range(1, args.runs + 1)), groups,
+                                 on_group_done=lambda run, group_key, result: collect(group_key, result))
+        if not any(results.values()) and not runs.cached:
+            raise RuntimeError("every whimperize run failed")
+    else:
+        from whimperizer import Whimperizer
+        Whimperizer(config=config, provider_override=args.provider).run(groups, on_group_done=collect)
+    if not runs.outputs and not runs.cached:
+        raise RuntimeError("no group was whimperized")
+    # Up-to-date groups still go on to consolidate and render when the rebuilt ones fail
+    failed = [group_key for group_key in groups or [] if group_key not in runs.outputs]
+    if failed:
+        logger.error(f"❌ Whimperize failed for {len(failed)} group(s): {', '.join(failed)}")
+    return runs
+
+
+def consolidate_stage(args, config: dict, runs: RunOutputs) -> FinalTexts:
+    """Consolidate groups that have several runs; single-run groups pass straight through"""
+    files = {group_key: outputs[0] for group_key, outputs in runs.outputs.items()}
+    to_consolidate = {group_key: [path for path, _ in outputs]
+                      for group_key, outputs in runs.outputs.items() if len(outputs) >= 2}
+    if to_consolidate:
+        from consolidator import consolidate_groups, create_ai_provider
+        from run_ranker import select_runs
+        consolidation_config = config.get('multi_run', {}).get('consolidation', {})
+        ranking = consolidation_config.get('ranking')
+        with get_tracer().profile('ranking'):
+            candidates = {group_key: select_runs(group_key, paths, ranking)
+                          for group_key, paths in to_consolidate.items()}
+        results = consolidate_groups(candidates, create_ai_provider(consolidation_config), args.whimper_dir,
+                                     args.consolidation_workers, args.verbose, consolidation_config.get('tree'))
+        for group_key, path in results.items():
+            if path:
+                files[group_key] = (Path(path), 'consolidated')
+            else:
+                logger.warning(f"⚠️ Consolidation failed for {group_key}, using an individual run for the PDF")
+
+    cache = get_build_cache()
+    for group_key, (path, mode) in files.items():
+        # A failed consolidation is not recorded, so the next run tries again
+        if group_key in runs.inputs and (mode == 'consolidated' or group_key not in to_consolidate):
+            cache.record('whimperize', group_key, runs.inputs[group_key], [path], mode=mode)
+    return FinalTexts({**runs.cached, **files})
+
+
+def existing_outputs_stage(args) -> FinalTexts:
+    """--skip-whimperize: pick the best file already on disk for each group"""
+    from pipeline import find_best_whimperized_files
+    best = find_best_whimperized_files(args.whimper_dir, args.groups)
+    if not best:
+        raise RuntimeError(f"no whimperized files found in {args.whimper_dir}")
+    return FinalTexts({group_key_for(path): (path, mode) for path, mode in best})
+
+
+def pdf_setup_stage(args) -> PdfRenderer:
+    """Import reportlab and load fonts/backgrounds once, in parallel with the model stages"""
+    from wimpy_pdf_generator import WimpyPDFGenerator, load_reportlab
+    load_reportlab()
+    return PdfRenderer(WimpyPDFGenerator(args.resources_dir, args.config), args.pdf_style)
+
+
+def render_group_pdf(args, config: dict, generator, style: str, group_key: str, path: Path, mode: str) -> Path:
+    """Render one group's final text unless the same PDF was already built from it"""
+    from pipeline import pdf_name_for
+    from wimpy_pdf_generator import read_file_content
+    cache = get_build_cache()
+    inputs = pdf_inputs(config, path, style, args.resources_dir)
+    entry = cache.lookup('pdf', group_key, inputs)
+    if entry:
+        return Path(entry['outputs'][0])
+    pdf_path = Path(args.pdf_dir) / pdf_name_for(path)
+    content = read_file_content(str(path))
+    if not content:
+        raise ValueError(f"could not read {path}")
+    tracer = get_tracer()
+    with tracer.span(group_key, 'render', mode=mode), tracer.profile('pdf'):
+        generator.create_pdf(content, str(pdf_path), style)
+    cache.record('pdf', group_key, inputs, [pdf_path])
+    print(f"✅ Generated: {pdf_path} (from {mode} version)")
+    return pdf_path
+
+
+def render_stage(args, config: dict, final: FinalTexts, renderer: PdfRenderer) -> Pdfs:
+    pdfs = Pdfs({})
+    files = {group_key: [path] for group_key, (path, _) in final.files.items()}
+    for group_key in get_group_scheduler().order(sorted(files), files, stages=()):
+        path, mode = final.files[group_key]
+        try:
+            pdfs.files[group_key] = render_group_pdf(args, config, renderer.generator, renderer.style,
+                                                     group_key, path, mode)
+        except Exception as e:
+            pdfs.failed.append(group_key)
+            print(f"❌ PDF generation failed for {path.name} ({mode} version): {e}")
+    if not pdfs.files:
+        raise RuntimeError("no PDF could be generated")
+    return pdfs
+
+
+def build_pipeline_graph(args, config: dict) -> StageGraph:
+    """Map pipeline.py flags onto graph nodes (skipped steps are simply left out)"""
+    graph = StageGraph(max_workers=4)
+    if not args.skip_download:
+        graph.add('download', lambda: download_stage(args), output_type=Downloads)
+
+    if not args.skip_whimperize:
+        upstream = ('download',) if 'download' in graph.nodes else ()
+        graph.add('multi_run' if args.runs > 1 else 'whimperize',
+                  lambda **_: whimperize_stage(args, config), upstream, RunOutputs)
+        run_node = 'multi_run' if args.runs > 1 else 'whimperize'
+        graph.add('consolidate', lambda **inputs: consolidate_stage(args, config, inputs[run_node]),
+                  (run_node,), FinalTexts)
+        final_node = 'consolidate'
+    else:
+        upstream = ('download',) if 'download' in graph.nodes else ()
+        graph.add('existing_outputs', lambda **_: existing_outputs_stage(args), upstream, FinalTexts)
+        final_node = 'existing_outputs'
+
+    if not args.skip_pdf:
+        graph.add('pdf_setup', lambda: pdf_setup_stage(args), output_type=PdfRenderer)
+        graph.add('render', lambda **inputs: render_stage(args, config, inputs[final_node], inputs['pdf_setup']),
+                  (final_node, 'pdf_setup'), Pdfs)
+    return graph
+
+
+def stage_dirs_overlay(args) -> dict:
+    """Stages hand files to each other through these directories, so the flags win over config"""
+    return {'processing': {'input_dir': args.download_dir, 'output_dir': args.whimper_dir}}
+
+
+def run_pipeline_graph(args) -> bool:
+    """pipeline.py --engine graph entry point; returns overall success"""
+    config = load_config(args.config, [stage_dirs_overlay(args)])
+    configure_scheduling(config)
+
+    graph = build_pipeline_graph(args, config)
+    print(f"🧩 Stage graph:\n{graph.describe()}")
+    if args.dry_run:
+        return True
+
+    started = time.perf_counter()
+    nodes = graph.run()
+    print(f"\n📊 Stage summary ({time.perf_counter() - started:.1f}s):")
+    for name in graph.order():
+        node = nodes[name]
+        seconds = f"{node.seconds:.1f}s" if node.seconds is not None else '-'
+        error = f"  ({node.error})" if node.error else ""
+        print(f"   {name:<18} {node.status:<8} {seconds:>8}{error}")
+    return all(node.status == DONE for node in nodes.values())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Provider Health Tracking for Whimperizer
+Per-provider circuit breakers and latency scores shared by every group and run in the process,
+so an outage is detected once and later calls route straight to healthy fallbacks
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Defaults used when config.yaml has no api.circuit_breaker section
+DEFAULT_BREAKER_SETTINGS = {
+    'enabled': True,
+    'failure_threshold': 3,      # Consecutive failures (or slow calls) before the breaker opens
+    'slow_call_seconds': None,   # Calls slower than this count as a strike; None disables
+    'cooldown_seconds': 120,     # How long an open breaker waits before a half-open probe
+    'latency_aware': False,      # Prefer the fastest healthy provider instead of config order
+}
+
+# Weight given to the newest sample in the latency moving average
+LATENCY_EWMA_ALPHA = 0.3
+
+
+class CircuitBreaker:
+    """Closed -> open after repeated strikes, open -> half-open after cooldown, one probe decides"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, slow_call_seconds: Optional[float] = None,
+                 cooldown_seconds: float = 120, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.clock = clock
+
+        self.state = CLOSED
+        self.consecutive_strikes = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+
+        self.successes = 0
+        self.failures = 0
+        self.latency_ewma: Optional[float] = None
+        self.latency_samples: List[float] = []
+
+    def is_available(self) -> bool:
+        """Whether a request could be sent now (does not change state)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.clock() - self.opened_at >= self.cooldown_seconds
+        return not self.probe_in_flight
+
+    def try_acquire(self) -> bool:
+        """Reserve the right to send a request; open breakers past cooldown become half-open"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if self.clock() - self.opened_at < self.cooldown_seconds:
+                return False
+            self.state = HALF_OPEN
+            logging.getLogger(__name__).info(f"Circuit {self.name}: half-open, sending probe request")
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        return True
+
+    def release(self):
+        """Give back a reservation that sent nothing (the probe slot reopens; no success or strike)"""
+        self.probe_in_flight = False
+
+    def record_success(self, latency: float):
+        self._record_latency(latency)
+        self.successes += 1
+        if self.slow_call_seconds is not None and latency > self.slow_call_seconds:
+            self._strike(f"slow call ({latency:.1f}s > {self.slow_call_seconds}s)")
+            return
+        if self.state != CLOSED:
+            logging.getLogger(__name__).info(f"Circuit {self.name}: probe succeeded, closing")
+        self.state = CLOSED
+        self.consecutive_strikes = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self, latency: Optional[float] = None):
+        if latency is not None:
+            self._record_latency(latency)
+        self.failures += 1
+        self._strike("failure")
+
+    def _strike(self, reason: str):
+        self.probe_in_flight = False
+        self.consecutive_strikes += 1
+        if self.state == HALF_OPEN or self.consecutive_strikes >= self.failure_threshold:
+            if self.state != OPEN:
+                logging.getLogger(__name__).warning(
+                    f"Circuit {self.name}: opening after {reason} "
+                    f"({self.consecutive_strikes} consecutive strike(s))")
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+    def _record_latency(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * self.latency_ewma
+        self.latency_samples.append(latency)
+        del self.latency_samples[:-100]  # Keep a bounded window of recent samples
+
+    def health_score(self) -> float:
+        """0.0 (dead) .. 1.0 (healthy) from state and success ratio"""
+        if self.state == OPEN:
+            return 0.0
+        total = self.successes + self.failures
+        ratio = self.successes / total if total else 1.0
+        return ratio * (0.5 if self.state == HALF_OPEN else 1.0)
+
+
+class HealthRegistry:
+    """Thread-safe set of circuit breakers keyed by provider/model"""
+
+    def __init__(self, settings: Optional[dict] = None, clock: Callable[[], float] = time.monotonic):
+        self.settings = dict(DEFAULT_BREAKER_SETTINGS)
+        self.settings.update(settings or {})
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def configure(self, settings: Optional[dict]):
+        """Apply config.yaml settings; existing breakers keep their state"""
+        with self._lock:
+            self.settings.update(settings or {})
+            for breaker in self._breakers.values():
+                breaker.failure_threshold = max(1, int(self.settings['failure_threshold']))
+                breaker.slow_call_seconds = self.settings['slow_call_seconds']
+                breaker.cooldown_seconds = self.settings['cooldown_seconds']
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            return self._get_breaker(name)
+
+    def order_attempts(self, attempts: List[Tuple], key: Callable[[Tuple], str]) -> List[Tuple]:
+        """
+        Drop attempts whose breaker is open and, in latency-aware mode, sort the rest fastest first.
+        Returns an empty list when every breaker is open; the caller decides whether to force the chain.
+        """
+        if not self.settings['enabled']:
+            return list(attempts)
+
+        with self._lock:
+            available = [a for a in attempts if self._get_breaker(key(a)).is_available()]
+            if self.settings['latency_aware']:
+                # Providers without latency history sort first so they get measured once
+                available.sort(key=lambda a: self._get_breaker(key(a)).latency_ewma or 0.0)
+            return available
+
+    def try_acquire(self, name: str) -> bool:
+        if not self.settings['enabled']:
+            return True
+        with self._lock:
+            return self._get_breaker(name).try_acquire()
+
+    def release(self, name: str):
+        with self._lock:
+            self._get_breaker(name).release()
+
+    def record_success(self, name: str, latency: float):
+        with self._lock:
+            self._get_breaker(name).record_success(latency)
+
+    def record_failure(self, name: str, latency: Optional[float] = None):
+        with self._lock:
+            self._get_breaker(name).record_failure(latency)
+
+    def _get_breaker(self, name: str) -> CircuitBreaker:
+        """Caller must hold self._lock"""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_threshold=self.settings['failure_threshold'],
+                slow_call_seconds=self.settings['slow_call_seconds'],
+                cooldown_seconds=self.settings['cooldown_seconds'],
+                clock=self.clock,
+            )
+            self._breakers[name] = breaker
+        return breaker
+
+    def latency_percentile(self, name: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Nearest-rank latency percentile for a breaker, or None without enough samples"""
+        with self._lock:
+            samples = sorted(self._get_breaker(name).latency_samples)
+        if len(samples) < max(1, min_samples):
+            return None
+        rank = max(1, int(round(percentile / 100.0 * len(samples))))
+        return samples[min(rank, len(samples)) - 1]
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Current state of every breaker (for logging and status reports)"""
+        with self._lock:
+            return {
+                name: {
+                    'state': b.state,
+                    'health': round(b.health_score(), 3),
+                    'latency_ewma': b.latency_ewma,
+                    'successes': b.successes,
+                    'failures': b.failures,
+                }
+                for name, b in self._breakers.items()
+            }
+
+
+class HedgeBudget:
+    """Caps how many hedged (duplicate) requests may be fired, absolutely and as a share of all calls"""
+
+    def __init__(self, max_hedges: int = 10, max_hedge_ratio: float = 0.2):
+        self.max_hedges = max_hedges
+        self.max_hedge_ratio = max_hedge_ratio
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def configure(self, max_hedges: int, max_hedge_ratio: float):
+        with self._lock:
+            self.max_hedges = max_hedges
+            self.max_hedge_ratio = max_hedge_ratio
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire(self) -> bool:
+        """Reserve one hedge if both the absolute cap and the ratio cap allow it"""
+        with self._lock:
+            if self.hedges >= self.max_hedges:
+                return False
+            if self.hedges + 1 > self.max_hedge_ratio * max(self.calls, 1):
+                return False
+            self.hedges += 1
+            return True
+
+
+_health_registry = HealthRegistry()
+_hedge_budget = HedgeBudget()
+
+
+def get_health_registry() -> HealthRegistry:
+    """Return the process-wide health registry"""
+    return _health_registry
+
+
+def get_hedge_budget() -> HedgeBudget:
+    """Return the process-wide hedge budget"""
+    return _hedge_budget
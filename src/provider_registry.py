@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Provider Registry for Whimperizer
+Builds each AI SDK client once per process and hands the same instance to every caller,
+so repeated calls (fallbacks, iterative turns, consolidation) reuse keep-alive connections
+instead of paying client setup and TLS handshakes again
+"""
+
+import os
+import json
+import logging
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Default endpoints - used to normalise keys so "no base_url" and the default URL share a client
+DEFAULT_BASE_URLS = {
+    'openai': 'https://api.openai.com/v1',
+    'anthropic': 'https://api.anthropic.com',
+    'google': 'https://generativelanguage.googleapis.com',
+}
+
+API_KEY_ENV_VARS = {
+    'openai': 'OPENAI_API_KEY',
+    'anthropic': 'ANTHROPIC_API_KEY',
+    'google': 'GOOGLE_API_KEY',
+}
+
+
+# SDK module per provider; imported only when a client for that provider is first created
+SDK_MODULES = {
+    'openai': 'openai',
+    'anthropic': 'anthropic',
+    'google': 'google.generativeai',
+}
+
+
+def sdk_available(provider_name: str) -> bool:
+    """Whether the provider's SDK is installed, without paying for importing it"""
+    try:
+        return importlib.util.find_spec(SDK_MODULES[provider_name]) is not None
+    except (KeyError, ImportError, ValueError):
+        return False
+
+
+def config_key(config: dict) -> str:
+    """Stable, hashable key for a provider configuration dict"""
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+class ProviderRegistry:
+    """Process-wide cache of SDK clients and provider objects (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._providers: Dict[Hashable, Any] = {}
+        self.logger = logging.getLogger('whimperizer.registry')
+
+    def get_client(self, provider_name: str, base_url: Optional[str] = None) -> Any:
+        """Return the shared SDK client for a provider/endpoint, creating it on first use"""
+        key = (provider_name, base_url or DEFAULT_BASE_URLS.get(provider_name, ''))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._create_client(provider_name, key[1])
+                self._clients[key] = client
+                self.logger.info(f"Created shared {provider_name} client for {key[1]}")
+            return client
+
+    def get_provider(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return a cached provider object for key, building it with factory on first use"""
+        with self._lock:
+            provider = self._providers.get(key)
+            if provider is None:
+                provider = factory()
+                self._providers[key] = provider
+            return provider
+
+    def clear(self):
+        """Drop all cached clients and providers (closing clients that support it)"""
+        with self._lock:
+            for client in self._clients.values():
+                close = getattr(client, 'close', None)
+                if callable(close):
+                    try:
+                        close()
+                    except Exception as e:
+                        self.logger.debug(f"Error closing client: {e}")
+            self._clients.clear()
+            self._providers.clear()
+
+    def _create_client(self, provider_name: str, base_url: str) -> Any:
+        env_var = API_KEY_ENV_VARS.get(provider_name)
+        if env_var is None:
+            raise ValueError(f"Unsupported provider: {provider_name}")
+
+        if provider_name == 'openai':
+            import openai
+            api_key = os.getenv(env_var)
+            if not api_key:
+                raise ValueError(f"{env_var} environment variable not set")
+            return openai.OpenAI(api_key=api_key, base_url=base_url)
+
+        if provider_name == 'anthropic':
+            try:
+                import anthropic
+            except ImportError:
+                raise ImportError("anthropic package not installed. Run: pip install anthropic")
+            api_key = os.getenv(env_var)
+            if not api_key:
+                raise ValueError(f"{env_var} environment variable not set")
+            return anthropic.Anthropic(api_key=api_key, base_url=base_url)
+
+        # Google's SDK is configured globally; the "client" is the configured module
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            raise ImportError("google-generativeai package not installed. Run: pip install google-generativeai")
+        api_key = os.getenv(env_var)
+        if not api_key:
+            raise ValueError(f"{env_var} environment variable not set")
+        genai.configure(api_key=api_key)
+        return genai
+
+
+_registry = ProviderRegistry()
+
+
+def get_registry() -> ProviderRegistry:
+    """Return the process-wide provider registry"""
+    return _registry
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Queue Pipeline for Whimperizer
+Distributed mode for pipeline.py: `--queue URL` turns a run into group-level tasks
+(download -> whimperize per run -> consolidate -> render) on a shared work queue, and
+`--worker --queue URL` processes on any number of machines claim and execute them.
+Outputs are written to the same (shared) directories the single-machine pipeline uses.
+"""
+
+import os
+import time
+import socket
+import logging
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from call_context import call_context
+from config_loader import load_config
+from group_scheduler import WHIMPERIZE_STAGES, configure_scheduling
+from tracing import get_tracer
+from work_queue import DEFAULT_LEASE_SECONDS, FINISHED, Task, WorkQueue
+
+logger = logging.getLogger(__name__)
+
+TASK_KINDS = ('download', 'whimperize', 'consolidate', 'render')
+
+# pipeline.py options a worker needs to execute a task the way the coordinator would
+TASK_ARGS = ('config', 'urls', 'download_dir', 'whimper_dir', 'pdf_dir', 'resources_dir', 'pdf_style',
+             'downloader', 'download_format', 'download_delay', 'headless', 'provider', 'runs',
+             'consolidation_workers', 'verbose')
+
+
+def plan_job(queue: WorkQueue, job: str, args) -> int:
+    """Enqueue every group's task chain (workers claim in enqueue order); returns the number of groups"""
+    from build_cache import input_files_by_group
+    payload = {'args': {name: getattr(args, name, None) for name in TASK_ARGS}}
+    scheduler = configure_scheduling(load_config(args.config))
+
+    if args.skip_whimperize:
+        from pipeline import find_best_whimperized_files
+        from pipeline_graph import group_key_for
+        finals = {group_key_for(path): (path, mode) for path, mode in find_best_whimperized_files(args.whimper_dir, args.groups)}
+        files = {group_key: [path] for group_key, (path, _) in finals.items()}
+        if not args.skip_pdf:
+            for group_key in scheduler.order(finals, files, stages=()):
+                path, mode = finals[group_key]
+                queue.enqueue(job, 'render', group_key, {**payload, 'file': str(path), 'mode': mode})
+        return len(finals)
+
+    if args.skip_download:
+        groups = {group_key: None for group_key in input_files_by_group(args.download_dir, args.groups)}
+    else:
+        from group_pipeline import url_groups
+        groups = url_groups(args)
+
+    # Priority groups first, then the longest, so the biggest group doesn't set the finish time
+    files = input_files_by_group(args.download_dir, args.groups)
+    for group_key in scheduler.order(groups, files, WHIMPERIZE_STAGES):
+        urls = groups[group_key]
+        after = [queue.enqueue(job, 'download', group_key, {**payload, 'urls': urls})] if urls else []
+        runs = [queue.enqueue(job, 'whimperize', group_key, {**payload, 'run': n}, after)
+                for n in range(1, args.runs + 1)]
+        final = [queue.enqueue(job, 'consolidate', group_key, payload, runs)] if args.runs > 1 else runs
+        if not args.skip_pdf:
+            queue.enqueue(job, 'render', group_key, payload, final)
+    return len(groups)
+
+
+def wait_for_job(queue: WorkQueue, job: str, poll_seconds: float = 5.0) -> bool:
+    """Print progress until every task of the job has finished; True when none failed"""
+    last = None
+    while True:
+        counts = queue.status(job)
+        total = sum(counts.values())
+        finished = sum(counts.get(state, 0) for state in FINISHED)
+        line = ', '.join(f"{state} {count}" for state, count in sorted(counts.items()))
+        if line != last:
+            print(f"📬 Job {job}: {finished}/{total} tasks finished ({line})")
+            last = line
+        if finished == total:
+            break
+        time.sleep(poll_seconds)
+
+    failed = [task for task in queue.tasks(job) if task['state'] != 'done']
+    for task in failed:
+        print(f"   ❌ {task['kind']} {task['group_key']}: {task['state']} ({task['error']})")
+    return not failed
+
+
+class QueueWorker:
+    """Claims tasks and runs them in this process; downloaders and PDF renderers are reused across tasks"""
+
+    def __init__(self, queue: WorkQueue, worker_id: Optional[str] = None, kinds: Optional[List[str]] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.kinds = kinds
+        self.lease_seconds = lease_seconds
+        self.completed = 0
+        self._configs: Dict[str, dict] = {}
+        self._downloader = None
+        self._generator = None
+
+    def run(self, idle_exit: Optional[float] = None, poll_seconds: float = 2.0) -> int:
+        """Work until idle for idle_exit seconds (None: forever); returns the number of tasks completed"""
+        idle_since = time.monotonic()
+        try:
+            while True:
+                task = self.queue.claim(self.worker_id, self.kinds, self.lease_seconds)
+                if task is None:
+                    if idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                        return self.completed
+                    time.sleep(poll_seconds)
+                    continue
+                self.process(task)
+                idle_since = time.monotonic()
+        finally:
+            if getattr(self._downloader, 'driver', None):
+                self._downloader.driver.quit()
+
+    def process(self, task: Task):
+        logger.info(f"🔧 {self.worker_id}: {task.kind} {task.group_key} (task {task.id}, attempt {task.attempts})")
+        stop = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(task, stop), daemon=True)
+        beat.start()
+        try:
+            run = f"run_{task.payload['run']}" if task.payload.get('run') else None
+            with call_context(group=task.group_key, stage=task.kind, run=run), \
+                    get_tracer().span(task.kind, 'task', task=task.id, attempt=task.attempts):
+                result = getattr(self, f"_{task.kind}")(task, argparse.Namespace(**task.payload['args']))
+        except Exception as e:
+            logger.error(f"❌ {task.kind} {task.group_key} failed: {e}")
+            self.queue.fail(task.id, self.worker_id, str(e))
+            return
+        finally:
+            stop.set()
+            beat.join()
+        if self.queue.complete(task.id, self.worker_id, result):
+            self.completed += 1
+            logger.info(f"✅ {task.kind} {task.group_key} done")
+        else:
+            logger.warning(f"⚠️ Lost the lease on task {task.id} before finishing; its result was discarded")
+
+    def _heartbeat(self, task: Task, stop: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(task.id, self.worker_id, self.lease_seconds):
+                logger.warning(f"⚠️ Task {task.id} lease was lost (another worker may have taken it over)")
+                return
+
+    def _config(self, args) -> dict:
+        """The coordinator's config, with the stage directories pointed at the shared ones"""
+        if args.config not in self._configs:
+            from pipeline_graph import stage_dirs_overlay
+            self._configs[args.config] = load_config(args.config, [stage_dirs_overlay(args)])
+        return self._configs[args.config]
+
+    def _inputs(self, task: Task) -> List[dict]:
+        return [result for result in self.queue.results(task.after).values() if result]
+
+    def _download(self, task: Task, args) -> dict:
+        from group_pipeline import GroupItem, download_group, make_downloader
+        if self._downloader is None:
+            self._downloader = make_downloader(args)
+            if self._downloader is None:
+                raise RuntimeError("downloader could not start")
+        download_group(GroupItem(task.group_key, urls=task.payload['urls']), self._downloader, args)
+        return {}
+
+    def _whimperize(self, task: Task, args) -> dict:
+        from whimperizer import Whimperizer
+        from multi_runner import build_run_config, get_run_model_config
+        config = self._config(args)
+        run_model_config = get_run_model_config(config, task.payload['run']) if args.runs > 1 else None
+        run_config = build_run_config(config, run_model_config) if run_model_config else config
+        provider = args.provider if args.runs == 1 else None
+        results = Whimperizer(config=run_config, provider_override=provider).run([task.group_key]) or []
+        if not results:
+            raise RuntimeError("whimperizer produced no output")
+        return {'file': str(results[0]['final_file']), 'mode': results[0]['final_mode']}
+
+    def _consolidate(self, task: Task, args) -> dict:
+        from pipeline_graph import RunOutputs, consolidate_stage
+        runs = RunOutputs({task.group_key: [(Path(r['file']), r['mode']) for r in self._inputs(task)]})
+        path, mode = consolidate_stage(args, self._config(args), runs).files[task.group_key]
+        return {'file': str(path), 'mode': mode}
+
+    def _render(self, task: Task, args) -> dict:
+        from group_pipeline import make_pdf_generator
+        from pipeline_graph import render_group_pdf
+        source = task.payload if 'file' in task.payload else self._inputs(task)[0]
+        if self._generator is None:
+            self._generator = make_pdf_generator(args)
+        pdf = render_group_pdf(args, self._config(args), self._generator, args.pdf_style, task.group_key,
+                               Path(source['file']), source['mode'])
+        return {'pdf': str(pdf)}
+
+
+def run_workers(queue: WorkQueue, threads: int = 1, kinds: Optional[List[str]] = None,
+                lease_seconds: float = DEFAULT_LEASE_SECONDS, idle_exit: Optional[float] = None) -> int:
+    """`pipeline.py --worker`: one QueueWorker per thread; returns tasks completed"""
+    base = f"{socket.gethostname()}-{os.getpid()}"
+    workers = [QueueWorker(queue, f"{base}-{i + 1}", kinds, lease_seconds) for i in range(max(1, threads))]
+    print(f"👷 {len(workers)} worker(s) on {base} waiting for {', '.join(kinds or TASK_KINDS)} tasks")
+    pool = [threading.Thread(target=worker.run, args=(idle_exit,), name=worker.worker_id) for worker in workers]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    completed = sum(worker.completed for worker in workers)
+    print(f"👷 Workers idle, {completed} task(s) completed")
+    return completed
+
+
+def default_job_name() -> str:
+    return f"job-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Client-side Rate Limiter for Whimperizer
+Token-bucket scheduler per provider/model that keeps concurrent groups and runs under the
+requests-per-minute and tokens-per-minute limits from config.yaml, queues waiting requests
+fairly (round-robin across groups), learns real limits from rate-limit response headers,
+and retries 429s after the advertised delay instead of treating them as hard failures
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from budget_governor import get_governor
+from call_context import get_call_context
+from model_registry import estimate_tokens, get_model_registry
+from tracing import get_tracer
+
+DEFAULT_RATE_LIMIT_SETTINGS = {
+    'max_retries': 3,            # 429 retries inside the provider before falling back
+    'backoff_seconds': 5,        # First retry delay when the server gives no retry-after
+    'expected_output_tokens': 4000,  # Added to the prompt estimate when reserving TPM
+    'models': {},                # Optional per-model {rpm, tpm} overrides; defaults come from the model registry
+}
+
+
+def parse_reset_seconds(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Parse reset headers: OpenAI durations ('1s', '6m0s', '20ms'), plain seconds, or RFC 3339 times"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if parts and ''.join(n + u for n, u in parts) == value:
+        scale = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+        return sum(float(n) * scale[u] for n, u in parts)
+
+    try:
+        reset_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        current = now if now is not None else time.time()
+        return max(0.0, reset_at.timestamp() - current)
+    except ValueError:
+        return None
+
+
+class TokenBucket:
+    """Capacity refills continuously over one minute; blocked_until models server-imposed waits"""
+
+    def __init__(self, capacity_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.capacity = float(capacity_per_minute)
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.blocked_until = 0.0
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket, not forever
+        wait = (amount - self.tokens) / self.rate if self.tokens < amount else 0.0
+        return max(wait, self.blocked_until - self.clock(), 0.0)
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Correct a previous estimate (positive = used more than reserved)"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset_seconds: Optional[float]):
+        """Align with the server's view from rate-limit headers"""
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+            if remaining <= 0 and reset_seconds:
+                self.block_for(reset_seconds)
+
+    def block_for(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+class ModelLimiter:
+    """RPM + TPM buckets for one provider/model with a round-robin queue across groups"""
+
+    def __init__(self, name: str, rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.clock = clock
+        self.requests = TokenBucket(rpm, clock) if rpm else None
+        self.tokens = TokenBucket(tpm, clock) if tpm else None
+        self.blocked_until = 0.0  # Server-imposed pause (429 retry-after), applies even without limits
+        self._cond = threading.Condition()
+        self._queues: 'OrderedDict[str, deque]' = OrderedDict()
+
+    def _buckets(self) -> List[Tuple[TokenBucket, str]]:
+        return [(b, kind) for b, kind in ((self.requests, 'requests'), (self.tokens, 'tokens')) if b]
+
+    def _wait_needed(self, estimated_tokens: int) -> float:
+        wait = max(0.0, self.blocked_until - self.clock())
+        if self.requests:
+            wait = max(wait, self.requests.time_until(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.time_until(estimated_tokens))
+        return wait
+
+    def acquire(self, estimated_tokens: int, group: str = 'default') -> float:
+        """Block until this request may be sent; returns seconds spent waiting"""
+        started = self.clock()
+        ticket = object()
+        with self._cond:
+            self._queues.setdefault(group, deque()).append(ticket)
+            try:
+                while True:
+                    head_group = next(iter(self._queues))
+                    wait = None
+                    if self._queues[head_group][0] is ticket:
+                        wait = self._wait_needed(estimated_tokens)
+                        if wait <= 0:
+                            if self.requests:
+                                self.requests.consume(1)
+                            if self.tokens:
+                                self.tokens.consume(estimated_tokens)
+                            self._dequeue(group, ticket)
+                            return self.clock() - started
+                    self._cond.wait(timeout=wait)
+            except BaseException:
+                self._dequeue(group, ticket)
+                raise
+
+    def _dequeue(self, group: str, ticket: object):
+        """Remove ticket and rotate its group to the back so other groups get the next turn"""
+        queue = self._queues.get(group)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if queue:
+                self._queues.move_to_end(group)
+            else:
+                del self._queues[group]
+        self._cond.notify_all()
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Replace the pre-send estimate with real usage once the response arrives"""
+        if self.tokens and actual_tokens is not None:
+            with self._cond:
+                self.tokens.adjust(actual_tokens - estimated_tokens)
+                self._cond.notify_all()
+
+    def update_from_headers(self, headers: Optional[Dict[str, str]]):
+        """Learn limits/remaining budget from OpenAI- or Anthropic-style rate-limit headers"""
+        if not headers:
+            return
+        lowered = {str(k).lower(): v for k, v in dict(headers).items()}
+        with self._cond:
+            for bucket, kind in self._buckets():
+                limit = _first_number(lowered, [f'x-ratelimit-limit-{kind}', f'anthropic-ratelimit-{kind}-limit'])
+                remaining = _first_number(lowered, [f'x-ratelimit-remaining-{kind}',
+                                                    f'anthropic-ratelimit-{kind}-remaining'])
+                reset = parse_reset_seconds(lowered.get(f'x-ratelimit-reset-{kind}')
+                                            or lowered.get(f'anthropic-ratelimit-{kind}-reset'))
+                bucket.sync(limit, remaining, reset)
+            self._cond.notify_all()
+
+    def back_off(self, seconds: float):
+        """Pause every request to this model (after a 429)"""
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+            self._cond.notify_all()
+
+
+def _first_number(headers: Dict[str, Any], names: List[str]) -> Optional[float]:
+    for name in names:
+        if name in headers:
+            try:
+                return float(headers[name])
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """429 from any provider SDK (OpenAI/Anthropic status_code, Google ResourceExhausted)"""
+    if getattr(error, 'status_code', None) == 429:
+        return True
+    return type(error).__name__ in ('RateLimitError', 'ResourceExhausted', 'TooManyRequests')
+
+
+def error_headers(error: Exception) -> Dict[str, str]:
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    return dict(headers) if headers else {}
+
+
+class RateLimitScheduler:
+    """Process-wide set of model limiters shared by all groups, runs and stages"""
+
+    def __init__(self, settings: Optional[dict] = None, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.settings = dict(DEFAULT_RATE_LIMIT_SETTINGS)
+        self.settings.update(settings or {})
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, str], ModelLimiter] = {}
+        self.logger = logging.getLogger('whimperizer.ratelimit')
+
+    def configure(self, settings: Optional[dict]):
+        """Apply config.yaml api.rate_limits; limiters already created keep their state"""
+        with self._lock:
+            self.settings.update(settings or {})
+
+    def model_limits(self, provider: str, model: str) -> Dict[str, Optional[float]]:
+        """rate_limits.models overrides first, then the model capability registry"""
+        models = self.settings.get('models') or {}
+        limits = models.get(f"{provider}/{model}") or models.get(model)
+        if limits is None:
+            limits = get_model_registry().rate_limits(provider, model)
+            if limits['rpm'] is None and limits['tpm'] is None:
+                limits = models.get('default') or {}
+        return {'rpm': limits.get('rpm'), 'tpm': limits.get('tpm')}
+
+    def limiter(self, provider: str, model: str) -> ModelLimiter:
+        key = (provider, model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limits = self.model_limits(provider, model)
+                limiter = ModelLimiter(f"{provider}/{model}", limits['rpm'], limits['tpm'], self.clock)
+                self._limiters[key] = limiter
+            return limiter
+
+    def estimate(self, messages: List[Dict], provider: Optional[str] = None, model: Optional[str] = None) -> int:
+        """Prompt estimate plus expected output, capped at the model's max output when known"""
+        expected_output = self.settings.get('expected_output_tokens', 0)
+        if provider and model:
+            expected_output = get_model_registry().max_output_tokens(provider, model, expected_output)
+        return estimate_tokens(messages, expected_output)
+
+    def run(self, provider: str, model: str, estimated_tokens: int,
+            send: Callable[[], Tuple[Any, Optional[Dict[str, str]]]],
+            usage_tokens: Optional[Callable[[Any], Optional[int]]] = None) -> Any:
+        """
+        Send a request through the limiter. send() returns (response, headers).
+        429s are retried after retry-after (or exponential backoff) up to max_retries, then re-raised.
+        """
+        limiter = self.limiter(provider, model)
+        with get_tracer().span(limiter.name, 'llm', estimated_tokens=estimated_tokens), get_governor().call_slot():
+            return self._send(limiter, estimated_tokens, send, usage_tokens)
+
+    def _send(self, limiter: 'ModelLimiter', estimated_tokens: int,
+              send: Callable[[], Tuple[Any, Optional[Dict[str, str]]]],
+              usage_tokens: Optional[Callable[[Any], Optional[int]]]) -> Any:
+        group = get_call_context().get('group', 'default')
+        max_retries = int(self.settings.get('max_retries', 3))
+
+        for attempt in range(max_retries + 1):
+            waited = limiter.acquire(estimated_tokens, group)
+            if waited > 0.5:
+                self.logger.info(f"{limiter.name}: waited {waited:.1f}s for rate-limit capacity ({group})")
+            try:
+                response, headers = send()
+            except Exception as e:
+                limiter.settle(estimated_tokens, 0)
+                if not is_rate_limit_error(e) or attempt == max_retries:
+                    raise
+                headers = error_headers(e)
+                delay = parse_reset_seconds(headers.get('retry-after') or headers.get('Retry-After'))
+                if delay is None:
+                    delay = self.settings.get('backoff_seconds', 5) * (2 ** attempt)
+                self.logger.warning(f"{limiter.name}: rate limited (429), retrying in {delay:.1f}s "
+                                    f"[{attempt + 1}/{max_retries}]")
+                limiter.back_off(delay)
+                continue
+
+            limiter.update_from_headers(headers)
+            if usage_tokens is not None:
+                try:
+                    limiter.settle(estimated_tokens, usage_tokens(response))
+                except Exception as e:
+                    self.logger.debug(f"{limiter.name}: could not read usage for settlement: {e}")
+            return response
+
+
+_scheduler = RateLimitScheduler()
+
+
+def get_scheduler() -> RateLimitScheduler:
+    """Return the process-wide rate-limit scheduler"""
+    return _scheduler
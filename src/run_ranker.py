@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Run Ranker for Whimperizer
+Cheap local scoring of whimperized run outputs before consolidation: length, dialogue density,
+diary-day headers and self-duplication, then a diversity-aware top-K pick (near-duplicate runs
+are dropped) so consolidation prompts only carry the strongest, most different candidates
+"""
+
+import re
+import math
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+# multi_run.consolidation.ranking in config.yaml
+DEFAULT_RANKING_SETTINGS = {
+    'enabled': True,
+    'top_k': 4,               # Candidates sent to the consolidator per group
+    'diversity': 0.3,         # 0 = pure score order, 1 = pick the most different candidates
+    'max_similarity': 0.85,   # Drop candidates this similar (shingle Jaccard) to one already picked
+    'max_age_days': None,     # Ignore outputs this much older than the group's newest output
+    'weights': {
+        'length': 1.0,
+        'dialogue': 1.0,
+        'diary_headers': 0.5,
+        'duplication': -1.5,
+    },
+    'groups': {},             # Per-group overrides, e.g. {'zaltz-1a': {'top_k': 6}}
+}
+
+DIARY_HEADER = re.compile(
+    r'^#{1,3}\s*(?:\w+\s+)?(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', re.I | re.M)
+DIALOGUE_LINE = re.compile(r'^\s*["“]')
+SHINGLE_SIZE = 5
+
+
+def ranking_settings(settings: Optional[dict] = None, group_key: Optional[str] = None) -> dict:
+    """Defaults < config < the group's own override"""
+    merged = dict(DEFAULT_RANKING_SETTINGS)
+    merged['weights'] = dict(DEFAULT_RANKING_SETTINGS['weights'])
+    for layer in (settings or {}, ((settings or {}).get('groups') or {}).get(group_key) or {}):
+        for key, value in layer.items():
+            if key == 'weights':
+                merged['weights'].update(value or {})
+            elif key != 'groups':
+                merged[key] = value
+    return merged
+
+
+def shingles(text: str) -> Set[int]:
+    words = re.findall(r"\w+", text.lower())
+    return {hash(tuple(words[i:i + SHINGLE_SIZE])) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))}
+
+
+def similarity(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def text_features(text: str) -> Dict[str, float]:
+    """Raw heuristics for one output (length is normalized later against the group)"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    paragraphs = [p.strip() for p in re.split(r'\n\s*\n', text) if p.strip()]
+    return {
+        'length': len(text),
+        'dialogue': sum(1 for line in lines if DIALOGUE_LINE.match(line)) / len(lines) if lines else 0.0,
+        'diary_headers': len(DIARY_HEADER.findall(text)),
+        # Share of paragraphs that repeat an earlier one (looping / copy-paste output)
+        'duplication': 1 - len(set(paragraphs)) / len(paragraphs) if paragraphs else 0.0,
+    }
+
+
+def score_candidates(texts: Dict[Path, str], weights: Dict[str, float]) -> Dict[Path, dict]:
+    """Per-file features and weighted score; length and headers are scaled to the group's best"""
+    features = {path: text_features(text) for path, text in texts.items()}
+    longest = max((f['length'] for f in features.values()), default=0) or 1
+    most_headers = max((f['diary_headers'] for f in features.values()), default=0) or 1
+    scored = {}
+    for path, f in features.items():
+        normalized = {
+            'length': math.sqrt(f['length'] / longest),  # Diminishing returns on sheer length
+            'dialogue': min(1.0, f['dialogue'] * 2),      # ~50% dialogue lines counts as full marks
+            'diary_headers': f['diary_headers'] / most_headers,
+            'duplication': f['duplication'],
+        }
+        score = sum(weights.get(name, 0) * value for name, value in normalized.items())
+        scored[path] = {**f, 'score': round(score, 4)}
+    return scored
+
+
+def select_runs(group_key: str, files: List[Path], settings: Optional[dict] = None,
+                read=None) -> List[Path]:
+    """
+    Return the top-K diverse candidates for a group, best first. Falls back to the input list
+    when ranking is disabled or there is nothing to prune.
+    """
+    logger = logging.getLogger(__name__)
+    settings = ranking_settings(settings, group_key)
+    if not settings.get('enabled', True) or len(files) <= 2:
+        return list(files)
+
+    if settings.get('max_age_days'):
+        newest = max(f.stat().st_mtime for f in files)
+        cutoff = newest - float(settings['max_age_days']) * 86400
+        stale = [f for f in files if f.stat().st_mtime < cutoff]
+        if stale:
+            logger.info(f"   ⏳ {group_key}: ignoring {len(stale)} output(s) older than {settings['max_age_days']} day(s)")
+        files = [f for f in files if f.stat().st_mtime >= cutoff]
+
+    read = read or (lambda path: Path(path).read_text(encoding='utf-8', errors='replace'))
+    texts = {path: read(path) for path in files}
+    texts = {path: text for path, text in texts.items() if text and text.strip()}
+    scored = score_candidates(texts, settings['weights'])
+    fingerprints = {path: shingles(text) for path, text in texts.items()}
+
+    # Greedy MMR: trade score against similarity to what is already picked
+    top_k = max(2, int(settings['top_k']))
+    diversity = float(settings['diversity'])
+    remaining = sorted(scored, key=lambda p: scored[p]['score'], reverse=True)
+    picked: List[Path] = []
+    while remaining and len(picked) < top_k:
+        def mmr(path):
+            overlap = max((similarity(fingerprints[path], fingerprints[p]) for p in picked), default=0.0)
+            return (1 - diversity) * scored[path]['score'] - diversity * overlap
+        best = max(remaining, key=mmr)
+        remaining.remove(best)
+        overlap = max((similarity(fingerprints[best], fingerprints[p]) for p in picked), default=0.0)
+        if overlap >= float(settings['max_similarity']):
+            logger.debug(f"   {group_key}: dropping near-duplicate {best.name} (similarity {overlap:.2f})")
+            continue
+        picked.append(best)
+    if len(picked) < 2:
+        # Everything looked alike; consolidation still needs two inputs
+        picked += [p for p in sorted(scored, key=lambda p: scored[p]['score'], reverse=True)
+                   if p not in picked][:2 - len(picked)]
+
+    logger.info(f"   🏅 {group_key}: kept {len(picked)} of {len(files)} candidate(s)")
+    for path in sorted(scored, key=lambda p: scored[p]['score'], reverse=True):
+        f = scored[path]
+        mark = '✓' if path in picked else ' '
+        logger.info(f"     {mark} {f['score']:>6.2f}  {f['length']:>7,} chars  dialogue {f['dialogue']:.0%}  "
+                    f"days {f['diary_headers']:>2}  dup {f['duplication']:.0%}  {path.name}")
+    return picked
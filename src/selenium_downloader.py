@@ -16,7 +16,6 @@ import os
 import json
 import csv
 import logging
-import pandas as pd
 import random
 
 # Configure logging
@@ -76,6 +75,7 @@ class BulkHTMLDownloaderSelenium:
     
     def read_csv_urls(self):
         """Read URLs from CSV file with columns: line, value, group1, group2"""
+        import pandas as pd  # Only needed here; keeps importing the downloader cheap
         try:
             df = pd.read_csv(self.input_file)
             
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tracing for Whimperizer
+Spans for pipeline stages, groups, API calls and PDF pages, written as Chrome trace-event JSON
+(open in chrome://tracing or https://ui.perfetto.dev), plus optional cProfile collection for
+the CPU-heavy stages with a top-N hot-function table. Off (and nearly free) until configured.
+"""
+
+import io
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from call_context import get_call_context
+
+DEFAULT_TRACE_DIR = Path('../output/traces')
+
+
+class Tracer:
+    """Process-wide span recorder; span() is a no-op while disabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self.profiling = False
+        self.events: List[Dict[str, Any]] = []
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._profiles: Dict[str, pstats.Stats] = {}
+        self._profiling_thread = threading.local()
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: bool = True, profiling: bool = False):
+        with self._lock:
+            self.enabled = enabled or profiling
+            self.profiling = profiling
+            self.events = []
+            self._profiles = {}
+            self._origin = time.perf_counter()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def start(self, name: str, category: str = 'stage', **args) -> Optional[dict]:
+        """Open a span by hand (for spans that do not fit a with-block); pass the token to finish()"""
+        if not self.enabled:
+            return None
+        context = {k: v for k, v in get_call_context().items() if v is not None}
+        return {'name': name, 'cat': category, 'ts': self._now_us(), 'args': {**context, **args}}
+
+    def finish(self, token: Optional[dict], **args):
+        if token is None:
+            return
+        event = {**token, 'ph': 'X', 'dur': self._now_us() - token['ts'], 'pid': self.pid,
+                 'tid': threading.get_ident()}
+        event['args'] = {**token['args'], **args}
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, category: str = 'stage', **args):
+        token = self.start(name, category, **args)
+        try:
+            yield
+        finally:
+            self.finish(token)
+
+    @contextmanager
+    def profile(self, stage: str):
+        """cProfile this thread for the duration (only with --profile); stats are merged per stage"""
+        if not self.profiling or getattr(self._profiling_thread, 'active', False):
+            yield  # Nested profiled stages are counted in the outer one
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Another profiler owns the interpreter (Python 3.12+ allows only one)
+            yield
+            return
+        self._profiling_thread.active = True
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._profiling_thread.active = False
+            with self._lock:
+                if stage in self._profiles:
+                    self._profiles[stage].add(profiler)
+                else:
+                    self._profiles[stage] = pstats.Stats(profiler)
+
+    def export(self, path: str) -> Path:
+        """Write the Chrome trace-event file (thread names included so rows are labelled)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        with self._lock:
+            events = list(self.events)
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                     'args': {'name': names.get(tid, f"thread-{tid}")}}
+                    for tid in sorted({event['tid'] for event in events})]
+        path.write_text(json.dumps({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}), encoding='utf-8')
+        return path
+
+    def summary(self) -> str:
+        """Per-category / per-span-name totals: where the wall-clock time went"""
+        with self._lock:
+            events = list(self.events)
+        if not events:
+            return "📭 No spans recorded"
+        totals: Dict[tuple, List[float]] = defaultdict(list)
+        for event in events:
+            totals[(event['cat'], event['name'])].append(event['dur'] / 1e6)
+        lines = ["⏱️  Timeline by span (seconds; spans on parallel threads overlap):",
+                 f"  {'category':<12} {'span':<28} {'count':>6} {'total':>9} {'avg':>8} {'max':>8}"]
+        for (category, name), durations in sorted(totals.items(), key=lambda item: -sum(item[1])):
+            lines.append(f"  {category:<12} {name[:28]:<28} {len(durations):>6} {sum(durations):>9.2f} "
+                         f"{sum(durations) / len(durations):>8.3f} {max(durations):>8.3f}")
+        return '\n'.join(lines)
+
+    def profile_report(self, top: int = 25) -> str:
+        """Top-N functions by own time for each profiled stage"""
+        with self._lock:
+            profiles = dict(self._profiles)
+        if not profiles:
+            return "📭 No CPU profiles collected (no profiled stage ran in this process)"
+        sections = []
+        for stage, stats in sorted(profiles.items()):
+            buffer = io.StringIO()
+            stats.stream = buffer
+            stats.sort_stats('tottime').print_stats(top)
+            body = buffer.getvalue()
+            # Drop pstats' preamble, keep the summary line and the table
+            start = body.find('ncalls')
+            header = next((line.strip() for line in body.splitlines() if 'function calls' in line), '')
+            sections.append(f"🔥 Hot functions in '{stage}' ({header}):\n{body[start:].rstrip()}")
+        return '\n\n'.join(sections)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer"""
+    return _tracer
+
+
+def default_trace_path() -> Path:
+    return DEFAULT_TRACE_DIR / f"trace-{time.strftime('%Y%m%d_%H%M%S')}-{os.getpid()}.json"
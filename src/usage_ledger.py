@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Usage Ledger for Whimperizer
+Records prompt/completion/cached tokens, latency and cost for every API call in a SQLite file,
+tagged with provider, model, stage (normal/iterative/consolidation), group and run from the
+call context, so spend can be broken down by stage and tuned against throughput
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from call_context import get_call_context
+
+DEFAULT_USAGE_SETTINGS = {
+    'enabled': True,
+    'ledger_path': '../output/usage/usage_ledger.sqlite',
+    'pricing': {},  # model -> {input, cached_input, output} in USD per 1M tokens
+    'batch_discount': 0.5,  # Batch API calls are billed at this fraction of the pricing rates
+}
+
+# Columns a report may group by
+REPORT_DIMENSIONS = ('stage', 'model', 'provider', 'group_key', 'run', 'invocation', 'day')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    invocation TEXT NOT NULL,
+    run TEXT,
+    group_key TEXT,
+    stage TEXT,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    latency_seconds REAL,
+    cost_usd REAL
+);
+CREATE INDEX IF NOT EXISTS usage_timestamp ON usage (timestamp);
+"""
+
+
+def _count(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def extract_usage(provider: str, response: Any) -> Dict[str, int]:
+    """Normalize SDK usage objects to prompt/completion/cached token counts"""
+    if provider == 'openai':
+        usage = getattr(response, 'usage', None)
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return {
+            'prompt_tokens': _count(getattr(usage, 'prompt_tokens', 0)),
+            'completion_tokens': _count(getattr(usage, 'completion_tokens', 0)),
+            'cached_tokens': _count(getattr(details, 'cached_tokens', 0)),
+        }
+    if provider == 'anthropic':
+        # input_tokens excludes cache reads/writes; fold them in so prompt_tokens is the full prompt
+        usage = getattr(response, 'usage', None)
+        cache_read = _count(getattr(usage, 'cache_read_input_tokens', 0))
+        cache_write = _count(getattr(usage, 'cache_creation_input_tokens', 0))
+        return {
+            'prompt_tokens': _count(getattr(usage, 'input_tokens', 0)) + cache_read + cache_write,
+            'completion_tokens': _count(getattr(usage, 'output_tokens', 0)),
+            'cached_tokens': cache_read,
+        }
+    if provider == 'fake':
+        # FakeLLM.complete() already returns a usage dict
+        return {
+            'prompt_tokens': _count(response.get('prompt_tokens')),
+            'completion_tokens': _count(response.get('completion_tokens')),
+            'cached_tokens': 0,
+        }
+    if provider == 'google':
+        usage = getattr(response, 'usage_metadata', None)
+        return {
+            'prompt_tokens': _count(getattr(usage, 'prompt_token_count', 0)),
+            'completion_tokens': _count(getattr(usage, 'candidates_token_count', 0)),
+            'cached_tokens': _count(getattr(usage, 'cached_content_token_count', 0)),
+        }
+    return {'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0}
+
+
+class PricingTable:
+    """Per-model USD rates per 1M tokens from config.yaml usage.pricing"""
+
+    def __init__(self, pricing: Optional[Dict[str, dict]] = None, batch_discount: float = 1.0):
+        self.pricing = pricing or {}
+        self.batch_discount = batch_discount
+
+    def rates(self, provider: str, model: str) -> Optional[dict]:
+        """Exact provider/model or model match first, then the longest key that prefixes the model name"""
+        for key in (f"{provider}/{model}", model):
+            if key in self.pricing:
+                return self.pricing[key]
+        prefixes = [k for k in self.pricing if model.startswith(k)]
+        return self.pricing[max(prefixes, key=len)] if prefixes else None
+
+    def cost(self, provider: str, model: str, usage: Dict[str, int], batch: bool = False) -> Optional[float]:
+        """None when the model has no pricing entry (reported as unpriced, not as free)"""
+        rates = self.rates(provider, model)
+        if rates is None:
+            return None
+        input_rate = rates.get('input', 0)
+        cached_rate = rates.get('cached_input', input_rate)
+        cached = min(usage['cached_tokens'], usage['prompt_tokens'])
+        cost = (
+            (usage['prompt_tokens'] - cached) * input_rate
+            + cached * cached_rate
+            + usage['completion_tokens'] * rates.get('output', 0)
+        ) / 1_000_000
+        return cost * self.batch_discount if batch else cost
+
+
+class UsageLedger:
+    """Thread-safe SQLite ledger; several processes (parallel runs) may append to the same file"""
+
+    def __init__(self, settings: Optional[dict] = None):
+        self.settings = dict(DEFAULT_USAGE_SETTINGS)
+        self.settings.update(settings or {})
+        self.pricing = PricingTable(self.settings.get('pricing'), self.settings['batch_discount'])
+        self.invocation = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_path: Optional[str] = None
+        self.logger = logging.getLogger('whimperizer.usage')
+
+    def configure(self, settings: Optional[dict]):
+        """Apply config.yaml usage settings (ledger path, pricing table)"""
+        with self._lock:
+            self.settings.update(settings or {})
+            self.pricing = PricingTable(self.settings.get('pricing'), self.settings['batch_discount'])
+
+    @property
+    def path(self) -> str:
+        return self.settings['ledger_path']
+
+    def _connection(self) -> sqlite3.Connection:
+        """Caller must hold self._lock"""
+        if self._conn is None or self._conn_path != self.path:
+            if self._conn is not None:
+                self._conn.close()
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+            self._conn, self._conn_path = conn, self.path
+        return self._conn
+
+    def record(self, provider: str, model: str, response: Any, latency: Optional[float],
+               batch: bool = False) -> Optional[dict]:
+        """Record one successful API call (batch: billed at the batch discount); never raises"""
+        if not self.settings.get('enabled', True):
+            return None
+        try:
+            usage = extract_usage(provider, response)
+            context = get_call_context()
+            entry = {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'invocation': self.invocation,
+                'run': str(context['run']) if context.get('run') is not None else None,
+                'group_key': context.get('group'),
+                'stage': context.get('stage'),
+                'provider': provider,
+                'model': model,
+                **usage,
+                'latency_seconds': latency,
+                'cost_usd': self.pricing.cost(provider, model, usage, batch),
+            }
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    f"INSERT INTO usage ({', '.join(entry)}) VALUES ({', '.join('?' for _ in entry)})",
+                    list(entry.values())
+                )
+                conn.commit()
+            return entry
+        except Exception as e:
+            self.logger.warning(f"Could not record usage for {provider}/{model}: {e}")
+            return None
+
+    def report(self, group_by: Sequence[str] = ('stage',), since: Optional[str] = None) -> List[dict]:
+        """Aggregate calls, tokens, cost and latency by the given dimensions"""
+        for dimension in group_by:
+            if dimension not in REPORT_DIMENSIONS:
+                raise ValueError(f"Unknown report dimension '{dimension}' (choose from {', '.join(REPORT_DIMENSIONS)})")
+        if not Path(self.path).exists():
+            return []
+
+        columns = [("substr(timestamp, 1, 10) AS day" if d == 'day' else d) for d in group_by]
+        select = ', '.join(columns + [
+            'COUNT(*) AS calls',
+            'SUM(prompt_tokens) AS prompt_tokens',
+            'SUM(completion_tokens) AS completion_tokens',
+            'SUM(cached_tokens) AS cached_tokens',
+            'SUM(COALESCE(cost_usd, 0)) AS cost_usd',
+            'SUM(cost_usd IS NULL) AS unpriced_calls',
+            'AVG(latency_seconds) AS avg_latency_seconds',
+        ])
+        query = f"SELECT {select} FROM usage"
+        params: List[str] = []
+        if since:
+            query += " WHERE timestamp >= ?"
+            params.append(since)
+        if group_by:
+            query += f" GROUP BY {', '.join(group_by)} ORDER BY cost_usd DESC, calls DESC"
+
+        with self._lock:
+            cursor = self._connection().execute(query, params)
+            names = [c[0] for c in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def group_latency(self, stages: Sequence[str] = ()) -> Dict[str, float]:
+        """Mean API seconds one pass over each group took (summed per invocation and run, then averaged)"""
+        if not Path(self.path).exists():
+            return {}
+        where = "group_key IS NOT NULL AND latency_seconds IS NOT NULL"
+        if stages:
+            where += f" AND stage IN ({', '.join('?' for _ in stages)})"
+        query = (f"SELECT group_key, AVG(seconds) FROM (SELECT group_key, SUM(latency_seconds) AS seconds "
+                 f"FROM usage WHERE {where} GROUP BY group_key, invocation, run) GROUP BY group_key")
+        with self._lock:
+            return dict(self._connection().execute(query, list(stages)).fetchall())
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def format_usage_report(ledger: UsageLedger, since: Optional[str] = None) -> str:
+    """Human-readable breakdown by stage, model and run plus totals"""
+    totals = ledger.report(group_by=(), since=since)
+    if not totals or not totals[0]['calls']:
+        return f"📭 No usage recorded in {ledger.path}"
+
+    lines = [f"📊 Usage report ({ledger.path})" + (f" since {since}" if since else "")]
+    for title, dimension in (("By stage", 'stage'), ("By model", 'model'), ("By run", 'run'), ("By day", 'day')):
+        lines.append(f"\n{title}:")
+        lines.append(f"  {'':<28} {'calls':>6} {'prompt':>12} {'completion':>12} {'cached':>10} {'cost $':>10} {'avg s':>7}")
+        for row in ledger.report(group_by=(dimension,), since=since):
+            lines.append(_format_row(str(row[dimension] or '-'), row))
+
+    total = totals[0]
+    lines.append("\nTotal:")
+    lines.append(_format_row('all', total))
+    if total['unpriced_calls']:
+        lines.append(f"  ⚠️  {total['unpriced_calls']} call(s) used models without a pricing entry (counted as $0)")
+    return '\n'.join(lines)
+
+
+def _format_row(label: str, row: dict) -> str:
+    latency = row['avg_latency_seconds']
+    return (f"  {label[:28]:<28} {row['calls']:>6} {row['prompt_tokens'] or 0:>12,} "
+            f"{row['completion_tokens'] or 0:>12,} {row['cached_tokens'] or 0:>10,} "
+            f"{row['cost_usd'] or 0:>10.4f} {latency if latency is not None else 0:>7.1f}")
+
+
+_ledger = UsageLedger()
+
+
+def get_ledger() -> UsageLedger:
+    """Return the process-wide usage ledger"""
+    return _ledger
@@ -10,38 +10,53 @@ Features:
 """
 
 import os
-import yaml
 import argparse
 import logging
 from pathlib import Path
 import re
 import json
+import time
 from typing import List, Dict, Tuple, Optional
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
 
-# AI Provider imports
-import openai
-try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+from provider_registry import get_registry, config_key, sdk_available
+from config_loader import ConfigError, load_config, parse_overlay
+from provider_health import get_health_registry, get_hedge_budget
+from budget_governor import EXHAUSTED, BudgetExceeded, get_governor
+from group_scheduler import get_group_scheduler
+from rate_limiter import get_scheduler
+from model_registry import get_model_registry, RequestValidationError
+from call_context import call_context, get_call_context, submit_with_context
+from artifact_catalog import get_catalog
+from tracing import get_tracer
+from usage_ledger import get_ledger, format_usage_report
+from fake_llm import FakeLLM
+from async_logging import (
+    DEFAULT_MAX_BYTES, DEFAULT_BACKUP_COUNT, LoggerRouteFilter,
+    attach_sync_handler, configure_async_logging, log_dir, log_payload, rotating_file_handler
+)
 
-try:
-    import google.generativeai as genai
-    GOOGLE_AVAILABLE = True
-except ImportError:
-    GOOGLE_AVAILABLE = False
+# AI Provider SDKs are imported by the provider registry when a provider is first used
+ANTHROPIC_AVAILABLE = sdk_available('anthropic')
+GOOGLE_AVAILABLE = sdk_available('google')
 
 # Load environment variables
 load_dotenv()
 
 # Configure logging
-def setup_logging(log_level=logging.INFO):
-    """Setup comprehensive logging with file and console handlers"""
+def setup_logging(log_level=logging.INFO, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT):
+    """
+    Setup comprehensive logging with file and console handlers.
+    File writes happen on a background listener thread; files rotate at max_bytes and old
+    generations are gzipped. Full API payloads go to logs/payloads/ once per unique content
+    (logs/ is $WHIMPERIZER_LOG_DIR when set).
+    Calling this again replaces the previous setup instead of stacking handlers.
+    """
     # Create logs directory
-    os.makedirs('logs', exist_ok=True)
+    logs = log_dir()
+    os.makedirs(logs, exist_ok=True)
     
     # Create formatters
     detailed_formatter = logging.Formatter(
@@ -53,40 +68,41 @@ def setup_logging(log_level=logging.INFO):
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
     
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(simple_formatter)
-    root_logger.addHandler(console_handler)
-    
     # File handler for all logs
-    file_handler = logging.FileHandler('logs/whimperizer.log', encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(detailed_formatter)
-    root_logger.addHandler(file_handler)
+    file_handler = rotating_file_handler(str(logs / 'whimperizer.log'), detailed_formatter, max_bytes, backup_count)
+    file_handler.addFilter(LoggerRouteFilter(exclude='whimperizer.api'))
     
-    # Separate file handler for API logs (full content)
-    api_handler = logging.FileHandler('logs/api_calls.log', encoding='utf-8')
-    api_handler.setLevel(logging.DEBUG)
-    api_handler.setFormatter(detailed_formatter)
+    # Separate file handler for API logs (payloads are referenced by hash, see log_payload)
+    api_handler = rotating_file_handler(str(logs / 'api_calls.log'), detailed_formatter, max_bytes, backup_count)
+    api_handler.addFilter(LoggerRouteFilter(include='whimperizer.api', exclude='whimperizer.api.truncated'))
     
     # API logger
     api_logger = logging.getLogger('whimperizer.api')
-    api_logger.addHandler(api_handler)
     api_logger.setLevel(logging.DEBUG)
     api_logger.propagate = False  # Don't propagate to root logger
     
     # Separate file handler for truncated API logs (easy debugging)
-    api_truncated_handler = logging.FileHandler('logs/api_calls_truncated.log', encoding='utf-8')
-    api_truncated_handler.setLevel(logging.DEBUG)
-    api_truncated_handler.setFormatter(detailed_formatter)
+    api_truncated_handler = rotating_file_handler(str(logs / 'api_calls_truncated.log'), detailed_formatter,
+                                                  max_bytes, backup_count)
+    api_truncated_handler.addFilter(LoggerRouteFilter(include='whimperizer.api.truncated'))
     
     # Truncated API logger
     api_truncated_logger = logging.getLogger('whimperizer.api.truncated')
-    api_truncated_logger.addHandler(api_truncated_handler)
     api_truncated_logger.setLevel(logging.DEBUG)
     api_truncated_logger.propagate = False  # Don't propagate to root logger
     
+    configure_async_logging([
+        (root_logger, [file_handler]),
+        (api_logger, [api_handler]),
+        (api_truncated_logger, [api_truncated_handler]),
+    ], payload_dir=str(logs / 'payloads'))
+    
+    # Console handler stays synchronous so log lines interleave correctly with print() output
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(simple_formatter)
+    attach_sync_handler(root_logger, console_handler)
+    
     return logging.getLogger(__name__)
 
 
@@ -105,8 +121,12 @@ def truncate_content(content: str, max_chars: int = 200, show_length: bool = Tru
     if not content:
         return "[EMPTY]"
     
-    # Remove excessive whitespace and newlines for cleaner display
-    clean_content = ' '.join(content.strip().split())
+    # Remove excessive whitespace and newlines for cleaner display.
+    # Only a bounded prefix is cleaned so multi-megabyte transcripts cost O(max_chars) per call.
+    window = content[:max_chars * 8]
+    clean_content = ' '.join(window.strip().split())
+    if len(window) < len(content) and len(clean_content) <= max_chars:
+        clean_content = ' '.join(content.strip().split())  # Mostly whitespace - clean all of it
     
     if len(clean_content) <= max_chars:
         return clean_content
@@ -119,10 +139,22 @@ def truncate_content(content: str, max_chars: int = 200, show_length: bool = Tru
         return f"{truncated}..."
 
 
+def log_estimated_cost(api_logger, usage_entry):
+    """Log the ledger's cost for a call (or why there is none)"""
+    if usage_entry is None:
+        return
+    if usage_entry['cost_usd'] is None:
+        api_logger.info(f"Estimated cost: unknown (no pricing entry for {usage_entry['model']} in usage.pricing)")
+    else:
+        api_logger.info(f"Estimated cost: ${usage_entry['cost_usd']:.6f}")
+
+
 logger = setup_logging()
 
 class AIProvider:
     """Base class for AI providers"""
+    provider_type = None
+    
     def __init__(self, config: dict):
         self.config = config
     
@@ -130,22 +162,40 @@ class AIProvider:
         raise NotImplementedError
 
 class OpenAIProvider(AIProvider):
+    provider_type = 'openai'
+    
     def __init__(self, config: dict):
         super().__init__(config)
         self.api_logger = logging.getLogger('whimperizer.api.openai')
         self.api_truncated_logger = logging.getLogger('whimperizer.api.truncated')
         
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        
-        self.client = openai.OpenAI(
-            api_key=api_key,
-            base_url=config.get('base_url', 'https://api.openai.com/v1')
-        )
+        # Shared client - reuses the same connection pool across every call in this process
+        self.client = get_registry().get_client('openai', config.get('base_url'))
         self.api_logger.info(f"OpenAI client initialized with model: {config['model']}")
     
+    def build_api_params(self, messages: List[Dict]) -> Dict:
+        """Chat completion parameters for this model (also used for batch request lines)"""
+        api_params = {
+            'model': self.config['model'],
+            'messages': messages,
+        }
+        
+        # Token-limit parameter name, output cap and temperature support come from the model registry
+        api_params.update(get_model_registry().request_params(
+            'openai', self.config['model'], messages,
+            max_tokens=self.config.get('max_tokens'), temperature=self.config.get('temperature')
+        ))
+        
+        return api_params
+    
+    def send_request(self, api_params):
+        """Raw API call returning (response, headers) so the rate limiter can read limit headers"""
+        raw_response = self.client.chat.completions.with_raw_response.create(**api_params)
+        return raw_response.parse(), raw_response.headers
+    
     def generate(self, messages: List[Dict]) -> Optional[str]:
+        # Shape and validate before anything is logged or sent; RequestValidationError goes to the caller
+        api_params = self.build_api_params(messages)
         try:
             # Log request details
             self.api_logger.info("=== OpenAI API Request ===")
@@ -154,9 +204,9 @@ class OpenAIProvider(AIProvider):
             self.api_logger.info(f"Temperature: {self.config.get('temperature', 'Not specified')}")
             self.api_logger.info(f"Number of messages: {len(messages)}")
             
-            # Log message details (FULL content for debugging)
+            # Log message details (FULL content, stored once per unique message)
             for i, msg in enumerate(messages):
-                self.api_logger.debug(f"Message {i+1} ({msg['role']}): {msg['content']}")
+                log_payload(self.api_logger, f"Message {i+1} ({msg['role']})", msg['content'])
             
             # Log truncated message details (easier debugging)
             self.api_truncated_logger.info("=== OpenAI API Request (Truncated) ===")
@@ -165,29 +215,16 @@ class OpenAIProvider(AIProvider):
                 truncated_content = truncate_content(msg['content'])
                 self.api_truncated_logger.info(f"Message {i+1} ({msg['role']}): {truncated_content}")
             
-            # Make API call - handle different model parameter requirements
-            api_params = {
-                'model': self.config['model'],
-                'messages': messages,
-            }
-            
-            # Only add temperature for non-reasoning models
-            model_name = self.config['model'].lower()
-            is_reasoning_model = any(x in model_name for x in ['o1-preview', 'o1-mini', 'o1', 'o4-mini'])
-            
-            if not is_reasoning_model:
-                api_params['temperature'] = self.config['temperature']
-            
-            # Add max_tokens only if specified in config and not a reasoning model
-            if self.config.get('max_tokens') and not is_reasoning_model:
-                api_params['max_tokens'] = self.config['max_tokens']
-            elif self.config.get('max_tokens') and is_reasoning_model:
-                # Reasoning models use max_completion_tokens
-                api_params['max_completion_tokens'] = self.config['max_tokens']
-            
-            self.api_logger.info(f"API parameters for {model_name}: {list(api_params.keys())}")
+            self.api_logger.info(f"API parameters for {self.config['model']}: {list(api_params.keys())}")
             
-            response = self.client.chat.completions.create(**api_params)
+            # Send through the shared rate limiter (waits for RPM/TPM capacity, retries 429s)
+            scheduler = get_scheduler()
+            started = time.monotonic()
+            response = scheduler.run(
+                'openai', self.config['model'], scheduler.estimate(messages, 'openai', self.config['model']),
+                send=lambda: self.send_request(api_params),
+                usage_tokens=lambda r: r.usage.total_tokens if getattr(r, 'usage', None) else None
+            )
             
             # Log response details
             self.api_logger.info("=== OpenAI API Response ===")
@@ -195,27 +232,16 @@ class OpenAIProvider(AIProvider):
             self.api_logger.info(f"Model used: {response.model}")
             self.api_logger.info(f"Finish reason: {response.choices[0].finish_reason}")
             
-            # Log token usage
+            # Log token usage and record it in the usage ledger (cost from the config pricing table)
+            usage_entry = get_ledger().record('openai', self.config['model'], response, time.monotonic() - started)
             if hasattr(response, 'usage') and response.usage:
                 usage = response.usage
                 self.api_logger.info(f"Token usage - Prompt: {usage.prompt_tokens}, Completion: {usage.completion_tokens}, Total: {usage.total_tokens}")
-                
-                # Calculate approximate cost (rough estimates)
-                if 'gpt-4' in self.config['model']:
-                    prompt_cost = usage.prompt_tokens * 0.00003  # $0.03 per 1K tokens
-                    completion_cost = usage.completion_tokens * 0.00006  # $0.06 per 1K tokens
-                elif 'gpt-3.5' in self.config['model']:
-                    prompt_cost = usage.prompt_tokens * 0.0000015  # $0.0015 per 1K tokens
-                    completion_cost = usage.completion_tokens * 0.000002  # $0.002 per 1K tokens
-                else:
-                    prompt_cost = completion_cost = 0
-                
-                total_cost = prompt_cost + completion_cost
-                self.api_logger.info(f"Estimated cost: ${total_cost:.6f}")
+                log_estimated_cost(self.api_logger, usage_entry)
             
-            # Log response content (FULL content for debugging)
+            # Log response content (FULL content, stored by hash)
             response_content = response.choices[0].message.content
-            self.api_logger.debug(f"Response content: {response_content}")
+            log_payload(self.api_logger, "Response content", response_content)
             
             # Log truncated response content (easier debugging)
             truncated_response = truncate_content(response_content)
@@ -224,6 +250,8 @@ class OpenAIProvider(AIProvider):
             
             return response_content
             
+        except BudgetExceeded:
+            raise  # Not a provider failure; the fallback chain stops
         except Exception as e:
             error_msg = f"OpenAI API error: {e}"
             self.api_logger.error(error_msg)
@@ -281,6 +309,8 @@ class OpenAIProvider(AIProvider):
             return None
 
 class AnthropicProvider(AIProvider):
+    provider_type = 'anthropic'
+    
     def __init__(self, config: dict):
         super().__init__(config)
         self.api_logger = logging.getLogger('whimperizer.api.anthropic')
@@ -289,26 +319,39 @@ class AnthropicProvider(AIProvider):
         if not ANTHROPIC_AVAILABLE:
             raise ImportError("anthropic package not installed. Run: pip install anthropic")
         
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY environment variable not set")
-        
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = get_registry().get_client('anthropic', config.get('base_url'))
         self.api_logger.info(f"Anthropic client initialized with model: {config['model']}")
     
+    def build_api_params(self, messages: List[Dict]) -> Dict:
+        """Messages API parameters for this model (also used for batch requests)"""
+        registry = get_model_registry()
+        model = self.config['model']
+        # max_tokens is required by the Messages API; default to the model's output limit
+        max_tokens = self.config.get('max_tokens') or registry.max_output_tokens('anthropic', model) or 4096
+        api_params = {'model': model, 'messages': messages}
+        api_params.update(registry.request_params('anthropic', model, messages, max_tokens=max_tokens,
+                                                  temperature=self.config.get('temperature')))
+        return api_params
+    
+    def send_request(self, api_params):
+        """Raw API call returning (response, headers) so the rate limiter can read limit headers"""
+        raw_response = self.client.messages.with_raw_response.create(**api_params)
+        return raw_response.parse(), raw_response.headers
+    
     def generate(self, messages: List[Dict]) -> Optional[str]:
+        # Shape and validate before anything is logged or sent; RequestValidationError goes to the caller
+        api_params = self.build_api_params(messages)
         try:
             # Log request details
             self.api_logger.info("=== Anthropic API Request ===")
             self.api_logger.info(f"Model: {self.config['model']}")
-            self.api_logger.info(f"Max tokens: {self.config['max_tokens']}")
-            self.api_logger.info(f"Temperature: {self.config['temperature']}")
+            self.api_logger.info(f"Max tokens: {api_params.get('max_tokens')}")
+            self.api_logger.info(f"Temperature: {api_params.get('temperature', 'Not supported')}")
             self.api_logger.info(f"Number of messages: {len(messages)}")
             
-            # Log message details (truncated for readability)
+            # Log message details (FULL content, stored once per unique message)
             for i, msg in enumerate(messages):
-                content_preview = msg['content'][:200] + "..." if len(msg['content']) > 200 else msg['content']
-                self.api_logger.debug(f"Message {i+1} ({msg['role']}): {content_preview}")
+                log_payload(self.api_logger, f"Message {i+1} ({msg['role']})", msg['content'])
             
             # Log truncated message details (easier debugging)
             self.api_truncated_logger.info("=== Anthropic API Request (Truncated) ===")
@@ -317,12 +360,13 @@ class AnthropicProvider(AIProvider):
                 truncated_content = truncate_content(msg['content'])
                 self.api_truncated_logger.info(f"Message {i+1} ({msg['role']}): {truncated_content}")
             
-            # Make API call
-            response = self.client.messages.create(
-                model=self.config['model'],
-                max_tokens=self.config['max_tokens'],
-                temperature=self.config['temperature'],
-                messages=messages
+            # Make API call through the shared rate limiter
+            scheduler = get_scheduler()
+            started = time.monotonic()
+            response = scheduler.run(
+                'anthropic', self.config['model'], scheduler.estimate(messages, 'anthropic', self.config['model']),
+                send=lambda: self.send_request(api_params),
+                usage_tokens=lambda r: r.usage.input_tokens + r.usage.output_tokens if getattr(r, 'usage', None) else None
             )
             
             # Log response details
@@ -331,31 +375,16 @@ class AnthropicProvider(AIProvider):
             self.api_logger.info(f"Model used: {response.model}")
             self.api_logger.info(f"Stop reason: {response.stop_reason}")
             
-            # Log token usage
+            # Log token usage and record it in the usage ledger (cost from the config pricing table)
+            usage_entry = get_ledger().record('anthropic', self.config['model'], response, time.monotonic() - started)
             if hasattr(response, 'usage') and response.usage:
                 usage = response.usage
                 self.api_logger.info(f"Token usage - Input: {usage.input_tokens}, Output: {usage.output_tokens}")
-                
-                # Calculate approximate cost for Claude
-                if 'claude-3-opus' in self.config['model']:
-                    input_cost = usage.input_tokens * 0.000015  # $15 per 1M tokens
-                    output_cost = usage.output_tokens * 0.000075  # $75 per 1M tokens
-                elif 'claude-3-sonnet' in self.config['model']:
-                    input_cost = usage.input_tokens * 0.000003  # $3 per 1M tokens
-                    output_cost = usage.output_tokens * 0.000015  # $15 per 1M tokens
-                elif 'claude-3-haiku' in self.config['model']:
-                    input_cost = usage.input_tokens * 0.00000025  # $0.25 per 1M tokens
-                    output_cost = usage.output_tokens * 0.00000125  # $1.25 per 1M tokens
-                else:
-                    input_cost = output_cost = 0
-                
-                total_cost = input_cost + output_cost
-                self.api_logger.info(f"Estimated cost: ${total_cost:.6f}")
+                log_estimated_cost(self.api_logger, usage_entry)
             
-            # Log response content (truncated)
+            # Log response content (FULL content, stored by hash)
             response_content = response.content[0].text
-            content_preview = response_content[:500] + "..." if len(response_content) > 500 else response_content
-            self.api_logger.debug(f"Response content: {content_preview}")
+            log_payload(self.api_logger, "Response content", response_content)
             
             # Log truncated response content (easier debugging)
             truncated_response = truncate_content(response_content)
@@ -364,6 +393,8 @@ class AnthropicProvider(AIProvider):
             
             return response_content
             
+        except BudgetExceeded:
+            raise  # Not a provider failure; the fallback chain stops
         except Exception as e:
             error_msg = f"Anthropic API error: {e}"
             self.api_logger.error(error_msg)
@@ -385,6 +416,8 @@ class AnthropicProvider(AIProvider):
             return None
 
 class GoogleProvider(AIProvider):
+    provider_type = 'google'
+    
     def __init__(self, config: dict):
         super().__init__(config)
         self.api_logger = logging.getLogger('whimperizer.api.google')
@@ -393,31 +426,39 @@ class GoogleProvider(AIProvider):
         if not GOOGLE_AVAILABLE:
             raise ImportError("google-generativeai package not installed. Run: pip install google-generativeai")
         
-        api_key = os.getenv('GOOGLE_API_KEY')
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY environment variable not set")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(self.config['model'])
+        self.genai = get_registry().get_client('google', config.get('base_url'))
+        self.model = self.genai.GenerativeModel(self.config['model'])
         self.api_logger.info(f"Google client initialized with model: {config['model']}")
     
+    def build_generation_config(self, messages: List[Dict]):
+        """GenerationConfig shaped by the model registry (output cap, temperature support)"""
+        params = get_model_registry().request_params(
+            'google', self.config['model'], messages,
+            max_tokens=self.config.get('max_tokens'), temperature=self.config.get('temperature')
+        )
+        return self.genai.types.GenerationConfig(
+            max_output_tokens=params.get('max_tokens'),
+            temperature=params.get('temperature')
+        )
+    
     def generate(self, messages: List[Dict]) -> Optional[str]:
+        # Shape and validate before anything is logged or sent; RequestValidationError goes to the caller
+        generation_config = self.build_generation_config(messages)
         try:
             # Log request details
             self.api_logger.info("=== Google API Request ===")
             self.api_logger.info(f"Model: {self.config['model']}")
-            self.api_logger.info(f"Max tokens: {self.config['max_tokens']}")
-            self.api_logger.info(f"Temperature: {self.config['temperature']}")
+            self.api_logger.info(f"Max tokens: {generation_config.max_output_tokens}")
+            self.api_logger.info(f"Temperature: {generation_config.temperature}")
             self.api_logger.info(f"Number of messages: {len(messages)}")
             
             # Convert messages to Google's format (simple concatenation for now)
             # Google's chat models have different message format, this is a simplified approach
             prompt = "\n\n".join([f"{msg['role']}: {msg['content']}" for msg in messages])
             
-            # Log message details (truncated for readability)
+            # Log message details (FULL content, stored once per unique message)
             for i, msg in enumerate(messages):
-                content_preview = msg['content'][:200] + "..." if len(msg['content']) > 200 else msg['content']
-                self.api_logger.debug(f"Message {i+1} ({msg['role']}): {content_preview}")
+                log_payload(self.api_logger, f"Message {i+1} ({msg['role']})", msg['content'])
             
             prompt_preview = prompt[:500] + "..." if len(prompt) > 500 else prompt
             self.api_logger.debug(f"Combined prompt: {prompt_preview}")
@@ -431,13 +472,13 @@ class GoogleProvider(AIProvider):
             truncated_prompt = truncate_content(prompt)
             self.api_truncated_logger.info(f"Combined prompt: {truncated_prompt}")
             
-            # Make API call
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=self.config['max_tokens'],
-                    temperature=self.config['temperature']
-                )
+            # Make API call through the shared rate limiter (Google returns no limit headers)
+            scheduler = get_scheduler()
+            started = time.monotonic()
+            response = scheduler.run(
+                'google', self.config['model'], scheduler.estimate(messages, 'google', self.config['model']),
+                send=lambda: (self.model.generate_content(prompt, generation_config=generation_config), None),
+                usage_tokens=lambda r: r.usage_metadata.total_token_count if getattr(r, 'usage_metadata', None) else None
             )
             
             # Log response details
@@ -448,20 +489,16 @@ class GoogleProvider(AIProvider):
                 if hasattr(candidate, 'safety_ratings'):
                     self.api_logger.info(f"Safety ratings: {candidate.safety_ratings}")
             
-            # Log token usage (if available)
+            # Log token usage (if available) and record it in the usage ledger
+            usage_entry = get_ledger().record('google', self.config['model'], response, time.monotonic() - started)
             if hasattr(response, 'usage_metadata') and response.usage_metadata:
                 usage = response.usage_metadata
                 self.api_logger.info(f"Token usage - Prompt: {usage.prompt_token_count}, Candidates: {usage.candidates_token_count}, Total: {usage.total_token_count}")
-                
-                # Google pricing is generally lower, rough estimates
-                total_tokens = usage.total_token_count
-                estimated_cost = total_tokens * 0.000001  # Very rough estimate
-                self.api_logger.info(f"Estimated cost: ${estimated_cost:.6f}")
+                log_estimated_cost(self.api_logger, usage_entry)
             
-            # Log response content (truncated)
+            # Log response content (FULL content, stored by hash)
             response_content = response.text
-            content_preview = response_content[:500] + "..." if len(response_content) > 500 else response_content
-            self.api_logger.debug(f"Response content: {content_preview}")
+            log_payload(self.api_logger, "Response content", response_content)
             
             # Log truncated response content (easier debugging)
             truncated_response = truncate_content(response_content)
@@ -470,6 +507,8 @@ class GoogleProvider(AIProvider):
             
             return response_content
             
+        except BudgetExceeded:
+            raise  # Not a provider failure; the fallback chain stops
         except Exception as e:
             error_msg = f"Google API error: {e}"
             self.api_logger.error(error_msg)
@@ -490,12 +529,79 @@ class GoogleProvider(AIProvider):
             
             return None
 
+class FakeProvider(AIProvider):
+    """Deterministic in-process fake model (see fake_llm.py) for load tests and offline dry runs"""
+    provider_type = 'fake'
+    
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self.api_logger = logging.getLogger('whimperizer.api.fake')
+        self.llm = FakeLLM(config)
+        self.api_logger.info(f"Fake provider initialized with model: {config.get('model', 'fake-model')}")
+    
+    def generate(self, messages: List[Dict]) -> Optional[str]:
+        model = self.config.get('model', 'fake-model')
+        try:
+            self.api_logger.info(f"=== Fake API Request === Model: {model} | Messages: {len(messages)}")
+            for i, msg in enumerate(messages):
+                log_payload(self.api_logger, f"Message {i+1} ({msg['role']})", msg['content'])
+            
+            scheduler = get_scheduler()
+            started = time.monotonic()
+            response = scheduler.run(
+                'fake', model, scheduler.estimate(messages, 'fake', model),
+                send=lambda: (self.llm.complete(messages, model), None),
+                usage_tokens=lambda r: r[1]['prompt_tokens'] + r[1]['completion_tokens']
+            )
+            content, usage, _ = response
+            usage_entry = get_ledger().record('fake', model, usage, time.monotonic() - started)
+            self.api_logger.info(f"Token usage - Prompt: {usage['prompt_tokens']}, Completion: {usage['completion_tokens']}")
+            log_estimated_cost(self.api_logger, usage_entry)
+            log_payload(self.api_logger, "Response content", content)
+            return content
+            
+        except BudgetExceeded:
+            raise  # Not a provider failure; the fallback chain stops
+        except Exception as e:
+            self.api_logger.error(f"Fake API error: {e}")
+            print(f"\n❌ Fake API error: {e}")
+            return None
+
 class Whimperizer:
-    def __init__(self, config_file='../config/config.yaml', provider_override=None):
-        self.config = self.load_config(config_file)
+    def __init__(self, config_file='../config/config.yaml', provider_override=None,
+                 config=None, conversation_history=None, input_cache=None, config_overlays=None):
+        # multi_runner's in-process engine passes an already-built config, the shared prompt
+        # and a path -> content cache so N runs load their inputs only once; its subprocess
+        # runs pass their model settings as config_overlays
+        self.config = config if config is not None else self.load_config(config_file, config_overlays)
+        self.input_cache = input_cache if input_cache is not None else {}
         self.provider_name = provider_override or os.getenv('DEFAULT_AI_PROVIDER') or self.config['api']['default_provider']
         self.ai_provider = self.setup_ai_provider()
-        self.conversation_history = self.load_prompt()
+        self._provider_attempts = None  # Built lazily on first API call, then reused
+        
+        # Circuit breakers are process-wide so every group sees the same provider health
+        self.health = get_health_registry()
+        self.health.configure(self.config.get('api', {}).get('circuit_breaker'))
+        
+        # Hedged requests (opt-in) share one process-wide budget
+        self.hedging_config = self.config.get('api', {}).get('hedging') or {}
+        self.hedge_budget = get_hedge_budget()
+        if self.hedging_config.get('enabled'):
+            self.hedge_budget.configure(self.hedging_config.get('max_hedges', 10),
+                                        self.hedging_config.get('max_hedge_ratio', 0.2))
+        
+        # Model capabilities (context window, output cap, parameter support, RPM/TPM)
+        get_model_registry().configure(self.config.get('api', {}).get('models'))
+        
+        # Client-side RPM/TPM limits, shared by every group and run in this process
+        get_scheduler().configure(self.config.get('api', {}).get('rate_limits'))
+        
+        # Per-call token/cost accounting (see --usage-report)
+        get_ledger().configure(self.config.get('usage'))
+        
+        # Group order: priorities first, then longest first (estimated from the ledger's latencies)
+        get_group_scheduler().configure(self.config.get('scheduling'))
+        self.conversation_history = conversation_history if conversation_history is not None else self.load_prompt()
         
         # Log fallback configuration
         fallbacks = self.config.get('api', {}).get('fallbacks', {})
@@ -511,17 +617,13 @@ class Whimperizer:
         # Create output directory
         os.makedirs(self.config['processing']['output_dir'], exist_ok=True)
     
-    def load_config(self, config_file):
-        """Load configuration from YAML file"""
+    def load_config(self, config_file, overlays=None):
+        """Load the validated configuration (parsed once per process), with any overlays applied"""
         try:
-            with open(config_file, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-            logger.info(f"Loaded configuration from {config_file}")
+            config = load_config(config_file, overlays)
+            logger.info(f"Loaded configuration from {config_file}" + (" with overrides" if overlays else ""))
             return config
-        except FileNotFoundError:
-            logger.error(f"Configuration file {config_file} not found")
-            raise
-        except Exception as e:
+        except ConfigError as e:
             logger.error(f"Error loading configuration: {e}")
             raise
     
@@ -533,14 +635,22 @@ class Whimperizer:
         
         logger.info(f"Setting up AI provider: {self.provider_name}")
         
-        if self.provider_name == 'openai':
-            return OpenAIProvider(provider_config)
-        elif self.provider_name == 'anthropic':
-            return AnthropicProvider(provider_config)
-        elif self.provider_name == 'google':
-            return GoogleProvider(provider_config)
-        else:
-            raise ValueError(f"Unsupported provider: {self.provider_name}")
+        return self.build_provider(self.provider_name, provider_config)
+    
+    def build_provider(self, provider_name, provider_config):
+        """Return a provider instance, reusing the process-wide one for identical configs"""
+        provider_classes = {
+            'openai': OpenAIProvider,
+            'anthropic': AnthropicProvider,
+            'google': GoogleProvider,
+            'fake': FakeProvider,
+        }
+        provider_class = provider_classes.get(provider_name)
+        if provider_class is None:
+            raise ValueError(f"Unsupported provider: {provider_name}")
+        
+        key = ('whimperizer', provider_name, config_key(provider_config))
+        return get_registry().get_provider(key, lambda: provider_class(provider_config))
     
     def create_fallback_provider(self, fallback_config):
         """Create a fallback AI provider from fallback configuration"""
@@ -552,14 +662,34 @@ class Whimperizer:
         
         logger.info(f"Creating fallback provider: {provider_name} with model {fallback_config.get('model', 'default')}")
         
-        if provider_name == 'openai':
-            return OpenAIProvider(base_config)
-        elif provider_name == 'anthropic':
-            return AnthropicProvider(base_config)
-        elif provider_name == 'google':
-            return GoogleProvider(base_config)
-        else:
+        if provider_name not in ('openai', 'anthropic', 'google', 'fake'):
             raise ValueError(f"Unsupported fallback provider: {provider_name}")
+        return self.build_provider(provider_name, base_config)
+    
+    def get_provider_attempts(self):
+        """Primary + fallback providers in attempt order, built once and reused for every call"""
+        if self._provider_attempts is not None:
+            return self._provider_attempts
+        
+        # Try primary provider first
+        provider_attempts = [
+            ("primary", self.provider_name, self.ai_provider)
+        ]
+        
+        # Add fallback providers if configured
+        fallbacks = self.config.get('api', {}).get('fallbacks', {})
+        for fallback_key in ['fallback_1', 'fallback_2']:
+            if fallback_key in fallbacks:
+                try:
+                    fallback_config = fallbacks[fallback_key]
+                    fallback_provider = self.create_fallback_provider(fallback_config)
+                    provider_name = f"{fallback_config['provider']} ({fallback_config.get('model', 'default')})"
+                    provider_attempts.append((fallback_key, provider_name, fallback_provider))
+                except Exception as e:
+                    logger.error(f"Failed to create {fallback_key} provider: {e}")
+        
+        self._provider_attempts = provider_attempts
+        return provider_attempts
     
     def load_prompt(self):
         """Load the conversation history from prompt file"""
@@ -634,7 +764,10 @@ class Whimperizer:
         return dict(groups)
     
     def read_file_content(self, file_path):
-        """Read content from a file"""
+        """Read content from a file (or the shared input cache when one was preloaded)"""
+        cached = self.input_cache.get(str(file_path))
+        if cached is not None:
+            return cached
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
@@ -659,6 +792,113 @@ class Whimperizer:
         
         return "\n".join(combined_content)
     
+    @staticmethod
+    def breaker_key(provider):
+        """Circuit breaker name for a provider instance (provider type + model)"""
+        return f"{provider.provider_type}/{provider.config.get('model', 'default')}"
+    
+    @staticmethod
+    def attempt_price(attempt):
+        """USD per 1M input + output tokens for an attempt's model (None when unpriced)"""
+        provider = attempt[2]
+        rates = get_ledger().pricing.rates(provider.provider_type, provider.config.get('model', ''))
+        return rates.get('input', 0) + rates.get('output', 0) if rates else None
+    
+    def run_provider_attempt(self, attempt, messages, attempt_num, total_attempts):
+        """Call one provider, record its health, and return the content (or None on failure)"""
+        attempt_type, provider_name, provider = attempt
+        breaker_name = self.breaker_key(provider)
+        start_time = time.monotonic()
+        try:
+            logger.info(f"Attempt {attempt_num}/{total_attempts}: {attempt_type} provider ({provider_name})")
+            print(f"🤖 Attempt {attempt_num}/{total_attempts}: Trying {provider_name}...")
+            
+            result = provider.generate(messages)
+            latency = time.monotonic() - start_time
+            
+            if result:
+                self.health.record_success(breaker_name, latency)
+                logger.info(f"SUCCESS: {attempt_type} provider ({provider_name}) returned {len(result):,} characters in {latency:.1f}s")
+                print(f"✅ Success with {provider_name}")
+                return result
+            
+            self.health.record_failure(breaker_name, latency)
+            logger.warning(f"FAILURE: {attempt_type} provider ({provider_name}) returned no content")
+            print(f"❌ No response from {provider_name}")
+            
+        except RequestValidationError as e:
+            # Rejected locally before sending - not the provider's fault, so no breaker strike,
+            # but a half-open breaker's probe slot must be given back
+            self.health.release(breaker_name)
+            logger.warning(f"SKIPPED: {attempt_type} provider ({provider_name}) cannot take this request: {e}")
+            print(f"⏭️  Skipping {provider_name}: {e}")
+        
+        except BudgetExceeded:
+            # Nothing was sent: no breaker strike, and the caller stops trying fallbacks
+            self.health.release(breaker_name)
+            raise
+        
+        except Exception as e:
+            self.health.record_failure(breaker_name, time.monotonic() - start_time)
+            logger.error(f"FAILURE: {attempt_type} provider ({provider_name}) failed: {e}")
+            print(f"❌ {provider_name} failed: {str(e)[:100]}...")
+        
+        return None
+    
+    def hedge_delay(self, provider):
+        """Seconds to wait on the primary before hedging: its p-th percentile latency, floored"""
+        percentile = self.hedging_config.get('percentile', 95)
+        min_samples = self.hedging_config.get('min_samples', 5)
+        observed = self.health.latency_percentile(self.breaker_key(provider), percentile, min_samples)
+        if observed is None:
+            observed = self.hedging_config.get('initial_delay_seconds', 120)
+        return max(observed, self.hedging_config.get('min_delay_seconds', 30))
+    
+    def call_with_hedging(self, messages, numbered_attempts, total_attempts, enforce_breakers):
+        """
+        Start the primary; if it has not finished within the hedge delay (and budget allows),
+        send the same request to the next provider and take whichever succeeds first.
+        Returns (result, number_of_attempts_consumed).
+        """
+        (primary_num, primary), (hedge_num, hedge) = numbered_attempts
+        if enforce_breakers and not self.health.try_acquire(self.breaker_key(primary[2])):
+            logger.info(f"Skipping {primary[0]} provider ({primary[1]}): circuit open")
+            return None, 1
+        
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='hedge')
+        try:
+            pending = {submit_with_context(executor, self.run_provider_attempt, primary, messages, primary_num, total_attempts)}
+            tried = 1
+            
+            delay = self.hedge_delay(primary[2])
+            done, pending = wait(pending, timeout=delay)
+            # Breaker first, so an open circuit doesn't use up a hedge slot
+            hedge_breaker = self.breaker_key(hedge[2])
+            if pending and (not enforce_breakers or self.health.try_acquire(hedge_breaker)):
+                if self.hedge_budget.try_acquire():
+                    logger.info(f"HEDGE: {primary[1]} still running after {delay:.0f}s - also sending to {hedge[1]}")
+                    print(f"🏁 {primary[1]} is slow ({delay:.0f}s) - hedging with {hedge[1]}")
+                    pending.add(submit_with_context(executor, self.run_provider_attempt, hedge, messages, hedge_num, total_attempts))
+                    tried = 2
+                elif enforce_breakers:
+                    self.health.release(hedge_breaker)
+            
+            while True:
+                for future in done:
+                    result = future.result()
+                    if result:
+                        # Synchronous SDK calls cannot be interrupted; the loser's result is discarded
+                        for loser in pending:
+                            loser.cancel()
+                        if pending:
+                            logger.info("HEDGE: abandoning the slower in-flight request")
+                        return result, tried
+                if not pending:
+                    return None, tried
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
     def call_ai_api_with_fallbacks(self, messages):
         """Core fallback logic - try primary provider then fallbacks"""
         # Calculate total input length for logging
@@ -672,53 +912,66 @@ class Whimperizer:
         if len(messages) > 1:
             logger.debug(f"Last message ({messages[-1]['role']}): {len(messages[-1]['content'])} chars")
         
-        # Try primary provider first
-        provider_attempts = [
-            ("primary", self.provider_name, self.ai_provider)
-        ]
+        governor = get_governor()
+        if governor.active and governor.state() == EXHAUSTED:
+            logger.error("Job budget exhausted - not calling any provider")
+            print("🛑 Job budget exhausted - skipping API call")
+            return None
         
-        # Add fallback providers if configured
-        fallbacks = self.config.get('api', {}).get('fallbacks', {})
-        for fallback_key in ['fallback_1', 'fallback_2']:
-            if fallback_key in fallbacks:
-                try:
-                    fallback_config = fallbacks[fallback_key]
-                    fallback_provider = self.create_fallback_provider(fallback_config)
-                    provider_name = f"{fallback_config['provider']} ({fallback_config.get('model', 'default')})"
-                    provider_attempts.append((fallback_key, provider_name, fallback_provider))
-                except Exception as e:
-                    logger.error(f"Failed to create {fallback_key} provider: {e}")
+        provider_attempts = self.get_provider_attempts()
         
-        logger.info(f"Will attempt {len(provider_attempts)} provider(s) in sequence")
+        # Skip providers whose circuit is open; if every circuit is open, try the whole chain anyway
+        ordered_attempts = self.health.order_attempts(provider_attempts, key=lambda a: self.breaker_key(a[2]))
+        enforce_breakers = bool(ordered_attempts)
+        if not ordered_attempts:
+            logger.warning("All provider circuits are open - trying the full chain anyway")
+            ordered_attempts = provider_attempts
+        elif len(ordered_attempts) < len(provider_attempts):
+            skipped = [a[1] for a in provider_attempts if a not in ordered_attempts]
+            logger.info(f"Skipping provider(s) with open circuits: {', '.join(skipped)}")
+            print(f"⚡ Skipping unhealthy provider(s): {', '.join(skipped)}")
         
-        # Try each provider in sequence
-        for attempt_num, (attempt_type, provider_name, provider) in enumerate(provider_attempts, 1):
-            try:
-                logger.info(f"Attempt {attempt_num}/{len(provider_attempts)}: {attempt_type} provider ({provider_name})")
-                print(f"🤖 Attempt {attempt_num}/{len(provider_attempts)}: Trying {provider_name}...")
-                
-                result = provider.generate(messages)
-                
+        # Near the job budget: cheapest models first and no hedged (duplicate) requests
+        ordered_attempts = governor.order_attempts(ordered_attempts, self.attempt_price)
+        
+        self.hedge_budget.record_call()
+        total_attempts = len(ordered_attempts)
+        remaining_attempts = list(enumerate(ordered_attempts, 1))
+        
+        try:
+            # Optional hedging: race the primary against the first fallback if the primary stalls
+            if self.hedging_config.get('enabled') and total_attempts > 1 and governor.allow_hedge():
+                result, tried = self.call_with_hedging(messages, remaining_attempts[:2], total_attempts, enforce_breakers)
                 if result:
-                    logger.info(f"SUCCESS: {attempt_type} provider ({provider_name}) returned {len(result):,} characters")
-                    print(f"✅ Success with {provider_name}")
                     return result
-                else:
-                    logger.warning(f"FAILURE: {attempt_type} provider ({provider_name}) returned no content")
-                    print(f"❌ No response from {provider_name}")
-                    
-            except Exception as e:
-                logger.error(f"FAILURE: {attempt_type} provider ({provider_name}) failed: {e}")
-                print(f"❌ {provider_name} failed: {str(e)[:100]}...")
+                remaining_attempts = remaining_attempts[tried:]
+        
+            logger.info(f"Will attempt {len(remaining_attempts)} provider(s) in sequence")
+        
+            # Try each provider in sequence
+            for attempt_num, attempt in remaining_attempts:
+                if enforce_breakers and not self.health.try_acquire(self.breaker_key(attempt[2])):
+                    logger.info(f"Skipping {attempt[0]} provider ({attempt[1]}): circuit open")
+                    continue
+            
+                result = self.run_provider_attempt(attempt, messages, attempt_num, total_attempts)
+                if result:
+                    return result
+        
+        except BudgetExceeded:
+            # Crossed mid-chain: the remaining fallbacks would be refused too, and nothing failed
+            logger.error("Job budget exhausted - stopping before the remaining providers")
+            print("🛑 Job budget exhausted - no further providers tried")
+            return None
         
         # All providers failed
-        logger.error(f"All {len(provider_attempts)} provider attempts failed")
-        print(f"💥 All {len(provider_attempts)} providers failed - no fallbacks remaining")
+        logger.error(f"All {len(ordered_attempts)} provider attempts failed")
+        logger.debug(f"Provider health: {self.health.snapshot()}")
+        print(f"💥 All {len(ordered_attempts)} providers failed - no fallbacks remaining")
         return None
     
-    def call_ai_api(self, content):
-        """Call AI API to whimperize the content with fallback support"""
-        # Build messages array once
+    def build_messages(self, content):
+        """Build the messages array for a whole-group request"""
         if isinstance(self.conversation_history, list):
             # JSON format - use conversation history + new content
             messages = self.conversation_history.copy()
@@ -730,14 +983,6 @@ class Whimperizer:
                 "content": new_message
             })
             logger.debug(f"Using conversation history with {len(self.conversation_history)} messages")
-            
-            # DEBUG: Show what we're actually sending
-            print(f"\n🔍 DEBUG: Final message being sent to AI:")
-            print(f"   Last message length: {len(new_message):,} characters")
-            print(f"   First 1000 chars of combined content:")
-            print(content[:1000])
-            print(f"   Last 500 chars of combined content:")
-            print(content[-500:])
         else:
             # Legacy plain text format
             full_content = f"{self.conversation_history}\n\n{content}"
@@ -746,9 +991,38 @@ class Whimperizer:
                 "content": full_content
             }]
             logger.debug("Using legacy plain text format")
+        return messages
+    
+    def call_ai_api(self, content):
+        """Call AI API to whimperize the content with fallback support"""
+        # Build messages array once
+        messages = self.build_messages(content)
+        
+        if isinstance(self.conversation_history, list):
+            # DEBUG: Show what we're actually sending
+            print(f"\n🔍 DEBUG: Final message being sent to AI:")
+            print(f"   Last message length: {len(messages[-1]['content']):,} characters")
+            print(f"   First 1000 chars of combined content:")
+            print(content[:1000])
+            print(f"   Last 500 chars of combined content:")
+            print(content[-500:])
         
         return self.call_ai_api_with_fallbacks(messages)
     
+    def iterative_file_message(self, file_number, file_content):
+        """User message asking for one file's diary entry during iterative processing"""
+        if file_number == 1:
+            return f"""I think there's A LOT of solid content which could make this story much less BORING. Let's instead take this one piece at a time. Here's the first part of the original, let's WHIMPERIZE this one specific incident!
+
+{file_content}
+
+Please give me a full Wimpy Kid style diary entry for just this incident. Don't worry about the other parts - we'll do those next."""
+        return f"""OK! Here's the next piece from the original. Let's whimperize this one too!
+
+{file_content}
+
+Please give me another Wimpy Kid style diary entry for this incident. Keep the same character voice and style as before."""
+    
     def call_iterative_api(self, group_files, short_response):
         """Call AI API iteratively for each file when response is too short"""
         try:
@@ -778,18 +1052,7 @@ class Whimperizer:
                         continue
                     
                     # Create message for this specific file
-                    if i == 1:
-                        file_message = f"""I think there's A LOT of solid content which could make this story much less BORING. Let's instead take this one piece at a time. Here's the first part of the original, let's WHIMPERIZE this one specific incident!
-
-{file_content}
-
-Please give me a full Wimpy Kid style diary entry for just this incident. Don't worry about the other parts - we'll do those next."""
-                    else:
-                        file_message = f"""OK! Here's the next piece from the original. Let's whimperize this one too!
-
-{file_content}
-
-Please give me another Wimpy Kid style diary entry for this incident. Keep the same character voice and style as before."""
+                    file_message = self.iterative_file_message(i, file_content)
                     
                     messages.append({
                         "role": "user",
@@ -864,11 +1127,23 @@ Please give me another Wimpy Kid style diary entry for this incident. Keep the s
         else:
             line_suffix = ""
         
-        output_file = output_dir / f"{group_key}{line_suffix}-whimperized-{mode}-{model_name_safe}-{timestamp}.md"
+        stem = f"{group_key}{line_suffix}-whimperized-{mode}-{model_name_safe}-{timestamp}"
+        output_file = output_dir / f"{stem}.md"
         
         try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # Concurrent runs of the same model can land on the same second; never overwrite
+            copy_number = 1
+            while True:
+                try:
+                    with open(output_file, 'x', encoding='utf-8') as f:
+                        f.write(content)
+                    break
+                except FileExistsError:
+                    copy_number += 1
+                    output_file = output_dir / f"{stem}-{copy_number}.md"
+            run = get_call_context().get('run')
+            get_catalog(output_dir).register(output_file, group_key, mode, model_name_safe,
+                                             str(run) if run is not None else None)
             logger.info(f"Saved {mode} whimperized content to: {output_file}")
             print(f"   💾 Saved {mode} version to: {output_file}")
             return str(output_file)  # Return filename for summary
@@ -892,7 +1167,8 @@ Please give me another Wimpy Kid style diary entry for this incident. Keep the s
         logger.info(f"Calling {self.provider_name} API for group {group_key}...")
         print(f"🤖 Calling {self.provider_name} API for group {group_key}...")
         
-        whimperized_content = self.call_ai_api(combined_content)
+        with call_context(stage='normal'):
+            whimperized_content = self.call_ai_api(combined_content)
         
         if not whimperized_content:
             error_msg = f"Failed to whimperize group {group_key} - all fallback models exhausted"
@@ -911,7 +1187,8 @@ Please give me another Wimpy Kid style diary entry for this incident. Keep the s
         logger.info(f"Starting iterative processing for more comprehensive coverage...")
         print(f"🔄 Using iterative processing for comprehensive whimperization...")
         
-        followup_response = self.call_iterative_api(group_files, whimperized_content)
+        with call_context(stage='iterative'):
+            followup_response = self.call_iterative_api(group_files, whimperized_content)
         
         final_content = whimperized_content
         final_mode = "normal"
@@ -965,19 +1242,15 @@ Please give me another Wimpy Kid style diary entry for this incident. Keep the s
             "final_file": iterative_file if final_mode == "iterative" else normal_file
         }
     
-    def run(self, target_groups=None):
-        """Main processing function"""
-        logger.info("Starting whimperizer processing...")
-        
-        # Get and group input files
+    def select_groups(self, target_groups=None):
+        """Get and group input files, filtered to target groups if specified"""
         files = self.get_input_files()
         if not files:
             logger.error("No input files found")
-            return
+            return {}
         
         grouped_files = self.group_files(files)
         
-        # Filter to target groups if specified
         if target_groups:
             filtered_groups = {}
             for target in target_groups:
@@ -987,9 +1260,34 @@ Please give me another Wimpy Kid style diary entry for this incident. Keep the s
                     logger.warning(f"Target group '{target}' not found in input files")
             grouped_files = filtered_groups
         
+        return grouped_files
+    
+    def preload_inputs(self, grouped_files):
+        """Read every input file of the selected groups into the shared input cache"""
+        for group_files in grouped_files.values():
+            for file_info in group_files:
+                key = str(file_info['path'])
+                if key not in self.input_cache:
+                    content = self.read_file_content(file_info['path'])
+                    if content is not None:
+                        self.input_cache[key] = content
+        return self.input_cache
+    
+    def run(self, target_groups=None, grouped_files=None, on_group_done=None):
+        """
+        Main processing function (grouped_files skips input discovery when already selected;
+        on_group_done(group_key, result_or_None) is called as each group finishes)
+        """
+        logger.info("Starting whimperizer processing...")
+        
+        if grouped_files is None:
+            grouped_files = self.select_groups(target_groups)
+        
         if not grouped_files:
             logger.error("No groups to process")
             return
+        grouped_files = {group_key: grouped_files[group_key]
+                         for group_key in get_group_scheduler().order(grouped_files, grouped_files)}
         
         # Process each group
         successful = 0
@@ -999,9 +1297,20 @@ Please give me another Wimpy Kid style diary entry for this incident. Keep the s
         
         print(f"\n📁 Processing {total} group(s) with {self.provider_name} (+ fallbacks):")
         
+        skipped = 0
         for group_key, group_files in grouped_files.items():
+            admitted, reason = get_governor().admit()
+            if not admitted:
+                skipped += 1
+                logger.warning(f"=== Skipping group {group_key}: {reason} ===")
+                if on_group_done:
+                    on_group_done(group_key, None)
+                continue
             logger.info(f"=== Starting group {group_key} ({len(group_files)} files) ===")
-            result = self.process_group(group_key, group_files)
+            with call_context(group=group_key), get_tracer().span(group_key, 'group', files=len(group_files)):
+                result = self.process_group(group_key, group_files)
+            if on_group_done:
+                on_group_done(group_key, result or None)
             if result:
                 successful += 1
                 group_results.append(result)
@@ -1014,6 +1323,8 @@ Please give me another Wimpy Kid style diary entry for this incident. Keep the s
         logger.info(f"Processing complete: {successful}/{total} groups successful, {failed} failed")
         print(f"\n🎯 Processing complete: {successful}/{total} groups successful")
         
+        if skipped > 0:
+            print(f"💰 {skipped} group(s) not started: job budget nearly or fully used")
         if failed > 0:
             print(f"💥 {failed} group(s) failed after all fallback attempts")
             print(f"   This typically indicates API rate limits, authentication issues, or content policy violations")
@@ -1039,12 +1350,27 @@ def main():
     parser.add_argument('--config', default='../config/config.yaml', help='Configuration file path')
     parser.add_argument('--groups', nargs='+', help='Specific group1-group2 combinations to process (e.g., zaltz-1a)')
     parser.add_argument('--list-groups', action='store_true', help='List available groups and exit')
-    parser.add_argument('--provider', choices=['openai', 'anthropic', 'google'], 
+    parser.add_argument('--provider', choices=['openai', 'anthropic', 'google', 'fake'], 
                        help='AI provider to use (overrides config and env var)')
     parser.add_argument('--list-providers', action='store_true', help='List available AI providers and exit')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], 
                        default='INFO', help='Set logging level (default: INFO)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose logging (equivalent to --log-level DEBUG)')
+    parser.add_argument('--batch', action='store_true',
+                       help='Submit all groups through the provider batch API (cheaper, slower; openai/anthropic only)')
+    parser.add_argument('--batch-resume', metavar='STATE_FILE',
+                       help='Resume a batch job from its state file in <output_dir>/batch_jobs/')
+    parser.add_argument('--batch-poll-interval', type=float, default=60,
+                       help='Seconds between batch status checks (default: 60)')
+    parser.add_argument('--priority', nargs='+', metavar='GROUP',
+                        help='Groups (or patterns like zaltz-1*) to process first; the rest go longest first')
+    parser.add_argument('--run-label', help='Tag usage ledger entries with this run (set by multi_runner.py)')
+    parser.add_argument('--config-overlay', metavar='JSON',
+                       help='Settings merged over the config file, e.g. a run\'s model (set by multi_runner.py)')
+    parser.add_argument('--usage-report', action='store_true',
+                       help='Print token/cost usage aggregated by stage, model, run and day, then exit')
+    parser.add_argument('--usage-since', metavar='YYYY-MM-DD',
+                       help='Limit --usage-report to calls on or after this date')
     
     args = parser.parse_args()
     
@@ -1064,10 +1390,22 @@ def main():
             print("  google - Google Gemini models")
         else:
             print("  google - (not installed: pip install google-generativeai)")
+        print("  fake - Deterministic local fake model (no API calls, for load tests)")
+        return
+    
+    if args.usage_report:
+        # Reading the ledger needs no API keys, so don't build a Whimperizer
+        ledger = get_ledger()
+        ledger.configure(load_config(args.config).get('usage'))
+        print(format_usage_report(ledger, args.usage_since))
         return
     
+    if args.priority:
+        get_group_scheduler().pin(args.priority)
+    
     try:
-        whimperizer = Whimperizer(args.config, args.provider)
+        overlays = [parse_overlay(args.config_overlay)] if args.config_overlay else None
+        whimperizer = Whimperizer(args.config, args.provider, config_overlays=overlays)
         
         if args.list_groups:
             files = whimperizer.get_input_files()
@@ -1077,7 +1415,14 @@ def main():
                 print(f"  {group_key} ({len(group_files)} files)")
             return
         
-        whimperizer.run(args.groups)
+        with call_context(run=args.run_label):
+            if args.batch or args.batch_resume:
+                from batch_runner import BatchWhimperizer
+                batch = BatchWhimperizer(whimperizer, args.batch_resume, args.batch_poll_interval)
+                batch.run(args.groups)
+                return
+            
+            whimperizer.run(args.groups)
         
     except Exception as e:
         logger.error(f"Error: {e}")
@@ -11,9 +11,10 @@ import argparse
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any, Set
 from dataclasses import dataclass
-from PIL import Image, ImageDraw, ImageFont
 import textwrap
-import yaml
+
+from config_loader import ConfigError, load_config as shared_load_config
+from tracing import get_tracer
 
 # ==== Global Wimpy Style Settings ====
 # Update these dicts to tweak the overall appearance in a single place
@@ -54,36 +55,35 @@ EMPTY_LINE_MULTIPLIER = 1.40  # 1 = skip one ruled line
 # Extra blank space after paragraphs expressed in ruled lines
 PARAGRAPH_EXTRA_MULTIPLIER = 0.0  # 0 = none (align next paragraph directly beneath)
 
-try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.utils import ImageReader
-    from reportlab.lib import colors
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-except ImportError:
-    print("Error: reportlab library is required. Install with: pip install reportlab")
-    exit(1)
-
-try:
-    from PIL import Image
-except ImportError:
-    print("Error: Pillow library is required. Install with: pip install Pillow")
-    exit(1)
+# reportlab (and Pillow, which it uses for the backgrounds) are imported on the first render, so
+# --list-resources and modules that only construct a generator start quickly
+canvas = None
+ImageReader = None
+
+
+def load_reportlab():
+    """Import the PDF libraries once; raises ImportError with an install hint when missing"""
+    global canvas, ImageReader
+    if canvas is not None:
+        return
+    try:
+        from reportlab.pdfgen import canvas as reportlab_canvas
+        from reportlab.lib.utils import ImageReader as reportlab_image_reader
+    except ImportError:
+        raise ImportError("reportlab library is required. Install with: pip install reportlab")
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        raise ImportError("Pillow library is required. Install with: pip install Pillow")
+    canvas, ImageReader = reportlab_canvas, reportlab_image_reader
 
 
 def load_config(config_path: str = "../config/config.yaml") -> Dict[str, Any]:
-    """Load configuration from YAML file"""
+    """Load configuration via the shared loader; PDF settings fall back to defaults when it is unusable"""
     try:
-        with open(config_path, 'r', encoding='utf-8') as file:
-            config = yaml.safe_load(file)
-            return config or {}
-    except FileNotFoundError:
-        print(f"Warning: Config file not found at {config_path}, using defaults")
-        return {}
-    except Exception as e:
-        print(f"Warning: Error loading config: {e}, using defaults")
+        return shared_load_config(config_path)
+    except ConfigError as e:
+        print(f"Warning: {e}, using defaults")
         return {}
 
 
@@ -234,7 +234,7 @@ class ResourceManager:
 class HandwritingRenderer:
     """Renders text with handwriting-like effects"""
     
-    def __init__(self, canvas_obj: canvas.Canvas, resource_manager: ResourceManager):
+    def __init__(self, canvas_obj: 'canvas.Canvas', resource_manager: ResourceManager):
         self.canvas = canvas_obj
         self.resources = resource_manager
         self.current_font = None
@@ -466,6 +466,7 @@ class WimpyPDFGenerator:
         self.config = load_config(config_path)
         self.page_style = None
         self.canvas = None
+        self._page_span = None
         self.text_styles = self._get_text_styles()
     
     def _get_text_styles(self) -> Dict[str, TextStyle]:
@@ -566,6 +567,7 @@ class WimpyPDFGenerator:
     
     def create_pdf(self, content: str, output_filename: str, style: str = "notebook"):
         """Create a PDF with the given content and style"""
+        load_reportlab()
         
         # Parse content while preserving line breaks
         parser = MarkdownParser()
@@ -656,14 +658,24 @@ class WimpyPDFGenerator:
                 renderer.set_font(text_style.font_path, text_style.font_size)
         
         # Render content
-        self._render_content(parsed_content, renderer)
+        tracer = get_tracer()
+        with tracer.span('pdf.layout', 'pdf', elements=len(parsed_content)):
+            try:
+                self._render_content(parsed_content, renderer)
+            finally:
+                tracer.finish(self._page_span)
+                self._page_span = None
         
         # Save PDF
-        self.canvas.save()
+        with tracer.span('pdf.write', 'pdf'):
+            self.canvas.save()
         print(f"PDF saved: {output_filename}")
     
     def _draw_page_background(self):
-        """Draw the page background"""
+        """Draw the page background (every page starts here, so it also opens the page's trace span)"""
+        tracer = get_tracer()
+        tracer.finish(self._page_span)
+        self._page_span = tracer.start('pdf.page', 'pdf')
         if self.page_style.background_image and os.path.exists(self.page_style.background_image):
             try:
                 # Load and draw background image
@@ -1162,6 +1174,12 @@ def main():
         print("Available background images:", generator.resources.list_images())
         return
     
+    try:
+        load_reportlab()
+    except ImportError as e:
+        print(f"Error: {e}")
+        exit(1)
+    
     # Get input content
     if args.input:
         content = read_file_content(args.input)
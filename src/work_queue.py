@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Work Queue for Whimperizer
+Durable task queue shared by `pipeline.py --queue` (enqueues group-level tasks) and
+`pipeline.py --worker` processes on any machine that can reach the queue and shared storage.
+Tasks are claimed with a lease that the worker keeps alive with heartbeats; a task whose
+lease runs out (crashed or partitioned worker) goes back to the queue.
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Task states
+PENDING, LEASED, DONE, FAILED, SKIPPED = 'pending', 'leased', 'done', 'failed', 'skipped'
+FINISHED = (DONE, FAILED, SKIPPED)
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+@dataclass
+class Task:
+    id: int
+    job: str
+    kind: str                  # download / whimperize / consolidate / render
+    group_key: str
+    payload: Dict[str, Any]
+    after: List[int]           # Tasks that must finish first; their results are this task's inputs
+    attempts: int = 0
+
+
+class WorkQueue(ABC):
+    """
+    Backend interface. A broker-backed queue (e.g. Redis: a sorted set of lease deadlines plus
+    a hash per task) implements the same methods; workers and the coordinator only use these.
+    """
+
+    @abstractmethod
+    def enqueue(self, job: str, kind: str, group_key: str, payload: Dict[str, Any],
+                after: Optional[List[int]] = None, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> int:
+        ...
+
+    @abstractmethod
+    def claim(self, worker: str, kinds: Optional[List[str]] = None,
+              lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Task]:
+        """Lease the oldest runnable task (pending, or leased with an expired lease)"""
+
+    @abstractmethod
+    def heartbeat(self, task_id: int, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Extend the lease; False when the task is no longer ours (lease expired and re-claimed)"""
+
+    @abstractmethod
+    def complete(self, task_id: int, worker: str, result: Dict[str, Any]) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, task_id: int, worker: str, error: str) -> bool:
+        """Give the task back for another attempt, or mark it failed after max_attempts"""
+
+    @abstractmethod
+    def results(self, task_ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Results of finished tasks (None for ones that failed or were skipped)"""
+
+    @abstractmethod
+    def status(self, job: Optional[str] = None) -> Dict[str, int]:
+        """Task counts by state"""
+
+    @abstractmethod
+    def tasks(self, job: Optional[str] = None) -> List[Dict[str, Any]]:
+        ...
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    after TEXT NOT NULL DEFAULT '[]',
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_runnable ON tasks (state, id);
+CREATE INDEX IF NOT EXISTS tasks_job ON tasks (job, state);
+"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """Local / shared-filesystem backend: one SQLite file, claims serialized by BEGIN IMMEDIATE"""
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def _transaction(self):
+        """Caller must hold self._lock"""
+        self._conn.execute('BEGIN IMMEDIATE')
+
+    def enqueue(self, job, kind, group_key, payload, after=None, max_attempts=DEFAULT_MAX_ATTEMPTS) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO tasks (job, kind, group_key, payload, after, state, max_attempts, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job, kind, group_key, json.dumps(payload), json.dumps(after or []), PENDING, max_attempts, time.time())
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker, kinds=None, lease_seconds=DEFAULT_LEASE_SECONDS) -> Optional[Task]:
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, job, kind, group_key, payload, after, attempts, max_attempts, state FROM tasks "
+                    "WHERE state = ? OR (state = ? AND lease_expires < ?) ORDER BY id",
+                    (PENDING, LEASED, now)
+                ).fetchall()
+                for row in rows:
+                    if kinds and row[2] not in kinds:
+                        continue
+                    if row[8] == LEASED and row[6] >= row[7]:
+                        self._conn.execute("UPDATE tasks SET state = ?, error = ?, updated = ? WHERE id = ?",
+                                           (FAILED, 'lease expired on the last attempt', now, row[0]))
+                        continue
+                    after = json.loads(row[5])
+                    states = self._states(after)
+                    if any(state not in FINISHED for state in states):
+                        continue
+                    if after and DONE not in states:
+                        # Nothing upstream succeeded, so there is nothing to work on
+                        self._conn.execute("UPDATE tasks SET state = ?, error = ?, updated = ? WHERE id = ?",
+                                           (SKIPPED, 'every input task failed', now, row[0]))
+                        continue
+                    self._conn.execute(
+                        "UPDATE tasks SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                        "updated = ? WHERE id = ?",
+                        (LEASED, worker, now + lease_seconds, now, row[0])
+                    )
+                    self._conn.execute('COMMIT')
+                    return Task(row[0], row[1], row[2], row[3], json.loads(row[4]), after, row[6] + 1)
+                self._conn.execute('COMMIT')
+                return None
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _states(self, task_ids: List[int]) -> List[str]:
+        if not task_ids:
+            return []
+        marks = ', '.join('?' for _ in task_ids)
+        return [row[0] for row in self._conn.execute(f"SELECT state FROM tasks WHERE id IN ({marks})", task_ids)]
+
+    def _update_owned(self, task_id: int, worker: str, sql: str, params: tuple) -> bool:
+        """Apply an update only while `worker` still holds the task's lease"""
+        with self._lock:
+            cursor = self._conn.execute(f"{sql} WHERE id = ? AND worker = ? AND state = ?",
+                                        params + (task_id, worker, LEASED))
+            return cursor.rowcount == 1
+
+    def heartbeat(self, task_id, worker, lease_seconds=DEFAULT_LEASE_SECONDS) -> bool:
+        now = time.time()
+        return self._update_owned(task_id, worker, "UPDATE tasks SET lease_expires = ?, updated = ?",
+                                  (now + lease_seconds, now))
+
+    def complete(self, task_id, worker, result) -> bool:
+        return self._update_owned(task_id, worker, "UPDATE tasks SET state = ?, result = ?, error = NULL, updated = ?",
+                                  (DONE, json.dumps(result), time.time()))
+
+    def fail(self, task_id, worker, error) -> bool:
+        return self._update_owned(
+            task_id, worker,
+            "UPDATE tasks SET state = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+            "error = ?, lease_expires = NULL, updated = ?",
+            (FAILED, PENDING, error, time.time())
+        )
+
+    def results(self, task_ids):
+        if not task_ids:
+            return {}
+        marks = ', '.join('?' for _ in task_ids)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT id, state, result FROM tasks WHERE id IN ({marks})", task_ids).fetchall()
+        return {row[0]: json.loads(row[2]) if row[1] == DONE and row[2] else None for row in rows}
+
+    def status(self, job=None) -> Dict[str, int]:
+        sql, params = "SELECT state, COUNT(*) FROM tasks", ()
+        if job:
+            sql, params = sql + " WHERE job = ?", (job,)
+        with self._lock:
+            rows = self._conn.execute(sql + " GROUP BY state", params).fetchall()
+        return dict(rows)
+
+    def tasks(self, job=None) -> List[Dict[str, Any]]:
+        sql, params = "SELECT id, kind, group_key, state, attempts, worker, error FROM tasks", ()
+        if job:
+            sql, params = sql + " WHERE job = ?", (job,)
+        with self._lock:
+            cursor = self._conn.execute(sql + " ORDER BY id", params)
+            names = [c[0] for c in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_queue(url: str) -> WorkQueue:
+    """sqlite:///path/to/queue.sqlite (or a plain path); other schemes need their own WorkQueue backend"""
+    if url.startswith('sqlite:///'):
+        return SQLiteWorkQueue(url[len('sqlite:///'):])
+    if '://' not in url:
+        return SQLiteWorkQueue(url)
+    raise ValueError(f"No work queue backend for '{url.split('://')[0]}' (available: sqlite)")
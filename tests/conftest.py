@@ -0,0 +1,71 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+import yaml
+
+# Source modules are flat scripts in src/ (normally run from that directory)
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+sys.path.insert(0, str(SRC_DIR))
+
+
+def pytest_configure(config):
+    # Logs and payloads written while testing stay out of the checkout (set before whimperizer is imported)
+    os.environ['WHIMPERIZER_LOG_DIR'] = tempfile.mkdtemp(prefix='whimperizer-test-logs-')
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(os.environ.pop('WHIMPERIZER_LOG_DIR', ''), ignore_errors=True)
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """The process-wide usage ledger on a file under tmp_path; ledger and budget settings are restored after"""
+    from budget_governor import get_governor
+    from usage_ledger import get_ledger
+
+    ledger = get_ledger()
+    saved = dict(ledger.settings)
+    ledger.configure({'enabled': True, 'ledger_path': str(tmp_path / 'usage.sqlite')})
+    yield ledger
+    ledger.configure(saved)
+    get_governor().configure({})
+
+
+@pytest.fixture
+def fake_pipeline_config(tmp_path, monkeypatch):
+    """config.yaml pointed at the fake provider and tmp_path; edit it before calling pipeline_args"""
+    from benchmark_whimperizer import build_config
+
+    monkeypatch.chdir(SRC_DIR)  # The prompt is loaded relative to src/
+    with open(SRC_DIR.parent / 'config' / 'config.yaml', 'r', encoding='utf-8') as f:
+        return build_config(yaml.safe_load(f), tmp_path, 'fake', {'latency': {'distribution': 'fixed', 'mean': 0.01}})
+
+
+@pytest.fixture
+def multi_run_config(fake_pipeline_config):
+    """fake_pipeline_config with two fake run models and a fake consolidator"""
+    multi_run = fake_pipeline_config['multi_run']
+    multi_run['run_models'] = {f"run_{n}_model": {'provider': 'fake', 'model': f"fake-run-{n}"} for n in (1, 2)}
+    multi_run['consolidation'] = {'provider': 'fake', 'model': 'fake-consolidator',
+                                  'latency': {'distribution': 'fixed', 'mean': 0.01}}
+    return fake_pipeline_config
+
+
+@pytest.fixture
+def pipeline_args(tmp_path, fake_pipeline_config):
+    """Writes fake_pipeline_config and returns pipeline.py arguments for tmp_path (keywords override them)"""
+    def make(**overrides):
+        config_path = tmp_path / 'config.yaml'
+        config_path.write_text(yaml.safe_dump(fake_pipeline_config), encoding='utf-8')
+        args = dict(config=str(config_path), runs=1, groups=None, provider=None, verbose=False,
+                    download_dir=str(tmp_path / 'input'), whimper_dir=str(tmp_path / 'output'),
+                    pdf_dir=str(tmp_path / 'pdfs'), consolidation_workers=1, dry_run=False,
+                    skip_download=True, skip_whimperize=False, skip_pdf=True)
+        args.update(overrides)
+        return argparse.Namespace(**args)
+    return make
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the artifact catalog that replaces globbing the output directory
+"""
+
+import os
+
+from artifact_catalog import ArtifactCatalog, parse_artifact_name
+
+
+def touch(directory, name, mtime):
+    path = directory / name
+    path.write_text(name, encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_parse_artifact_names(tmp_path):
+    assert parse_artifact_name(tmp_path / 'zaltz-2a-16to21-whimperized-iterative-gpt-4-1-20250724_164521.md') == \
+        ('zaltz-2a', 'iterative', 'gpt-4-1')
+    assert parse_artifact_name(tmp_path / 'zaltz-2a-whimperized-consolidated-20250724_164521.md') == \
+        ('zaltz-2a', 'consolidated', None)
+    assert parse_artifact_name(tmp_path / 'zaltz-2a-1.txt') is None
+
+
+def test_existing_files_are_indexed_and_best_prefers_mode_then_age(tmp_path):
+    touch(tmp_path, 'g-1a-1-whimperized-normal-m-20250101_000001.md', 100)
+    touch(tmp_path, 'g-1a-1-whimperized-iterative-m-20250101_000002.md', 200)
+    newer = touch(tmp_path, 'g-1a-1-whimperized-iterative-m-20250101_000003.md', 300)
+    touch(tmp_path, 'g-2b-whimperized-normal-m-20250101_000004.md', 100)
+
+    catalog = ArtifactCatalog(str(tmp_path))
+    assert catalog.best('g-1a') == (newer, 'iterative')
+    assert set(catalog.best_per_group()) == {'g-1a', 'g-2b'}
+
+    consolidated = touch(tmp_path, 'g-1a-whimperized-consolidated-20250101_000005.md', 50)
+    catalog.register(consolidated, model='fake-consolidator')
+    assert catalog.best('g-1a') == (consolidated, 'consolidated')
+    assert [row['path'] for row in catalog.query(model='fake-consolidator')] == [consolidated]
+
+    # A file deleted outside the pipeline drops out of the index
+    consolidated.unlink()
+    assert catalog.best('g-1a') == (newer, 'iterative')
+    assert len(catalog.files_by_group(['g-1a'])['g-1a']) == 3
+
+
+def test_files_added_outside_the_pipeline_are_picked_up(tmp_path):
+    normal = touch(tmp_path, 'zaltz-1a-whimperized-normal-m-20250101_000001.md', 100)
+    catalog = ArtifactCatalog(str(tmp_path))
+    assert catalog.best('zaltz-1a') == (normal, 'normal')
+
+    # Copied in / restored from backup: never passed through register()
+    consolidated = touch(tmp_path, 'zaltz-1a-whimperized-consolidated-20250101_000002.md', 200)
+    other = touch(tmp_path, 'zaltz-2b-whimperized-normal-m-20250101_000003.md', 300)
+    assert catalog.best('zaltz-1a') == (consolidated, 'consolidated')
+    assert catalog.best_per_group()['zaltz-2b'] == (other, 'normal')
+
+    # A second process opening the same catalog sees them too
+    assert ArtifactCatalog(str(tmp_path)).groups() == ['zaltz-1a', 'zaltz-2b']
+
+
+def test_prune_keeps_recent_runs_and_the_best_file(tmp_path):
+    for i in range(5):
+        touch(tmp_path, f"g-1a-whimperized-normal-m-2025010{i}_000000.md", 100 + i)
+    best = touch(tmp_path, 'g-1a-whimperized-consolidated-20250109_000000.md', 50)
+
+    catalog = ArtifactCatalog(str(tmp_path))
+    assert len(catalog.prune(keep=2, dry_run=True)) == 3
+    pruned = catalog.prune(keep=2)
+    assert sorted(p.name for p in pruned) == [f"g-1a-whimperized-normal-m-2025010{i}_000000.md" for i in range(3)]
+    assert not any(p.exists() for p in pruned) and best.exists()
+    assert len(catalog.query(group_key='g-1a')) == 3
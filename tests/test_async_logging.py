@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the queued logging pipeline and content-hash payload store
+"""
+
+import gzip
+import logging
+
+from async_logging import (
+    LoggerRouteFilter, PayloadStore, configure_async_logging, log_payload,
+    rotating_file_handler, stop_async_logging
+)
+
+
+def test_payloads_are_stored_once_and_referenced(tmp_path):
+    formatter = logging.Formatter('%(name)s - %(message)s')
+    handler = rotating_file_handler(str(tmp_path / 'api.log'), formatter)
+    handler.addFilter(LoggerRouteFilter(include='test.api'))
+    api_logger = logging.getLogger('test.api')
+    api_logger.setLevel(logging.DEBUG)
+    api_logger.propagate = False
+
+    configure_async_logging([(api_logger, [handler])], payload_dir=str(tmp_path / 'payloads'))
+    try:
+        transcript = 'A very long diary entry. ' * 1000
+        for turn in range(3):
+            log_payload(api_logger, "Message 1 (user)", transcript)
+    finally:
+        stop_async_logging()
+
+    lines = (tmp_path / 'api.log').read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 3
+    assert all(len(line) < 200 for line in lines)
+    assert 'seen before' not in lines[0]
+    assert 'seen before' in lines[1] and 'seen before' in lines[2]
+
+    payload_files = list((tmp_path / 'payloads').rglob('*.txt.gz'))
+    assert len(payload_files) == 1
+    with gzip.open(payload_files[0], 'rt', encoding='utf-8') as f:
+        assert f.read() == transcript
+
+
+def test_rotated_logs_are_gzipped(tmp_path):
+    formatter = logging.Formatter('%(message)s')
+    handler = rotating_file_handler(str(tmp_path / 'run.log'), formatter, max_bytes=200, backup_count=2)
+    test_logger = logging.getLogger('test.rotation')
+    test_logger.setLevel(logging.INFO)
+    test_logger.propagate = False
+
+    configure_async_logging([(test_logger, [handler])])
+    try:
+        for i in range(20):
+            test_logger.info(f"line {i:03d} " + 'x' * 40)
+    finally:
+        stop_async_logging()
+
+    assert (tmp_path / 'run.log').exists()
+    assert (tmp_path / 'run.log.1.gz').exists()
+    assert (tmp_path / 'run.log.2.gz').exists()
+    assert not (tmp_path / 'run.log.3.gz').exists()
+
+
+def test_route_filter_excludes_children():
+    route = LoggerRouteFilter(include='whimperizer.api', exclude='whimperizer.api.truncated')
+    make = lambda name: logging.LogRecord(name, logging.INFO, __file__, 1, 'msg', None, None)
+    assert route.filter(make('whimperizer.api.openai'))
+    assert not route.filter(make('whimperizer.api.truncated'))
+    assert not route.filter(make('whimperizer'))
+
+
+def test_payload_store_reuses_digest_for_same_string(tmp_path):
+    store = PayloadStore(str(tmp_path))
+    digest, first_seen = store.reference('hello')
+    again, seen_again = store.reference('hello')
+    assert digest == again
+    assert first_seen and not seen_again
+    assert all(not isinstance(key, str) for key in store._refs)  # Payload text isn't kept alive by the cache
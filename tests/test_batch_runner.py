@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for batch submission against the fake OpenAI server
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from batch_runner import DONE, BatchWhimperizer, OpenAIBatchBackend
+from fake_openai_server import make_server
+from whimperizer import OpenAIProvider
+
+
+@pytest.fixture
+def fake_server():
+    server = make_server(port=0, batch_delay=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_openai_batch_round_trip(fake_server, monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    provider = OpenAIProvider({'model': 'gpt-4.1-mini', 'max_tokens': 100, 'temperature': 0.7,
+                               'base_url': fake_server})
+    backend = OpenAIBatchBackend(provider)
+
+    batch_id = backend.submit([
+        ('r1-g0', [{'role': 'user', 'content': 'first group'}]),
+        ('r1-g1', [{'role': 'user', 'content': 'second group'}]),
+    ])
+    assert backend.status(batch_id) == DONE
+
+    results = backend.results(batch_id)
+    assert set(results) == {'r1-g0', 'r1-g1'}
+    assert 'gpt-4.1-mini' in results['r1-g0']
+    assert results['r1-g0'] != results['r1-g1']
+
+
+def test_applied_batch_results_are_recorded_at_batch_pricing(fake_server, monkeypatch, tmp_path, ledger):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    ledger.configure({'pricing': {'gpt-4.1-mini': {'input': 0.40, 'output': 1.60}}, 'batch_discount': 0.5})
+    provider = OpenAIProvider({'model': 'gpt-4.1-mini', 'max_tokens': 100, 'temperature': 0.7,
+                               'base_url': fake_server})
+    runner = BatchWhimperizer.__new__(BatchWhimperizer)
+    runner.whimperizer = SimpleNamespace(provider_name='openai', conversation_history=[],
+                                         save_output=lambda group_key, content, mode, lines: f"{group_key}.md")
+    runner.backend = OpenAIBatchBackend(provider)
+    runner.state_path = tmp_path / 'batch.json'
+    group = {'files': [{'line': 1}], 'status': 'pending', 'messages': None, 'normal_length': 0,
+             'normal_file': None, 'iterative_file': None}
+    batch_id = runner.backend.submit([('r1-g0', [{'role': 'user', 'content': 'x' * 400}])])
+    runner.state = {'model': 'gpt-4.1-mini', 'groups': {'zaltz-1a': group},
+                    'round': {'batch_id': batch_id, 'requests': {'r1-g0': 'zaltz-1a'}}}
+
+    runner.apply_results(runner.backend.results(batch_id))
+    assert group['status'] == 'iterating'
+
+    [row] = ledger.report(group_by=('group_key', 'stage'))
+    assert (row['group_key'], row['stage'], row['calls']) == ('zaltz-1a', 'normal', 1)
+    live_cost = (row['prompt_tokens'] * 0.40 + row['completion_tokens'] * 1.60) / 1_000_000
+    assert row['prompt_tokens'] and row['cost_usd'] == pytest.approx(live_cost / 2)
+    assert row['avg_latency_seconds'] is None
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the job budget governor (token / dollar / wall-time limits and concurrent-call cap)
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from benchmark_whimperizer import create_inputs
+from budget_governor import BUDGET_ENV, DEGRADED, EXHAUSTED, OK, BudgetExceeded, BudgetGovernor, get_governor
+from call_context import call_context
+from pipeline_graph import run_pipeline_graph
+from whimperizer import FakeProvider, Whimperizer
+
+
+def spend(ledger, tokens):
+    usage = SimpleNamespace(prompt_tokens=tokens, completion_tokens=0, prompt_tokens_details=None)
+    ledger.record('openai', 'gpt-4.1-mini', SimpleNamespace(usage=usage), 1.0)
+
+
+def test_governor_degrades_then_stops_new_calls(ledger):
+    governor = BudgetGovernor()
+    governor.configure({'max_tokens': 2000, 'refresh_seconds': 0})
+    prices = {'pricey': 18.0, 'cheap': 1.5, 'unpriced': None}
+    attempts = ['pricey', 'unpriced', 'cheap']
+    assert governor.state() == OK
+    assert governor.order_attempts(attempts, prices.get) == attempts
+
+    spend(ledger, 1700)
+    assert governor.state() == DEGRADED
+    assert governor.order_attempts(attempts, prices.get) == ['cheap', 'pricey', 'unpriced']
+    assert not governor.allow_hedge()
+    with call_context(run='run_1'):
+        assert governor.admit()[0]
+    with call_context(run='run_2'):
+        assert not governor.admit()[0]
+
+    spend(ledger, 400)
+    assert governor.state() == EXHAUSTED
+    assert not governor.admit()[0]
+    with pytest.raises(BudgetExceeded):
+        with governor.call_slot():
+            pass
+
+
+def test_concurrent_call_cap_and_limits_inherited_by_children(monkeypatch):
+    monkeypatch.setenv(BUDGET_ENV, '')  # Restored after the test
+    governor = BudgetGovernor()
+    governor.configure({'max_concurrent_calls': 2, 'max_wall_minutes': 30})
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def call():
+        with governor.call_slot():
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 2
+
+    governor.export_env()
+    child = BudgetGovernor()
+    assert child.settings['max_wall_minutes'] == 30 and child.started == governor.started
+
+
+def test_exhausted_budget_starts_no_groups(tmp_path, pipeline_args, ledger):
+    create_inputs(tmp_path / 'input', groups=2, files_per_group=1, file_chars=200)
+    get_governor().configure({'max_wall_minutes': 1, 'started_at': time.time() - 120})
+    assert not run_pipeline_graph(pipeline_args(provider='fake'))
+    assert not list((tmp_path / 'output').glob('*.md'))
+
+
+def test_budget_crossed_mid_chain_stops_fallbacks_without_breaker_strikes(fake_pipeline_config, ledger):
+    fake_pipeline_config['api']['hedging'] = {'enabled': False}
+    whimperizer = Whimperizer(config=fake_pipeline_config, provider_override='fake', conversation_history=[])
+    get_governor().configure({'max_tokens': 1000, 'refresh_seconds': 0})
+
+    class SpendingProvider:
+        """Uses up the budget, then fails"""
+        provider_type, config = 'fake', {'model': 'fake-spender'}
+
+        def generate(self, messages):
+            spend(ledger, 5000)
+            return None
+
+    class NeverCalled:
+        provider_type, config, calls = 'fake', {'model': 'fake-last'}, 0
+
+        def generate(self, messages):
+            NeverCalled.calls += 1
+            return 'too late'
+
+    fallback = FakeProvider({'model': 'fake-budget-fallback'})
+    whimperizer._provider_attempts = [('primary', 'spender', SpendingProvider()),
+                                      ('fallback_1', 'fake', fallback), ('fallback_2', 'last', NeverCalled())]
+    assert whimperizer.call_ai_api_with_fallbacks([{'role': 'user', 'content': 'story'}]) is None
+
+    assert NeverCalled.calls == 0
+    fallback_breaker = whimperizer.health.breaker(Whimperizer.breaker_key(fallback))
+    assert fallback_breaker.failures == 0 and fallback_breaker.consecutive_strikes == 0
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-hash build cache behind pipeline.py incremental builds
+"""
+
+import pytest
+
+from benchmark_whimperizer import create_inputs
+from build_cache import BuildCache, get_build_cache
+from config_loader import load_config
+from pipeline_graph import consolidate_stage, run_pipeline_graph, whimperize_stage
+from whimperizer import FakeProvider
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = get_build_cache()
+    cache.configure({'enabled': True, 'manifest_path': str(tmp_path / 'manifest.json')}, explain=True)
+    yield cache
+    cache.configure({'enabled': False})
+
+
+def test_rebuild_reasons(tmp_path, capsys):
+    cache = BuildCache()
+    cache.configure({'manifest_path': str(tmp_path / 'manifest.json')}, explain=True)
+    text, pdf = tmp_path / 'story.md', tmp_path / 'story.pdf'
+    text.write_text('v1', encoding='utf-8')
+    pdf.write_text('pdf', encoding='utf-8')
+    inputs = {'text': text, 'style': 'notebook'}
+
+    assert cache.lookup('pdf', 'g-1a', inputs) is None
+    cache.record('pdf', 'g-1a', inputs, [pdf])
+    assert cache.lookup('pdf', 'g-1a', inputs)['outputs'] == [str(pdf)]
+
+    text.write_text('v2', encoding='utf-8')
+    assert cache.lookup('pdf', 'g-1a', inputs) is None
+    cache.record('pdf', 'g-1a', inputs, [pdf])
+    assert cache.lookup('pdf', 'g-1a', {**inputs, 'style': 'blank'}) is None
+    pdf.unlink()
+    assert cache.lookup('pdf', 'g-1a', inputs) is None
+
+    # A fresh process reads the same manifest
+    reloaded = BuildCache()
+    reloaded.configure({'manifest_path': str(tmp_path / 'manifest.json')}, force=True, explain=True)
+    assert reloaded.lookup('pdf', 'g-1a', inputs) is None
+
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split(': ', 1)[1] for line in lines] == [
+        'rebuilding (no previous build)', 'up to date (story.pdf)', 'rebuilding (text changed)',
+        'rebuilding (style changed)', 'rebuilding (output missing: story.pdf)', 'rebuilding (--force)',
+    ]
+
+
+def test_unchanged_groups_are_not_whimperized_again(tmp_path, pipeline_args, cache):
+    create_inputs(tmp_path / 'input', groups=2, files_per_group=2, file_chars=300)
+    args = pipeline_args()
+    output = tmp_path / 'output'
+    assert run_pipeline_graph(args)
+    first = sorted(output.glob('*.md'))
+
+    assert run_pipeline_graph(args)
+    assert sorted(output.glob('*.md')) == first
+
+    # Only the group whose input changed is rebuilt
+    changed = sorted((tmp_path / 'input').glob('bench-g001-*.txt'))[0]
+    changed.write_text(changed.read_text(encoding='utf-8') + '\nOne more line.', encoding='utf-8')
+    assert run_pipeline_graph(args)
+    new = set(output.glob('*.md')) - set(first)
+    assert new and all(p.name.startswith('bench-g001') for p in new)
+
+
+def test_failed_rebuilds_do_not_drop_up_to_date_groups(tmp_path, monkeypatch, pipeline_args, cache):
+    create_inputs(tmp_path / 'input', groups=2, files_per_group=1, file_chars=200)
+    assert run_pipeline_graph(pipeline_args())
+
+    changed = sorted((tmp_path / 'input').glob('bench-g001-*.txt'))[0]
+    changed.write_text(changed.read_text(encoding='utf-8') + '\nOne more line.', encoding='utf-8')
+    monkeypatch.setattr(FakeProvider, 'generate', lambda self, messages: None)  # Every rebuild fails
+    args = pipeline_args()
+    config = load_config(args.config)
+
+    runs = whimperize_stage(args, config)
+    assert set(runs.cached) == {'bench-g000'} and not runs.outputs
+    assert set(consolidate_stage(args, config, runs).files) == {'bench-g000'}
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared, cached config loader and its overlays
+"""
+
+import pytest
+import yaml
+
+from config_loader import ConfigError, ConfigLoader, merge, run_overlay, validate_config
+
+CONFIG = {
+    'api': {'default_provider': 'openai',
+            'providers': {'openai': {'model': 'gpt-4.1-mini', 'temperature': 0.7, 'max_tokens': 4000}}},
+    'processing': {'input_dir': 'in', 'output_dir': 'out'},
+}
+
+
+def test_config_is_parsed_once_and_callers_get_private_copies(tmp_path):
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump(CONFIG), encoding='utf-8')
+    loader = ConfigLoader()
+
+    first = loader.load(str(path))
+    first['api']['providers']['openai']['model'] = 'changed'
+    second = loader.load(str(path))
+    assert loader.loads == 1
+    assert second['api']['providers']['openai']['model'] == 'gpt-4.1-mini'
+
+    edited = dict(CONFIG, processing={'input_dir': 'elsewhere', 'output_dir': 'out'})
+    path.write_text(yaml.safe_dump(edited) + '\n# edited\n', encoding='utf-8')
+    assert loader.load(str(path))['processing']['input_dir'] == 'elsewhere'
+    assert loader.loads == 2
+
+
+def test_overlays_merge_into_a_new_config():
+    overlay = run_overlay({'provider': 'anthropic', 'model': 'claude-3-haiku', 'temperature': 0.2})
+    run_config = merge(CONFIG, overlay)
+    assert run_config['api']['default_provider'] == 'anthropic'
+    assert run_config['api']['providers']['anthropic'] == {'model': 'claude-3-haiku', 'temperature': 0.2}
+    assert run_config['api']['providers']['openai']['model'] == 'gpt-4.1-mini'
+    assert CONFIG['api']['default_provider'] == 'openai' and 'anthropic' not in CONFIG['api']['providers']
+    run_config['processing']['input_dir'] = 'mutated'
+    assert CONFIG['processing']['input_dir'] == 'in'
+
+
+def test_schema_problems_are_reported_together(tmp_path):
+    broken = merge(CONFIG, {'api': {'default_provider': 'google', 'providers': {'openai': {'max_tokens': 'lots'}}},
+                            'build_cache': {'enabled': 'yes'}})
+    problems = validate_config(broken)
+    assert "api.default_provider: 'google' has no entry under api.providers" in problems
+    assert any(p.startswith('api.providers.openai.max_tokens: expected int') for p in problems)
+    assert any(p.startswith('build_cache.enabled: expected bool') for p in problems)
+    assert validate_config(CONFIG) == []
+
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump(broken), encoding='utf-8')
+    with pytest.raises(ConfigError, match='max_tokens'):
+        ConfigLoader().load(str(path))
+    with pytest.raises(ConfigError, match='not found'):
+        ConfigLoader().load(str(tmp_path / 'missing.yaml'))
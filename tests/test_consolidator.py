@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for parallel and tree consolidation and the up-to-date check
+"""
+
+import os
+
+from consolidator import (AIProvider, consolidate_group, consolidate_groups, is_fresh, plan_fan_in,
+                          prompt_tokens, split_consolidated, tree_consolidate, tree_settings)
+
+
+class FlakyProvider(AIProvider):
+    """Fails (raises) for prompts containing a broken group's story, succeeds otherwise"""
+
+    def generate(self, prompt):
+        if 'broken-1 story' in prompt:
+            raise RuntimeError('provider exploded')
+        return 'consolidated story'
+
+
+def write(path, text, mtime):
+    path.write_text(text, encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_fresh_only_when_consolidated_is_newer_than_every_run(tmp_path):
+    runs = [write(tmp_path / f"zaltz-1a-whimperized-normal-m{i}-20250101_00000{i}.md", 'run', 100 + i)
+            for i in range(2)]
+    consolidated = write(tmp_path / 'zaltz-1a-whimperized-consolidated-20250101_000009.md', 'c', 200)
+
+    assert split_consolidated(runs + [consolidated]) == (runs, [consolidated])
+    assert is_fresh(runs + [consolidated])
+    assert not is_fresh(runs)
+
+    write(runs[0], 'new run', 300)
+    assert not is_fresh(runs + [consolidated])
+
+
+def test_one_failing_group_does_not_affect_others(tmp_path):
+    grouped = {}
+    for group in ('good-1', 'broken-1', 'good-2'):
+        grouped[group] = [write(tmp_path / f"{group}-whimperized-normal-m-{i}.md", f"{group} story {i}", 100)
+                          for i in range(2)]
+
+    results = consolidate_groups(grouped, FlakyProvider({}), str(tmp_path), parallel=3)
+
+    assert results['broken-1'] is None
+    assert results['good-1'] and results['good-2']
+    assert len(list(tmp_path.glob('*-consolidated-*.md'))) == 2
+
+
+class CountingProvider(AIProvider):
+    """Merges by joining the example bodies; records how many examples each call saw"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.calls = []
+
+    def generate(self, prompt):
+        self.calls.append(prompt.count('=== EXAMPLE '))
+        return 'merged'
+
+
+def test_tree_consolidation_uses_bounded_fan_in():
+    provider = CountingProvider({'provider': 'fake', 'model': 'fake-consolidator'})
+    result = tree_consolidate('zaltz-1a', [f"run {i}" for i in range(7)], provider,
+                              tree_settings({'max_fan_in': 3}), budget=100000)
+    assert result == 'merged'
+    # 7 -> (3, 3, 1) -> 3 -> 1: two merges, then one final merge
+    assert sorted(provider.calls) == [3, 3, 3]
+
+
+class FailingProvider(AIProvider):
+    def generate(self, prompt):
+        return None
+
+
+def test_failed_tree_merge_fails_the_group_and_writes_nothing(tmp_path):
+    settings = tree_settings({'max_fan_in': 2})
+    assert tree_consolidate('g-1a', ['a', 'bbbb', 'cc'], FailingProvider({}), settings, budget=100000) is None
+
+    files = [write(tmp_path / f"g-1a-whimperized-normal-m-{i}.md", f"story {i}", 100) for i in range(3)]
+    assert consolidate_group('g-1a', files, FailingProvider({}), str(tmp_path), tree={'enabled': True}) is None
+    assert not list(tmp_path.glob('*-consolidated-*.md'))
+
+
+def test_fan_in_shrinks_to_fit_the_token_budget():
+    overhead = prompt_tokens([])
+    contents = ['x' * 4000] * 6  # ~1000 tokens each
+    assert [len(b) for b in plan_fan_in(contents, overhead + 2100, max_fan_in=4)] == [2, 2, 2]
+    assert [len(b) for b in plan_fan_in(contents, overhead + 10000, max_fan_in=4)] == [4, 2]
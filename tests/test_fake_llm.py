@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the deterministic fake model and its OpenAI-compatible server
+"""
+
+import threading
+
+import pytest
+
+from fake_llm import FakeLLM, FakeRateLimitError, FakeServerError
+from fake_openai_server import make_server
+from provider_registry import ProviderRegistry
+from rate_limiter import is_rate_limit_error
+
+MESSAGES = [{'role': 'user', 'content': 'Tell me about the science fair.'}]
+NO_SLEEP = {'time_scale': 0}
+
+
+def test_outputs_and_latencies_are_deterministic():
+    settings = {'seed': 7, 'latency': {'distribution': 'lognormal', 'mean': 2.0, 'stddev': 0.5}}
+    first = [FakeLLM(settings).complete(MESSAGES, 'fake-diary', sleep=False) for _ in range(2)]
+    assert first[0] == first[1]
+
+    llm = FakeLLM(settings)
+    a = llm.complete(MESSAGES, 'fake-diary', sleep=False)
+    b = llm.complete(MESSAGES, 'fake-diary', sleep=False)
+    assert a[0] == b[0]  # Same text for the same request
+    assert a[2] != b[2]  # But a retry draws a fresh latency
+
+
+def test_failure_and_rate_limit_injection():
+    with pytest.raises(FakeRateLimitError) as error:
+        FakeLLM({'rate_limit_rate': 1.0, 'retry_after_seconds': 3, **NO_SLEEP}).complete(MESSAGES, 'm')
+    assert is_rate_limit_error(error.value)
+    assert error.value.response.headers['retry-after'] == '3'
+
+    llm = FakeLLM({'failure_rate': 1.0, **NO_SLEEP})
+    with pytest.raises(FakeServerError):
+        llm.complete(MESSAGES, 'm')
+    assert llm.snapshot()['failures'] == 1
+
+
+def test_throughput_adds_output_time():
+    llm = FakeLLM({'latency': {'distribution': 'fixed', 'mean': 1.0}, 'tokens_per_second': 100,
+                   'output_tokens': 500})
+    _, usage, latency = llm.complete(MESSAGES, 'm', sleep=False)
+    assert latency == pytest.approx(1.0 + usage['completion_tokens'] / 100)
+
+
+def test_server_chat_completions_and_injected_429(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    server = make_server(port=0, fake_settings={'rate_limit_rate': 0.5, 'seed': 1, **NO_SLEEP})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = ProviderRegistry().get_client('openai', f"http://127.0.0.1:{server.server_port}/v1")
+        client = client.with_options(max_retries=0)
+        outcomes = []
+        for i in range(10):
+            messages = [{'role': 'user', 'content': f'request {i}'}]
+            try:
+                response = client.chat.completions.create(model='gpt-4.1-mini', messages=messages)
+                assert 'gpt-4.1-mini' in response.choices[0].message.content
+                assert response.usage.completion_tokens > 0
+                outcomes.append('ok')
+            except Exception as e:
+                assert getattr(e, 'status_code', None) == 429
+                outcomes.append('429')
+        assert 'ok' in outcomes and '429' in outcomes
+        assert server.state.llm.snapshot()['calls'] == 10
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-group streaming pipeline (pipeline.py --engine per-group)
+"""
+
+import queue
+import threading
+import time
+
+from benchmark_whimperizer import create_inputs
+from group_pipeline import GroupItem, Stage, run_group_pipeline
+
+
+def test_first_group_finishes_before_later_groups_are_fetched():
+    events = []
+    lock = threading.Lock()
+
+    def step(name, seconds):
+        def handle(item, _):
+            with lock:
+                events.append((name, item.group_key))
+            time.sleep(seconds)
+        return handle
+
+    inbox, middle = queue.Queue(maxsize=1), queue.Queue(maxsize=1)
+    finished = []
+    first = Stage('fetch', step('fetch', 0.02), 1, inbox, middle)
+    second = Stage('render', step('render', 0.01), 1, middle, on_success=finished.append)
+    for stage in (first, second):
+        stage.start()
+    for n in range(4):
+        inbox.put(GroupItem(f"g-{n}"))  # Blocks while both stages and queues are full
+    for stage in (first, second):
+        stage.close()
+
+    assert [item.group_key for item in finished] == ['g-0', 'g-1', 'g-2', 'g-3']
+    # g-0 was rendered before the last group was even fetched
+    assert events.index(('render', 'g-0')) < events.index(('fetch', 'g-3'))
+
+
+def test_failed_group_does_not_stop_the_others():
+    def handle(item, _):
+        if item.group_key == 'bad':
+            raise RuntimeError('no content')
+
+    finished = []
+    stage = Stage('whimperize', handle, 2, queue.Queue(), on_success=finished.append)
+    stage.start()
+    items = [GroupItem(key) for key in ('good-1', 'bad', 'good-2')]
+    for item in items:
+        stage.inbox.put(item)
+    stage.close()
+    assert sorted(item.group_key for item in finished) == ['good-1', 'good-2']
+    assert items[1].error == 'whimperize: no content'
+
+
+def test_groups_stream_through_whimperize(tmp_path, pipeline_args):
+    create_inputs(tmp_path / 'input', groups=3, files_per_group=2, file_chars=300)
+    assert run_group_pipeline(pipeline_args(whimperize_workers=2, queue_size=1))
+    groups = {'-'.join(p.name.split('-')[:2]) for p in (tmp_path / 'output').glob('*-whimperized-*.md')}
+    assert groups == {'bench-g000', 'bench-g001', 'bench-g002'}
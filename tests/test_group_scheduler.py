@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the group scheduler (priorities, longest-first ordering and ledger-calibrated estimates)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from call_context import call_context
+from group_scheduler import PRIORITY_ENV, GroupScheduler
+
+
+def make_group(directory, group_key, files, chars):
+    paths = []
+    for i in range(files):
+        path = directory / f"{group_key}-{i:02d}.txt"
+        path.write_text('x' * chars, encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def test_priorities_first_then_longest(tmp_path, monkeypatch):
+    groups = {
+        'zaltz-1a': make_group(tmp_path, 'zaltz-1a', 1, 100),
+        'zaltz-2a': make_group(tmp_path, 'zaltz-2a', 4, 8000),
+        'zaltz-2b': make_group(tmp_path, 'zaltz-2b', 2, 2000),
+        'zaltz-3a': make_group(tmp_path, 'zaltz-3a', 1, 500),
+    }
+    scheduler = GroupScheduler()
+    assert scheduler.order(groups, groups, stages=()) == ['zaltz-2a', 'zaltz-2b', 'zaltz-3a', 'zaltz-1a']
+
+    scheduler.configure({'priority': ['zaltz-3*']})
+    scheduler.pin(['zaltz-1a'])
+    assert scheduler.order(groups, groups, stages=()) == ['zaltz-1a', 'zaltz-3a', 'zaltz-2a', 'zaltz-2b']
+
+    scheduler.configure({'order': 'input'})
+    assert scheduler.order(groups, groups, stages=()) == ['zaltz-1a', 'zaltz-2a', 'zaltz-2b', 'zaltz-3a']
+
+    monkeypatch.setenv(PRIORITY_ENV, '')  # Restored after the test
+    scheduler.pin(['zaltz-2b'], export=True)
+    assert GroupScheduler().pinned == ['zaltz-2b']
+
+
+def test_ledger_history_calibrates_estimates(tmp_path, ledger):
+    groups = {
+        'slow-1a': make_group(tmp_path, 'slow-1a', 1, 400),      # Size model: 6s
+        'big-1a': make_group(tmp_path, 'big-1a', 3, 4000),      # Size model: 45s
+        'fresh-1a': make_group(tmp_path, 'fresh-1a', 2, 2000),   # Size model: 20s, no history
+    }
+    usage = SimpleNamespace(usage=SimpleNamespace(prompt_tokens=100, completion_tokens=100, prompt_tokens_details=None))
+    for run in ('run_1', 'run_2'):
+        with call_context(group='slow-1a', stage='normal', run=run):
+            ledger.record('openai', 'gpt-4.1-mini', usage, 120.0)
+        with call_context(group='big-1a', stage='normal', run=run):
+            ledger.record('openai', 'gpt-4.1-mini', usage, 450.0)
+        with call_context(group='big-1a', stage='iterative', run=run):
+            ledger.record('openai', 'gpt-4.1-mini', usage, 450.0)
+    with call_context(group='fresh-1a', stage='consolidation'):
+        ledger.record('openai', 'gpt-4.1-mini', usage, 5.0)  # Other stages don't count
+
+    scheduler = GroupScheduler()
+    estimates = scheduler.estimates(groups)
+    # Past passes took 20x the size model, so the new group is expected to as well
+    assert estimates == pytest.approx({'slow-1a': 120.0, 'big-1a': 900.0, 'fresh-1a': 400.0})
+    assert scheduler.order(groups, groups) == ['big-1a', 'fresh-1a', 'slow-1a']
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests for the model capability registry
+"""
+
+import pytest
+
+from model_registry import ModelRegistry, RequestValidationError
+from rate_limiter import RateLimitScheduler
+
+MESSAGES = [{'role': 'user', 'content': 'Write about my day.'}]
+
+
+def test_reasoning_models_get_completion_token_param_and_no_temperature():
+    registry = ModelRegistry()
+    params = registry.request_params('openai', 'o4-mini', MESSAGES, max_tokens=5000, temperature=0.7)
+    assert params == {'max_completion_tokens': 5000}
+
+    params = registry.request_params('openai', 'gpt-4.1-mini', MESSAGES, max_tokens=5000, temperature=0.7)
+    assert params == {'max_tokens': 5000, 'temperature': 0.7}
+
+
+def test_max_tokens_clamped_to_model_output_limit():
+    registry = ModelRegistry()
+    params = registry.request_params('anthropic', 'claude-3-sonnet-20240229', MESSAGES, max_tokens=327680)
+    assert params['max_tokens'] == 4096
+
+
+def test_oversized_prompt_rejected_before_sending():
+    registry = ModelRegistry()
+    huge = [{'role': 'user', 'content': 'x' * 4 * 10000}]
+    with pytest.raises(RequestValidationError, match='context window'):
+        registry.request_params('openai', 'gpt-4', huge, max_tokens=100)
+
+
+def test_prefix_matching_respects_name_boundaries():
+    registry = ModelRegistry()
+    assert registry.capabilities('openai', 'gpt-4o-mini-2024-07-18')['max_output_tokens'] == 16384
+    assert registry.capabilities('openai', 'gpt-4-0613')['context_window'] == 8192
+    assert not registry.is_known('openai', 'gpt-4.5-preview')
+
+
+def test_config_overrides_and_scheduler_reads_limits():
+    registry = ModelRegistry({'openai/gpt-4.1-mini': {'rpm': 500, 'tpm': 200000},
+                              'my-local-model': {'context_window': 4096, 'supports_temperature': False}})
+    assert registry.rate_limits('openai', 'gpt-4.1-mini') == {'rpm': 500, 'tpm': 200000}
+    assert registry.capabilities('openai', 'gpt-4.1-mini')['max_output_tokens'] == 32768
+    assert registry.request_params('openai', 'my-local-model', MESSAGES, temperature=0.5) == {}
+
+
+def test_scheduler_limits_and_estimate_come_from_registry(monkeypatch):
+    import rate_limiter
+    registry = ModelRegistry({'openai/gpt-4.1-mini': {'rpm': 500, 'tpm': 200000}})
+    monkeypatch.setattr(rate_limiter, 'get_model_registry', lambda: registry)
+
+    scheduler = RateLimitScheduler({'expected_output_tokens': 50000})
+    assert scheduler.model_limits('openai', 'gpt-4.1-mini') == {'rpm': 500, 'tpm': 200000}
+    # Expected output is capped at the model's max output tokens
+    assert scheduler.estimate(MESSAGES, 'openai', 'gpt-4.1-mini') < 32768 + 100
+    assert scheduler.estimate(MESSAGES) > 50000
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process and parallel multi-run engines, using the fake provider
+"""
+
+import time
+
+import pytest
+import yaml
+
+from benchmark_whimperizer import create_inputs
+from config_loader import run_overlay
+from multi_runner import build_run_config, format_status_report, run_in_process, run_parallel
+import whimperizer  # noqa: F401  (import time is not part of the measurement)
+
+LATENCY = 0.2
+
+
+@pytest.fixture
+def base_config(tmp_path, fake_pipeline_config):
+    config = fake_pipeline_config
+    config['api']['providers']['fake']['latency']['mean'] = LATENCY
+    config['multi_run']['run_models'] = {
+        f"run_{n}_model": {'provider': 'fake', 'model': f"fake-run-{n}"} for n in (1, 2, 3)
+    }
+    create_inputs(tmp_path / 'input', groups=1, files_per_group=2, file_chars=500)
+    return config
+
+
+def test_build_run_config_does_not_mutate_base(base_config):
+    run_config = build_run_config(base_config, {'provider': 'fake', 'model': 'other', 'temperature': 0.1})
+    assert run_config['api']['providers']['fake']['model'] == 'other'
+    assert base_config['api']['providers']['fake']['model'] != 'other'
+
+
+def test_runs_overlap_and_write_outputs_per_model(base_config, tmp_path):
+    started = time.perf_counter()
+    results = run_in_process(base_config, [1, 2, 3])
+    wall = time.perf_counter() - started
+
+    assert results == {1: True, 2: True, 3: True}
+    outputs = sorted(p.name for p in (tmp_path / 'output').glob('*.md'))
+    for n in (1, 2, 3):
+        assert any(f"-whimperized-normal-fake-run-{n}-" in name for name in outputs)
+        assert any(f"-whimperized-iterative-fake-run-{n}-" in name for name in outputs)
+
+    # Each run makes 3 calls (normal + one per file); sequential runs would take 9 x LATENCY
+    assert wall < 6 * LATENCY
+
+
+def test_parallel_runs_apply_overlays_and_write_per_run_logs(base_config, tmp_path):
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump(base_config), encoding='utf-8')
+    run_plans = [{'run': n, 'config_path': str(config_path), 'provider': 'fake', 'model': f"fake-run-{n}",
+                  'overlay': run_overlay(base_config['multi_run']['run_models'][f"run_{n}_model"])}
+                 for n in (1, 2)]
+    before = set(tmp_path.iterdir())
+
+    statuses = run_parallel(run_plans, None, {'fake': 2, '*': 1}, log_dir=tmp_path / 'run_logs')
+
+    assert [s['status'] for s in statuses] == ['succeeded'] * 2
+    for n in (1, 2):
+        assert 'Processing complete: 1/1' in (tmp_path / 'run_logs' / f"run_{n}.log").read_text(encoding='utf-8')
+        assert any(f"-normal-fake-run-{n}-" in p.name for p in (tmp_path / 'output').glob('*.md'))
+    assert (tmp_path / 'run_logs' / 'status.json').exists()
+    assert 'fake/fake-run-2' in format_status_report(statuses)
+    # Run settings travel as overlays: no per-run config files
+    assert {p.name for p in set(tmp_path.iterdir()) - before} <= {'run_logs', 'output', 'usage.sqlite',
+                                                                   'usage.sqlite-wal', 'usage.sqlite-shm'}
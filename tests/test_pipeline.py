@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Tests for pipeline.py streaming consolidation, using the fake provider
+"""
+
+from benchmark_whimperizer import create_inputs
+from pipeline import run_streaming
+
+
+def test_groups_consolidate_while_other_groups_still_run(tmp_path, fake_pipeline_config, pipeline_args):
+    config = fake_pipeline_config
+    config['api']['providers']['fake']['latency']['mean'] = 0.1
+    config['multi_run']['run_models'] = {
+        f"run_{n}_model": {'provider': 'fake', 'model': f"fake-run-{n}"} for n in (1, 2, 3)
+    }
+    config['multi_run']['consolidation'] = {'provider': 'fake', 'model': 'fake-consolidator',
+                                            'latency': {'distribution': 'fixed', 'mean': 0.1}}
+    create_inputs(tmp_path / 'input', groups=2, files_per_group=2, file_chars=300)
+    assert run_streaming(pipeline_args(runs=3, consolidate_after=2, consolidation_workers=2))
+
+    output = tmp_path / 'output'
+    consolidated = {p.name.split('-whimperized-')[0]: p for p in output.glob('*-consolidated-*.md')}
+    assert set(consolidated) == {'bench-g000', 'bench-g001'}
+
+    # The first group was consolidated before the runs had finished the second group
+    last_run_output = max(p.stat().st_mtime for p in output.glob('bench-g001-*-iterative-*.md'))
+    assert consolidated['bench-g000'].stat().st_mtime < last_run_output
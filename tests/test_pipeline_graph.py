@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process stage graph behind pipeline.py --engine graph
+"""
+
+import threading
+import time
+
+import pytest
+
+from benchmark_whimperizer import create_inputs
+from pipeline_graph import DONE, FAILED, SKIPPED, FinalTexts, StageGraph, run_pipeline_graph
+
+
+def test_independent_nodes_overlap_and_outputs_flow_downstream():
+    both_running = threading.Barrier(2, timeout=5)
+
+    def slow(value):
+        both_running.wait()  # Deadlocks (times out) unless the two nodes run concurrently
+        return value
+
+    graph = StageGraph(max_workers=2)
+    graph.add('a', lambda: slow(2))
+    graph.add('b', lambda: slow(3))
+    graph.add('total', lambda a, b: a * b, ('a', 'b'), int)
+    nodes = graph.run()
+    assert all(node.status == DONE for node in nodes.values())
+    assert graph.outputs['total'] == 6
+
+
+def test_failures_and_type_errors_skip_downstream_only():
+    def boom():
+        raise RuntimeError('download failed')
+
+    graph = StageGraph()
+    graph.add('download', boom)
+    graph.add('whimperize', lambda download: download, ('download',))
+    graph.add('wrong_type', lambda: 'not final texts', output_type=FinalTexts)
+    graph.add('pdf_setup', lambda: time.sleep(0.01) or 'renderer')
+    nodes = graph.run()
+    assert nodes['download'].status == FAILED and 'download failed' in nodes['download'].error
+    assert nodes['whimperize'].status == SKIPPED
+    assert nodes['wrong_type'].status == FAILED and 'expected FinalTexts' in nodes['wrong_type'].error
+    assert nodes['pdf_setup'].status == DONE
+
+
+def test_graph_validation():
+    cyclic = StageGraph()
+    cyclic.add('a', lambda b: b, ('b',))
+    cyclic.add('b', lambda a: a, ('a',))
+    with pytest.raises(ValueError, match='cycle'):
+        cyclic.run()
+
+    dangling = StageGraph()
+    dangling.add('x', lambda y: y, ('y',))
+    with pytest.raises(ValueError, match='unknown'):
+        dangling.order()
+
+
+def test_multi_run_graph_consolidates_each_group(tmp_path, multi_run_config, pipeline_args):
+    create_inputs(tmp_path / 'input', groups=2, files_per_group=2, file_chars=300)
+    assert run_pipeline_graph(pipeline_args(runs=2, consolidation_workers=2))
+
+    consolidated = {p.name.split('-whimperized-')[0] for p in (tmp_path / 'output').glob('*-consolidated-*.md')}
+    assert consolidated == {'bench-g000', 'bench-g001'}
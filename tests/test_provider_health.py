@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Tests for provider circuit breakers and health-based ordering
+"""
+
+import threading
+from types import SimpleNamespace
+
+from model_registry import get_model_registry
+from provider_health import HealthRegistry, HedgeBudget, CLOSED, OPEN, HALF_OPEN
+from whimperizer import Whimperizer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_registry(**settings):
+    clock = FakeClock()
+    defaults = {'failure_threshold': 2, 'cooldown_seconds': 60}
+    defaults.update(settings)
+    return HealthRegistry(defaults, clock=clock), clock
+
+
+def test_breaker_opens_then_recovers_through_half_open_probe():
+    registry, clock = make_registry()
+
+    registry.record_failure('openai/gpt-4.1-mini', 1.0)
+    assert registry.breaker('openai/gpt-4.1-mini').state == CLOSED
+    registry.record_failure('openai/gpt-4.1-mini', 1.0)
+    assert registry.breaker('openai/gpt-4.1-mini').state == OPEN
+    assert not registry.try_acquire('openai/gpt-4.1-mini')
+
+    clock.now = 61
+    assert registry.try_acquire('openai/gpt-4.1-mini')
+    assert registry.breaker('openai/gpt-4.1-mini').state == HALF_OPEN
+    # Only one probe at a time
+    assert not registry.try_acquire('openai/gpt-4.1-mini')
+
+    registry.record_success('openai/gpt-4.1-mini', 2.0)
+    assert registry.breaker('openai/gpt-4.1-mini').state == CLOSED
+
+
+def test_failed_probe_reopens_immediately():
+    registry, clock = make_registry()
+    registry.record_failure('a', 1.0)
+    registry.record_failure('a', 1.0)
+    clock.now = 61
+    assert registry.try_acquire('a')
+    registry.record_failure('a', 1.0)
+    assert registry.breaker('a').state == OPEN
+
+
+def test_slow_calls_count_as_strikes():
+    registry, _ = make_registry(slow_call_seconds=10)
+    registry.record_success('a', 30.0)
+    registry.record_success('a', 30.0)
+    assert registry.breaker('a').state == OPEN
+
+
+def test_order_attempts_skips_open_and_prefers_fastest():
+    registry, _ = make_registry(latency_aware=True)
+    attempts = [('primary', 'a'), ('fallback_1', 'b'), ('fallback_2', 'c')]
+    registry.record_failure('a')
+    registry.record_failure('a')
+    registry.record_success('b', 20.0)
+    registry.record_success('c', 5.0)
+
+    ordered = registry.order_attempts(attempts, key=lambda a: a[1])
+    assert [a[1] for a in ordered] == ['c', 'b']
+
+
+def test_order_attempts_empty_when_everything_is_open():
+    registry, _ = make_registry(failure_threshold=1)
+    registry.record_failure('a')
+    assert registry.order_attempts([('primary', 'a')], key=lambda a: a[1]) == []
+
+
+def test_locally_rejected_request_releases_half_open_probe():
+    class OversizedProvider:
+        provider_type = 'openai'
+        config = {'model': 'gpt-4o-mini'}
+
+        def generate(self, messages):
+            return get_model_registry().request_params('openai', 'gpt-4o-mini', messages)
+
+    registry, clock = make_registry()
+    registry.record_failure('openai/gpt-4o-mini', 1.0)
+    registry.record_failure('openai/gpt-4o-mini', 1.0)
+    clock.now = 61
+    assert registry.try_acquire('openai/gpt-4o-mini')  # What call_ai_api_with_fallbacks does first
+
+    whimperizer = SimpleNamespace(health=registry, breaker_key=Whimperizer.breaker_key)
+    messages = [{'role': 'user', 'content': 'x' * 2_000_000}]
+    assert Whimperizer.run_provider_attempt(whimperizer, ('primary', 'openai', OversizedProvider()), messages, 1, 1) is None
+
+    assert registry.breaker('openai/gpt-4o-mini').state == HALF_OPEN
+    assert registry.order_attempts([('primary', 'openai/gpt-4o-mini')], key=lambda a: a[1])
+
+
+
+class GatedProvider:
+    """Returns its text once its gate opens (or at once when it has none); counts calls"""
+    provider_type = 'fake'
+
+    def __init__(self, model, text, gate=None, on_call=None):
+        self.config = {'model': model}
+        self.text, self.gate, self.on_call = text, gate, on_call
+        self.calls = 0
+
+    def generate(self, messages):
+        self.calls += 1
+        if self.on_call:
+            self.on_call()
+        if self.gate is not None:
+            self.gate.wait(5)
+        return self.text
+
+
+def make_hedger(max_hedges=10, delay=0.05, **settings):
+    """A Whimperizer with only the state call_with_hedging uses"""
+    whimperizer = Whimperizer.__new__(Whimperizer)
+    whimperizer.health, clock = make_registry(**settings)
+    whimperizer.hedge_budget = HedgeBudget(max_hedges=max_hedges, max_hedge_ratio=1.0)
+    whimperizer.hedge_budget.record_call()
+    whimperizer.hedging_config = {'initial_delay_seconds': delay, 'min_delay_seconds': delay}
+    return whimperizer, clock
+
+
+def hedge(whimperizer, primary, fallback):
+    attempts = [(1, ('primary', 'primary', primary)), (2, ('fallback_1', 'fallback', fallback))]
+    return whimperizer.call_with_hedging([{'role': 'user', 'content': 'story'}], attempts, 2, True)
+
+
+def test_hedge_fires_after_delay_and_first_result_wins():
+    whimperizer, _ = make_hedger()
+    stuck = threading.Event()
+    primary = GatedProvider('slow', 'primary story', gate=stuck)
+    fallback = GatedProvider('fast', 'hedged story')
+    try:
+        assert hedge(whimperizer, primary, fallback) == ('hedged story', 2)
+    finally:
+        stuck.set()
+    assert whimperizer.hedge_budget.hedges == 1
+
+
+def test_fast_primary_never_hedges():
+    whimperizer, _ = make_hedger(delay=5)
+    fallback = GatedProvider('fast', 'hedged story')
+    assert hedge(whimperizer, GatedProvider('slow', 'primary story'), fallback) == ('primary story', 1)
+    assert fallback.calls == 0 and whimperizer.hedge_budget.hedges == 0
+
+
+def test_primary_finishing_first_abandons_the_hedge():
+    whimperizer, _ = make_hedger()
+    primary_gate, hedge_gate = threading.Event(), threading.Event()
+    primary = GatedProvider('slow', 'primary story', gate=primary_gate)
+    fallback = GatedProvider('fast', 'hedged story', gate=hedge_gate, on_call=primary_gate.set)
+    try:
+        assert hedge(whimperizer, primary, fallback) == ('primary story', 2)
+    finally:
+        hedge_gate.set()
+    assert fallback.calls == 1
+
+
+def test_exhausted_budget_or_open_breaker_sends_no_hedge():
+    whimperizer, _ = make_hedger(max_hedges=0)
+    primary_gate = threading.Event()
+    threading.Timer(0.3, primary_gate.set).start()
+    fallback = GatedProvider('fast', 'hedged story')
+    assert hedge(whimperizer, GatedProvider('slow', 'primary story', gate=primary_gate), fallback) == ('primary story', 1)
+    assert fallback.calls == 0
+    # The hedge target's breaker was reserved and then given back
+    assert whimperizer.health.try_acquire('fake/fast')
+
+    whimperizer, clock = make_hedger(max_hedges=1)
+    whimperizer.health.record_failure('fake/fast', 1.0)
+    whimperizer.health.record_failure('fake/fast', 1.0)
+    primary_gate = threading.Event()
+    threading.Timer(0.3, primary_gate.set).start()
+    assert hedge(whimperizer, GatedProvider('slow', 'primary story', gate=primary_gate), fallback) == ('primary story', 1)
+    assert fallback.calls == 0
+    assert whimperizer.hedge_budget.hedges == 0  # An open circuit doesn't use up the hedge slot
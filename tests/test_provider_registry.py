@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared provider registry
+"""
+
+import pytest
+
+from provider_registry import ProviderRegistry
+
+
+def test_client_is_built_once_per_endpoint(monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test-key')
+    registry = ProviderRegistry()
+
+    default_client = registry.get_client('openai')
+    assert registry.get_client('openai', 'https://api.openai.com/v1') is default_client
+    assert registry.get_client('openai', 'http://127.0.0.1:9/v1') is not default_client
+
+
+def test_provider_factory_runs_once_per_key():
+    registry = ProviderRegistry()
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    first = registry.get_provider(('openai', 'gpt-4.1-mini'), factory)
+    second = registry.get_provider(('openai', 'gpt-4.1-mini'), factory)
+    assert first is second
+    assert len(calls) == 1
+
+
+def test_missing_api_key_raises(monkeypatch):
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    with pytest.raises(ValueError, match='OPENAI_API_KEY'):
+        ProviderRegistry().get_client('openai')
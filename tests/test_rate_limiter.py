@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the client-side rate limiter
+"""
+
+import threading
+import time
+
+from rate_limiter import ModelLimiter, RateLimitScheduler, TokenBucket, parse_reset_seconds
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_reset_seconds_formats():
+    assert parse_reset_seconds('6m0s') == 360
+    assert parse_reset_seconds('20ms') == 0.02
+    assert parse_reset_seconds('1.5') == 1.5
+    assert parse_reset_seconds('1970-01-01T00:01:40Z', now=40) == 60
+    assert parse_reset_seconds('soon') is None
+
+
+def test_token_bucket_refills_over_a_minute():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.consume(60)
+    assert bucket.time_until(30) == 30
+    clock.now = 30
+    assert bucket.time_until(30) == 0
+
+
+def test_headers_shrink_remaining_budget():
+    clock = FakeClock()
+    limiter = ModelLimiter('openai/gpt-4.1-mini', rpm=500, tpm=200000, clock=clock)
+    limiter.update_from_headers({
+        'x-ratelimit-limit-tokens': '30000',
+        'x-ratelimit-remaining-tokens': '0',
+        'x-ratelimit-reset-tokens': '12s',
+    })
+    assert limiter.tokens.capacity == 30000
+    assert limiter._wait_needed(1000) >= 12
+
+
+def test_waiting_requests_are_served_round_robin_across_groups():
+    limiter = ModelLimiter('test/model', rpm=1200)
+    limiter.requests.tokens = 0  # Force every request to queue
+    served = []
+
+    def request(group, name):
+        limiter.acquire(10, group)
+        served.append(name)
+
+    threads = []
+    for group, name in [('a', 'a1'), ('a', 'a2'), ('a', 'a3'), ('b', 'b1')]:
+        thread = threading.Thread(target=request, args=(group, name))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert served == ['a1', 'b1', 'a2', 'a3']
+
+
+def test_rate_limit_errors_are_retried_after_retry_after():
+    class RateLimited(Exception):
+        status_code = 429
+
+        class response:
+            headers = {'retry-after': '0.01'}
+
+    scheduler = RateLimitScheduler({'max_retries': 2})
+    calls = []
+
+    def send():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RateLimited()
+        return 'ok', {}
+
+    assert scheduler.run('openai', 'gpt-4.1-mini', 100, send) == 'ok'
+    assert len(calls) == 3
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for local pre-ranking of run outputs before consolidation
+"""
+
+import os
+
+from run_ranker import ranking_settings, select_runs, text_features
+
+GOOD = "\n\n".join(
+    f"## {day}\n\nMom said we were going to the market for the {i} time.\n\n\"Can I have {i} candies?\" I asked.\n\n"
+    f"\"No,\" she said, which is a 47 out of 10 on the unfairness scale. {day} thing number {i}."
+    for i, day in enumerate(['Monday', 'Tuesday', 'Wednesday', 'Thursday'])
+)
+LOOPING = "## Monday\n\nI went to shul.\n\n" + "I went to shul.\n\n" * 8
+DIFFERENT = "\n\n".join(
+    f"## {day}\n\n\"Where is my bike?\" Zeidy asked about the {i} wheels on the porch.\n\nNobody knew."
+    for i, day in enumerate(['Friday', 'Sunday', 'Monday'])
+)
+
+
+def write(tmp_path, name, text, mtime=1_000_000):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_features_capture_dialogue_headers_and_duplication():
+    good, looping = text_features(GOOD), text_features(LOOPING)
+    assert good['diary_headers'] == 4 and good['dialogue'] > looping['dialogue']
+    assert looping['duplication'] > 0.5 and good['duplication'] == 0
+
+
+def test_top_k_prefers_quality_and_drops_near_duplicates(tmp_path):
+    files = [
+        write(tmp_path, 'g-1a-whimperized-iterative-a.md', GOOD),
+        write(tmp_path, 'g-1a-whimperized-normal-a.md', GOOD + "\n\nThe end."),  # Near-copy of the first
+        write(tmp_path, 'g-1a-whimperized-iterative-b.md', DIFFERENT),
+        write(tmp_path, 'g-1a-whimperized-iterative-c.md', LOOPING),
+    ]
+    picked = select_runs('g-1a', files, {'top_k': 2})
+    assert picked[0].name.endswith('iterative-a.md')
+    assert picked[1].name.endswith('iterative-b.md')
+
+
+def test_per_group_limits_and_stale_outputs(tmp_path):
+    settings = {'top_k': 2, 'max_age_days': 1, 'groups': {'g-1a': {'top_k': 3}}}
+    assert ranking_settings(settings, 'g-1a')['top_k'] == 3
+    assert ranking_settings(settings, 'g-2b')['top_k'] == 2
+
+    files = [
+        write(tmp_path, 'old.md', GOOD, mtime=1_000_000 - 3 * 86400),
+        write(tmp_path, 'a.md', DIFFERENT),
+        write(tmp_path, 'b.md', LOOPING),
+        write(tmp_path, 'c.md', GOOD.replace('market', 'park')),
+    ]
+    picked = select_runs('g-1a', files, settings)
+    assert 'old.md' not in [p.name for p in picked] and len(picked) == 3
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Tests for fast CLI startup: entry points must not import heavy libraries up front
+"""
+
+from benchmark_startup import ENTRY_POINTS, measure_imports, parse_importtime
+
+
+def test_parse_importtime_reads_depth_and_cumulative_time():
+    output = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |     json.decoder\n"
+              "import time:       300 |        420 |   json\n"
+              "import time:      1000 |       1420 | pipeline\n")
+    assert parse_importtime(output) == [('json.decoder', 120, 120, 2), ('json', 300, 420, 1),
+                                        ('pipeline', 1000, 1420, 0)]
+
+
+def test_entry_points_defer_heavy_imports():
+    for module in ENTRY_POINTS:
+        measured = measure_imports(module, repeat=1)
+        assert measured['heavy'] == [], f"{module} imports {measured['heavy']} at startup"
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for pipeline tracing (Chrome trace export) and --profile hot-function reports
+"""
+
+import json
+
+import pytest
+
+from benchmark_whimperizer import create_inputs
+from call_context import call_context
+from pipeline_graph import run_pipeline_graph
+from tracing import Tracer, get_tracer
+
+
+@pytest.fixture
+def tracer():
+    tracer = get_tracer()
+    tracer.configure(profiling=True)
+    yield tracer
+    tracer.configure(enabled=False)
+
+
+def test_spans_export_as_chrome_trace(tmp_path):
+    tracer = Tracer()
+    with tracer.span('ignored'):
+        pass
+    assert tracer.events == []
+
+    tracer.configure()
+    with call_context(group='zaltz-1a'), tracer.span('whimperize', 'stage', runs=2):
+        token = tracer.start('pdf.page', 'pdf')
+        tracer.finish(token, page=1)
+    trace = json.loads(tracer.export(tmp_path / 'trace.json').read_text())
+
+    spans = {event['name']: event for event in trace['traceEvents'] if event['ph'] == 'X'}
+    assert spans['whimperize']['args'] == {'group': 'zaltz-1a', 'runs': 2}
+    assert spans['pdf.page']['args'] == {'group': 'zaltz-1a', 'page': 1}
+    assert spans['whimperize']['dur'] >= spans['pdf.page']['dur']
+    assert any(event['ph'] == 'M' and event['name'] == 'thread_name' for event in trace['traceEvents'])
+    assert 'whimperize' in tracer.summary()
+
+
+def test_profile_report_lists_hot_functions(tracer):
+    def busy_ranking_work():
+        return sum(i * i for i in range(200000))
+
+    with tracer.profile('ranking'):
+        with tracer.profile('nested'):  # Counted in the outer profile
+            busy_ranking_work()
+    report = tracer.profile_report(top=10)
+    assert "'ranking'" in report and 'busy_ranking_work' in report
+    assert "'nested'" not in report
+
+
+def test_graph_run_records_stage_group_and_api_spans(tmp_path, pipeline_args, tracer):
+    create_inputs(tmp_path / 'input', groups=2, files_per_group=1, file_chars=200)
+    assert run_pipeline_graph(pipeline_args(provider='fake'))
+
+    by_category = {}
+    for event in tracer.events:
+        by_category.setdefault(event['cat'], set()).add(event['name'])
+    assert 'whimperize' in by_category['stage']
+    assert by_category['group'] == {'bench-g000', 'bench-g001'}
+    assert by_category['llm']
+    assert all(event['args'].get('group') for event in tracer.events if event['cat'] == 'llm')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the usage ledger and pricing table
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from call_context import call_context
+from usage_ledger import PricingTable, UsageLedger, extract_usage, format_usage_report
+
+PRICING = {
+    'gpt-4.1-mini': {'input': 0.40, 'cached_input': 0.10, 'output': 1.60},
+    'claude-3-sonnet': {'input': 3.00, 'cached_input': 0.30, 'output': 15.00},
+}
+
+
+def openai_response(prompt, completion, cached=0):
+    return SimpleNamespace(usage=SimpleNamespace(
+        prompt_tokens=prompt, completion_tokens=completion,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached)))
+
+
+def test_pricing_uses_cached_rate_and_prefix_match():
+    table = PricingTable(PRICING)
+    usage = {'prompt_tokens': 1_000_000, 'completion_tokens': 1_000_000, 'cached_tokens': 500_000}
+    assert table.cost('openai', 'gpt-4.1-mini-2025-04-14', usage) == pytest.approx(0.20 + 0.05 + 1.60)
+    assert table.cost('openai', 'unknown-model', usage) is None
+
+
+def test_anthropic_cache_reads_count_as_prompt_tokens():
+    response = SimpleNamespace(usage=SimpleNamespace(
+        input_tokens=100, output_tokens=50, cache_read_input_tokens=900, cache_creation_input_tokens=0))
+    assert extract_usage('anthropic', response) == {
+        'prompt_tokens': 1000, 'completion_tokens': 50, 'cached_tokens': 900}
+
+
+def test_ledger_records_context_and_aggregates(tmp_path):
+    ledger = UsageLedger({'ledger_path': str(tmp_path / 'usage.sqlite'), 'pricing': PRICING})
+
+    with call_context(group='zaltz-1a', run='run_1'):
+        with call_context(stage='normal'):
+            entry = ledger.record('openai', 'gpt-4.1-mini', openai_response(1000, 500), 2.0)
+        with call_context(stage='iterative'):
+            ledger.record('openai', 'gpt-4.1-mini', openai_response(4000, 500, cached=1000), 4.0)
+            ledger.record('openai', 'gpt-4.1-mini', openai_response(6000, 500), 6.0)
+
+    assert entry['group_key'] == 'zaltz-1a' and entry['run'] == 'run_1' and entry['stage'] == 'normal'
+
+    by_stage = {row['stage']: row for row in ledger.report(group_by=('stage',))}
+    assert by_stage['iterative']['calls'] == 2
+    assert by_stage['iterative']['prompt_tokens'] == 10000
+    assert by_stage['iterative']['cached_tokens'] == 1000
+    assert by_stage['iterative']['avg_latency_seconds'] == 5.0
+    assert by_stage['iterative']['cost_usd'] > by_stage['normal']['cost_usd']
+
+    report = format_usage_report(ledger)
+    assert 'iterative' in report and 'run_1' in report
+    ledger.close()
+
+
+def test_report_on_missing_ledger(tmp_path):
+    ledger = UsageLedger({'ledger_path': str(tmp_path / 'missing.sqlite')})
+    assert ledger.report() == []
+    assert 'No usage recorded' in format_usage_report(ledger)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the work queue and distributed pipeline workers
+"""
+
+import threading
+import time
+
+import pytest
+
+from benchmark_whimperizer import create_inputs
+from queue_pipeline import QueueWorker, plan_job, wait_for_job
+from work_queue import SQLiteWorkQueue, WorkQueue
+
+
+def test_dependencies_leases_and_retries(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / 'queue.sqlite'))
+    first = queue.enqueue('job', 'download', 'g-1a', {}, max_attempts=2)
+    second = queue.enqueue('job', 'whimperize', 'g-1a', {}, after=[first])
+
+    task = queue.claim('a', lease_seconds=0.05)
+    assert task.id == first
+    assert queue.claim('b') is None  # The only other task waits on the first
+
+    # Worker a goes quiet: its lease expires and b takes over; a can no longer finish it
+    time.sleep(0.1)
+    taken = queue.claim('b', lease_seconds=60)
+    assert taken.id == first and taken.attempts == 2
+    assert not queue.complete(first, 'a', {})
+    assert queue.heartbeat(first, 'b') and queue.complete(first, 'b', {'files': 2})
+
+    task = queue.claim('b')
+    assert task.id == second and task.after == [first]
+    assert queue.results(task.after) == {first: {'files': 2}}
+
+
+def test_failed_inputs_skip_dependent_tasks(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / 'queue.sqlite'))
+    broken = queue.enqueue('job', 'whimperize', 'g-1a', {}, max_attempts=1)
+    render = queue.enqueue('job', 'render', 'g-1a', {}, after=[broken])
+    queue.claim('a')
+    assert queue.fail(broken, 'a', 'provider down')
+    assert queue.claim('a') is None
+    assert {task['id']: task['state'] for task in queue.tasks('job')} == {broken: 'failed', render: 'skipped'}
+
+
+def test_incomplete_backend_fails_on_creation():
+    class EnqueueOnly(WorkQueue):
+        def enqueue(self, job, kind, group_key, payload, after=None, max_attempts=3):
+            return 1
+
+    with pytest.raises(TypeError, match='claim'):
+        EnqueueOnly()
+
+
+def test_workers_run_a_multi_run_job(tmp_path, multi_run_config, pipeline_args):
+    create_inputs(tmp_path / 'input', groups=2, files_per_group=2, file_chars=300)
+    queue = SQLiteWorkQueue(str(tmp_path / 'queue.sqlite'))
+    assert plan_job(queue, 'job', pipeline_args(runs=2)) == 2
+
+    workers = [QueueWorker(queue, f"w{i}") for i in range(2)]
+    threads = [threading.Thread(target=w.run, kwargs={'idle_exit': 0.5, 'poll_seconds': 0.05}) for w in workers]
+    for thread in threads:
+        thread.start()
+    assert wait_for_job(queue, 'job', poll_seconds=0.05)
+    for thread in threads:
+        thread.join()
+
+    assert sum(w.completed for w in workers) == 6  # 2 groups x (2 runs + consolidate)
+    consolidated = {p.name.split('-whimperized-')[0] for p in (tmp_path / 'output').glob('*-consolidated-*.md')}
+    assert consolidated == {'bench-g000', 'bench-g001'}